@@ -0,0 +1,204 @@
+"""
+Benchmark suite for the hot paths of main.py.
+
+Synthesizes levels of several sizes mixing normal parts, belts, ropes, pulleys
+and programmable balls, times parsing, encoding and the JSON round trip, and
+measures the peak memory of each run. Results are written as JSON so releases
+can be compared:
+
+    uv run benchmark.py --output bench_results.json
+    uv run benchmark.py --sizes 150 10000 --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import main
+from main import PartType
+
+DEFAULT_SIZES = [150, 10_000, 100_000, 1_000_000]
+
+# Part counts are stored as two u16 values (fixed and moving) in the file
+MAX_PARTS_PER_FILE = 2 * 0xFFFF
+MAX_MOVING_PARTS = 0xFFFF
+# Link fields are int16, so synthesized links only point into the first 32768 parts
+MAX_LINK_TARGETS = 0x8000
+
+NORMAL_PART_TYPES = [
+    PartType.BOWLING_BALL, PartType.BASKETBALL, PartType.RED_BRICK_WALL,
+    PartType.WOOD_INCLINE, PartType.BALLOON, PartType.CANDLE, PartType.POOL_BALL,
+]
+SPECIAL_PART_TYPES = [PartType.BELT, PartType.ROPE, PartType.PULLEY, PartType.PROGRAMMABLE_BALL]
+
+
+def synthesize_level(num_parts: int, seed: int = 0) -> dict:
+    """Build a level JSON document, about one part in ten uses a special record type"""
+    rng = random.Random(seed)
+    num_targets = min(num_parts, MAX_LINK_TARGETS)
+    parts = []
+    for i in range(num_parts):
+        if rng.random() < 0.1:
+            part_type = rng.choice(SPECIAL_PART_TYPES)
+        else:
+            part_type = rng.choice(NORMAL_PART_TYPES)
+        part = main.make_part(part_type, rng.randint(0, 560), rng.randint(0, 377), moving=rng.random() < 0.5)
+        if part_type == PartType.BELT:
+            part.belt_connected_part_1 = rng.randrange(num_targets)
+            part.belt_connected_part_2 = rng.randrange(num_targets)
+        elif part_type == PartType.ROPE:
+            part.rope_segment_length = rng.randint(1, 40)
+        elif part_type == PartType.PULLEY:
+            part.rope_index = rng.randrange(num_targets)
+        parts.append(main.part_to_dict(part))
+    return {
+        "version": "TIM2",
+        "title": f"Benchmark {num_parts}",
+        "description": "Synthesized by benchmark.py",
+        "background": {"color": 3},
+        "global_settings": {
+            "pressure": 67,
+            "gravity": 272,
+            "music": 1000,
+            "num_moving": min(num_parts // 2, MAX_MOVING_PARTS),
+        },
+        "parts": parts,
+    }
+
+
+def encode_parts_block(json_data: dict) -> bytes:
+    """Encode only the part records, this works for any number of parts"""
+    parts = [main.dict_to_part(p) for p in json_data["parts"]]
+    buffer = bytearray(sum(main.LAYOUTS_BY_CLASS[type(p)].size for p in parts))
+    offset = 0
+    for part in parts:
+        offset = part.pack_into(buffer, offset)
+    return bytes(buffer)
+
+
+def parse_parts_block(data: bytes):
+    offset = 0
+    while offset < len(data):
+        _, size = main.parse_part_from_bytes(data, offset)
+        offset += size
+
+
+def parse_tim_file_quiet(filepath: str):
+    with open(os.devnull, 'w') as devnull:
+        main.parse_tim_file(filepath, devnull)
+
+
+def patch_middle_part(filepath: Path, num_parts: int):
+    with main.LevelPatcher(str(filepath)) as level:
+        level.set_fields(num_parts // 2, pos_x=100)
+
+
+def run_case(func, repeat: int) -> dict:
+    """Best-of-repeat wall time, then one extra run under tracemalloc for peak memory"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "mean_seconds": sum(times) / len(times), "peak_bytes": peak}
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes: list[int], repeat: int, workdir: Path) -> list[dict]:
+    results = []
+
+    def record(name: str, num_parts: int, func):
+        result = {"name": name, "parts": num_parts, **run_case(func, repeat)}
+        results.append(result)
+        print(f"  {name:<22} {result['seconds'] * 1000:10.2f} ms  {result['peak_bytes'] / 1024 / 1024:8.1f} MiB peak")
+
+    def skip(name: str, num_parts: int, reason: str):
+        results.append({"name": name, "parts": num_parts, "skipped": reason})
+        print(f"  {name:<22} skipped: {reason}")
+
+    for num_parts in sizes:
+        print(f"{num_parts} parts:")
+        json_data = synthesize_level(num_parts)
+        parts_block = encode_parts_block(json_data)
+
+        record("parse_part_from_bytes", num_parts, lambda: parse_parts_block(parts_block))
+
+        if num_parts <= MAX_MOVING_PARTS:
+            record("make_buffer", num_parts, lambda: main.make_buffer(
+                color=3, music=1000, quiz_title=b"Benchmark\0", goal_description=b"Benchmark\0",
+                normal_parts=list(range(num_parts)), belts=[], ropes=[], pulleys=[]))
+        else:
+            skip("make_buffer", num_parts, f"more than {MAX_MOVING_PARTS} moving parts")
+
+        if main.np is not None:
+            for layout in ("spiral", "poisson"):
+                record(f"generate_parts[{layout}]", num_parts,
+                       lambda: main.generate_parts_block(num_parts, layout))
+        else:
+            skip("generate_parts", num_parts, "NumPy is not installed")
+
+        if num_parts > MAX_PARTS_PER_FILE:
+            reason = f"more than {MAX_PARTS_PER_FILE} parts do not fit in a TIM file"
+            for name in ("json_to_tim", "tim_to_json", "parse_tim_file", "LevelPatcher"):
+                skip(name, num_parts, reason)
+            continue
+
+        tim_path = workdir / f"bench_{num_parts}.TIM"
+        tim_path.write_bytes(main.json_to_tim(json_data))
+        record("json_to_tim", num_parts, lambda: main.json_to_tim(json_data))
+        record("tim_to_json", num_parts, lambda: main.tim_to_json(str(tim_path)))
+        record("parse_tim_file", num_parts, lambda: parse_tim_file_quiet(str(tim_path)))
+        patch_path = workdir / f"bench_{num_parts}_patch.TIM"
+        shutil.copyfile(tim_path, patch_path)
+        record("LevelPatcher", num_parts, lambda: patch_middle_part(patch_path, num_parts))
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark TIM parsing, encoding and JSON conversion')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, metavar='N',
+                        help='Number of parts of the synthesized levels')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed runs per case, the best one is reported')
+    parser.add_argument('--output', type=str, default='bench_results.json',
+                        help='Path of the machine-readable results')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmarks(args.sizes, args.repeat, Path(workdir))
+
+    report = {
+        "revision": git_revision(),
+        "python": sys.version,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,10 +1,40 @@
+import os
+import sys
+import io
+import time
+import hashlib
+import pstats
+import cProfile
+import tracemalloc
 import struct
 import math
+import mmap
+import multiprocessing
 import argparse
+import asyncio
 import json
+import re
+import shutil
+import signal
+import socketserver
+import sqlite3
+import tempfile
+from array import array
+from collections import Counter
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from enum import IntEnum, IntFlag
-from dataclasses import dataclass
+from functools import cached_property, partial
+from itertools import repeat
+from dataclasses import MISSING, dataclass, fields as dataclass_fields
+
+try:
+    import numpy as np
+except ImportError:  # Optional, only needed for PartTable
+    np = None
 
 
 class PartType(IntEnum):
@@ -202,248 +232,386 @@ class Flags3(IntFlag):
     SHOW_SOLUTION_ICON = 0x8000
 
 
+class FlagCodec:
+    """
+    Converts one 16-bit flag field between its integer value and flag names.
+
+    Every combination of the named bits is decoded once up front, so turning
+    a value into names is a single table lookup. Bits without a name are not
+    reported, and unknown names are ignored when encoding.
+    """
+
+    def __init__(self, flag_class: type[IntFlag]):
+        self.flag_class = flag_class
+        self.bits = {flag.name: flag.value for flag in flag_class}
+        self.mask = 0
+        for bit in self.bits.values():
+            self.mask |= bit
+        # Walk all submasks of the named bits, names stay in definition order
+        self.names_by_value: dict[int, tuple[str, ...]] = {}
+        value = self.mask
+        while True:
+            self.names_by_value[value] = tuple(name for name, bit in self.bits.items() if value & bit)
+            if value == 0:
+                break
+            value = (value - 1) & self.mask
+
+    def names(self, flags: int) -> tuple[str, ...]:
+        """Names of the flags set in a value"""
+        return self.names_by_value[flags & self.mask]
+
+    def to_list(self, flags: int) -> list[str]:
+        """Names of the flags set in a value, as a new list"""
+        return list(self.names_by_value[flags & self.mask])
+
+    def from_names(self, names) -> int:
+        """Combine flag names into a value"""
+        bits = self.bits
+        flags = 0
+        for name in names:
+            flags |= bits.get(name, 0)
+        return flags
+
+
+FLAGS_1 = FlagCodec(Flags1)
+FLAGS_2 = FlagCodec(Flags2)
+FLAGS_3 = FlagCodec(Flags3)
+
+
+# Default flags (flags_1, flags_2, flags_3) extracted from ALL_ITEMS.TIM
+_DEFAULT_FLAGS_MAP = {
+    0: (0x1000, 0x0000, 0x8008),  # BOWLING_BALL
+    1: (0x6000, 0x0180, 0x2000),  # RED_BRICK_WALL
+    2: (0x6600, 0x0080, 0x0000),  # WOOD_INCLINE
+    3: (0x6400, 0x000c, 0x0000),  # TIPSY_TRAILER
+    4: (0x1000, 0x0004, 0x8408),  # BALLOON
+    5: (0x6000, 0x0081, 0x0000),  # CONVEYOR_BELT
+    6: (0x6400, 0x0001, 0x8000),  # MOUSE_MOTOR
+    7: (0x6000, 0x0004, 0x0008),  # PULLEY
+    9: (0x1000, 0x0000, 0x8008),  # BASKETBALL
+    11: (0x1000, 0x0004, 0x8008),  # LAUNDRY_BASKET
+    12: (0x1400, 0x0000, 0x8008),  # CURIE_CAT
+    13: (0x6400, 0x0001, 0x8000),  # JACK_IN_THE_BOX
+    14: (0x6000, 0x0001, 0x0000),  # GEAR
+    15: (0x6000, 0x0000, 0x8008),  # FISH_TANK
+    16: (0x6400, 0x0000, 0x8008),  # BIKE_PUMP
+    17: (0x1000, 0x0004, 0x8008),  # BUCKET
+    18: (0x6600, 0x0000, 0x800c),  # CANNON
+    19: (0x1400, 0x0000, 0x800c),  # DYNAMITE
+    21: (0x6200, 0x0000, 0x0002),  # UNKNOWN_21
+    22: (0x6000, 0x0004, 0x8008),  # UNKNOWN_22
+    23: (0x6200, 0x0004, 0x0008),  # UNKNOWN_23
+    24: (0x6400, 0x0000, 0x8009),  # UNKNOWN_24
+    25: (0x6400, 0x0000, 0x8008),  # FLASHLIGHT
+    26: (0x6000, 0x0001, 0x000a),  # UNKNOWN_26
+    27: (0x6400, 0x0004, 0x8408),  # UNKNOWN_27
+    28: (0x1000, 0x0000, 0x8008),  # BASEBALL
+    29: (0x6000, 0x0004, 0x8008),  # UNKNOWN_29
+    30: (0x6400, 0x0000, 0x0008),  # MAGNIFYING_GLASS
+    31: (0x6400, 0x0005, 0x8008),  # MANDRILL_MOTOR
+    35: (0x6400, 0x0000, 0x8008),  # BOXING_GLOVE
+    36: (0x1600, 0x0000, 0x800c),  # UNKNOWN_36
+    37: (0x6400, 0x0000, 0x8008),  # UNKNOWN_37
+    38: (0x6000, 0x0000, 0x000a),  # UNKNOWN_38
+    39: (0x6000, 0x0000, 0x0008),  # UNKNOWN_39
+    40: (0x6400, 0x0001, 0x8008),  # UNKNOWN_40
+    42: (0x1400, 0x0000, 0x8008),  # NEWTON_MOUSE
+    43: (0x1000, 0x0000, 0x8008),  # PINBALL
+    44: (0x1000, 0x0000, 0x8008),  # TENNIS_BALL
+    45: (0x1400, 0x0000, 0x800c),  # UNKNOWN_45
+    46: (0x6000, 0x0180, 0x2000),  # PIPE_WALL
+    47: (0x6600, 0x0000, 0x0000),  # CURVED_PIPE_WALL
+    48: (0x6000, 0x0180, 0x2000),  # WOOD_WALL
+    50: (0x6400, 0x0001, 0x8009),  # ELECTRIC_MOTOR
+    51: (0x6400, 0x0000, 0x8009),  # VACUUM
+    52: (0x1000, 0x0000, 0x8008),  # CHEESE
+    53: (0x6600, 0x0000, 0x0008),  # THUMB_TACK
+    54: (0x1400, 0x0000, 0x8408),  # MEL_SCHLEMMING
+    55: (0x6000, 0x0000, 0x8008),  # REMOTE_CONTROL_EXPLOSIVES
+    56: (0x6000, 0x0180, 0x2000),  # CAUTION_WALL
+    57: (0x6600, 0x0000, 0x0000),  # LARGE_CURVED_PIPE
+    58: (0x6000, 0x0000, 0x8408),  # MELS_HOUSE
+    59: (0x1000, 0x0000, 0x8008),  # SUPER_BALL
+    60: (0x6000, 0x0180, 0x2000),  # GRASS_FLOOR
+    61: (0x6400, 0x0000, 0x8000),  # ALLIGATOR
+    62: (0x1400, 0x0000, 0x8008),  # COFFEE_POT
+    63: (0x1000, 0x0000, 0x8408),  # POOL_BALL
+    64: (0x6000, 0x0000, 0x0008),  # PINBALL_BUMPER
+    66: (0x6000, 0x0000, 0x8008),  # UNKNOWN_66
+    67: (0x6000, 0x0000, 0x8009),  # UNKNOWN_67
+    68: (0x1000, 0x0000, 0x8008),  # SOCCER_BALL
+    69: (0x6000, 0x0000, 0x8000),  # ANTI_GRAVITY_PAD
+    70: (0x1600, 0x0000, 0x800c),  # MISSILE
+    71: (0x6000, 0x0000, 0x0400),  # UNKNOWN_71
+    73: (0x6400, 0x0000, 0x8000),  # UNKNOWN_73
+    74: (0x1000, 0x0000, 0x8008),  # UNKNOWN_74
+    75: (0x6400, 0x0004, 0x8008),  # UNKNOWN_75
+    77: (0x6400, 0x0000, 0x8008),  # UNKNOWN_77
+    78: (0x6000, 0x0000, 0x8008),  # UNKNOWN_78
+    79: (0x1000, 0x0004, 0x800c),  # UNKNOWN_79
+    80: (0x1000, 0x0000, 0x840c),  # UNKNOWN_80
+    81: (0x6400, 0x0000, 0x8409),  # TOASTER
+    82: (0x6000, 0x0180, 0x2000),  # UNKNOWN_82
+    83: (0x6000, 0x0180, 0x2000),  # UNKNOWN_83
+    84: (0x6000, 0x0180, 0x2000),  # UNKNOWN_84
+    85: (0x6000, 0x0180, 0x2000),  # UNKNOWN_85
+    86: (0x6000, 0x0001, 0x0000),  # UNKNOWN_86
+    87: (0x1000, 0x0000, 0x8408),  # PROGRAMMABLE_BALL
+    88: (0x6600, 0x0000, 0x0000),  # UNKNOWN_88
+    89: (0x6600, 0x0005, 0x0008),  # UNKNOWN_89
+    90: (0x6200, 0x0005, 0x0008),  # UNKNOWN_90
+    91: (0x6600, 0x0000, 0x8009),  # UNKNOWN_91
+    92: (0x6600, 0x0000, 0x8009),  # GREEN_LASER
+    93: (0x6600, 0x0000, 0x8009),  # BLUE_LASER
+    94: (0x6600, 0x0000, 0x0008),  # ANGLED_MIRROR
+    95: (0x6600, 0x0000, 0x0008),  # LASER_MIXER
+    96: (0x6000, 0x0000, 0x040a),  # LASER_ACTIVATED_PLUG
+    97: (0x6000, 0x0180, 0x0000),  # LARGE_PIPES
+    98: (0x6000, 0x0000, 0x0000),  # T_CONNECTOR
+    99: (0x6600, 0x0080, 0x0000),  # GRASS_INCLINE
+    100: (0x6600, 0x0080, 0x0000),  # LOG_INCLINE
+    101: (0x6600, 0x0080, 0x0000),  # GRANITE_INCLINE
+    102: (0x6600, 0x0080, 0x0000),  # BRICK_INCLINE
+    103: (0x6000, 0x0000, 0x0000),  # ARCHWAY
+    104: (0x6000, 0x0000, 0x0000),  # WOODEN_BARRIER
+    105: (0x6000, 0x0000, 0x0000),  # SCAFFOLD_BARRIER
+    106: (0x6000, 0x0000, 0x0000),  # LATTICE_ARCHWAY
+    107: (0x6000, 0x0000, 0x8009),  # ELECTRIC_MIXER
+    108: (0x1000, 0x0004, 0x8408),  # LEAKY_BUCKET
+    109: (0x1400, 0x0000, 0x8008),  # BLIMP
+    116: (0x6400, 0x0000, 0x0008),  # UNKNOWN_116
+    117: (0x6600, 0x0000, 0x8008),  # UNKNOWN_117
+    118: (0x6200, 0x0180, 0x2000),  # UNKNOWN_118
+    119: (0x6600, 0x0000, 0x8000),  # UNKNOWN_119
+    120: (0x6000, 0x0000, 0x000a),  # UNKNOWN_120
+    125: (0x6000, 0x0180, 0x2000),  # UNKNOWN_125
+    126: (0x6600, 0x0080, 0x0000),  # UNKNOWN_126
+    136: (0x6000, 0x0000, 0x8408),  # MESSAGE_COMPUTER
+    137: (0x6400, 0x0000, 0x8408),  # UNKNOWN_137
+    138: (0x1000, 0x0000, 0x800c),  # CANDLE
+    139: (0x6400, 0x000c, 0x0000),  # TEETER_TOTTER
+    148: (0x6000, 0x0000, 0x8008),  # LASER_DETECTOR
+}
+FALLBACK_PART_FLAGS = (0x6000, 0x0000, 0x0008)  # Unknown parts: fixed, no special flags
+
+# Default flags of every part type, indexed by part type value
+DEFAULT_PART_FLAGS: tuple[tuple[int, int, int], ...] = tuple(
+    _DEFAULT_FLAGS_MAP.get(part_type, FALLBACK_PART_FLAGS) for part_type in range(max(_DEFAULT_FLAGS_MAP) + 1))
+
+
 def get_default_part_flags(part_type: PartType) -> tuple[int, int, int]:
     """Get default flags for a part type (flags_1, flags_2, flags_3)"""
-    # Default flags extracted from ALL_ITEMS.TIM
-    flags_map = {
-        0: (0x1000, 0x0000, 0x8008),  # BOWLING_BALL
-        1: (0x6000, 0x0180, 0x2000),  # RED_BRICK_WALL
-        2: (0x6600, 0x0080, 0x0000),  # WOOD_INCLINE
-        3: (0x6400, 0x000c, 0x0000),  # TIPSY_TRAILER
-        4: (0x1000, 0x0004, 0x8408),  # BALLOON
-        5: (0x6000, 0x0081, 0x0000),  # CONVEYOR_BELT
-        6: (0x6400, 0x0001, 0x8000),  # MOUSE_MOTOR
-        7: (0x6000, 0x0004, 0x0008),  # PULLEY
-        9: (0x1000, 0x0000, 0x8008),  # BASKETBALL
-        11: (0x1000, 0x0004, 0x8008),  # LAUNDRY_BASKET
-        12: (0x1400, 0x0000, 0x8008),  # CURIE_CAT
-        13: (0x6400, 0x0001, 0x8000),  # JACK_IN_THE_BOX
-        14: (0x6000, 0x0001, 0x0000),  # GEAR
-        15: (0x6000, 0x0000, 0x8008),  # FISH_TANK
-        16: (0x6400, 0x0000, 0x8008),  # BIKE_PUMP
-        17: (0x1000, 0x0004, 0x8008),  # BUCKET
-        18: (0x6600, 0x0000, 0x800c),  # CANNON
-        19: (0x1400, 0x0000, 0x800c),  # DYNAMITE
-        21: (0x6200, 0x0000, 0x0002),  # UNKNOWN_21
-        22: (0x6000, 0x0004, 0x8008),  # UNKNOWN_22
-        23: (0x6200, 0x0004, 0x0008),  # UNKNOWN_23
-        24: (0x6400, 0x0000, 0x8009),  # UNKNOWN_24
-        25: (0x6400, 0x0000, 0x8008),  # FLASHLIGHT
-        26: (0x6000, 0x0001, 0x000a),  # UNKNOWN_26
-        27: (0x6400, 0x0004, 0x8408),  # UNKNOWN_27
-        28: (0x1000, 0x0000, 0x8008),  # BASEBALL
-        29: (0x6000, 0x0004, 0x8008),  # UNKNOWN_29
-        30: (0x6400, 0x0000, 0x0008),  # MAGNIFYING_GLASS
-        31: (0x6400, 0x0005, 0x8008),  # MANDRILL_MOTOR
-        35: (0x6400, 0x0000, 0x8008),  # BOXING_GLOVE
-        36: (0x1600, 0x0000, 0x800c),  # UNKNOWN_36
-        37: (0x6400, 0x0000, 0x8008),  # UNKNOWN_37
-        38: (0x6000, 0x0000, 0x000a),  # UNKNOWN_38
-        39: (0x6000, 0x0000, 0x0008),  # UNKNOWN_39
-        40: (0x6400, 0x0001, 0x8008),  # UNKNOWN_40
-        42: (0x1400, 0x0000, 0x8008),  # NEWTON_MOUSE
-        43: (0x1000, 0x0000, 0x8008),  # PINBALL
-        44: (0x1000, 0x0000, 0x8008),  # TENNIS_BALL
-        45: (0x1400, 0x0000, 0x800c),  # UNKNOWN_45
-        46: (0x6000, 0x0180, 0x2000),  # PIPE_WALL
-        47: (0x6600, 0x0000, 0x0000),  # CURVED_PIPE_WALL
-        48: (0x6000, 0x0180, 0x2000),  # WOOD_WALL
-        50: (0x6400, 0x0001, 0x8009),  # ELECTRIC_MOTOR
-        51: (0x6400, 0x0000, 0x8009),  # VACUUM
-        52: (0x1000, 0x0000, 0x8008),  # CHEESE
-        53: (0x6600, 0x0000, 0x0008),  # THUMB_TACK
-        54: (0x1400, 0x0000, 0x8408),  # MEL_SCHLEMMING
-        55: (0x6000, 0x0000, 0x8008),  # REMOTE_CONTROL_EXPLOSIVES
-        56: (0x6000, 0x0180, 0x2000),  # CAUTION_WALL
-        57: (0x6600, 0x0000, 0x0000),  # LARGE_CURVED_PIPE
-        58: (0x6000, 0x0000, 0x8408),  # MELS_HOUSE
-        59: (0x1000, 0x0000, 0x8008),  # SUPER_BALL
-        60: (0x6000, 0x0180, 0x2000),  # GRASS_FLOOR
-        61: (0x6400, 0x0000, 0x8000),  # ALLIGATOR
-        62: (0x1400, 0x0000, 0x8008),  # COFFEE_POT
-        63: (0x1000, 0x0000, 0x8408),  # POOL_BALL
-        64: (0x6000, 0x0000, 0x0008),  # PINBALL_BUMPER
-        66: (0x6000, 0x0000, 0x8008),  # UNKNOWN_66
-        67: (0x6000, 0x0000, 0x8009),  # UNKNOWN_67
-        68: (0x1000, 0x0000, 0x8008),  # SOCCER_BALL
-        69: (0x6000, 0x0000, 0x8000),  # ANTI_GRAVITY_PAD
-        70: (0x1600, 0x0000, 0x800c),  # MISSILE
-        71: (0x6000, 0x0000, 0x0400),  # UNKNOWN_71
-        73: (0x6400, 0x0000, 0x8000),  # UNKNOWN_73
-        74: (0x1000, 0x0000, 0x8008),  # UNKNOWN_74
-        75: (0x6400, 0x0004, 0x8008),  # UNKNOWN_75
-        77: (0x6400, 0x0000, 0x8008),  # UNKNOWN_77
-        78: (0x6000, 0x0000, 0x8008),  # UNKNOWN_78
-        79: (0x1000, 0x0004, 0x800c),  # UNKNOWN_79
-        80: (0x1000, 0x0000, 0x840c),  # UNKNOWN_80
-        81: (0x6400, 0x0000, 0x8409),  # TOASTER
-        82: (0x6000, 0x0180, 0x2000),  # UNKNOWN_82
-        83: (0x6000, 0x0180, 0x2000),  # UNKNOWN_83
-        84: (0x6000, 0x0180, 0x2000),  # UNKNOWN_84
-        85: (0x6000, 0x0180, 0x2000),  # UNKNOWN_85
-        86: (0x6000, 0x0001, 0x0000),  # UNKNOWN_86
-        87: (0x1000, 0x0000, 0x8408),  # PROGRAMMABLE_BALL
-        88: (0x6600, 0x0000, 0x0000),  # UNKNOWN_88
-        89: (0x6600, 0x0005, 0x0008),  # UNKNOWN_89
-        90: (0x6200, 0x0005, 0x0008),  # UNKNOWN_90
-        91: (0x6600, 0x0000, 0x8009),  # UNKNOWN_91
-        92: (0x6600, 0x0000, 0x8009),  # GREEN_LASER
-        93: (0x6600, 0x0000, 0x8009),  # BLUE_LASER
-        94: (0x6600, 0x0000, 0x0008),  # ANGLED_MIRROR
-        95: (0x6600, 0x0000, 0x0008),  # LASER_MIXER
-        96: (0x6000, 0x0000, 0x040a),  # LASER_ACTIVATED_PLUG
-        97: (0x6000, 0x0180, 0x0000),  # LARGE_PIPES
-        98: (0x6000, 0x0000, 0x0000),  # T_CONNECTOR
-        99: (0x6600, 0x0080, 0x0000),  # GRASS_INCLINE
-        100: (0x6600, 0x0080, 0x0000),  # LOG_INCLINE
-        101: (0x6600, 0x0080, 0x0000),  # GRANITE_INCLINE
-        102: (0x6600, 0x0080, 0x0000),  # BRICK_INCLINE
-        103: (0x6000, 0x0000, 0x0000),  # ARCHWAY
-        104: (0x6000, 0x0000, 0x0000),  # WOODEN_BARRIER
-        105: (0x6000, 0x0000, 0x0000),  # SCAFFOLD_BARRIER
-        106: (0x6000, 0x0000, 0x0000),  # LATTICE_ARCHWAY
-        107: (0x6000, 0x0000, 0x8009),  # ELECTRIC_MIXER
-        108: (0x1000, 0x0004, 0x8408),  # LEAKY_BUCKET
-        109: (0x1400, 0x0000, 0x8008),  # BLIMP
-        116: (0x6400, 0x0000, 0x0008),  # UNKNOWN_116
-        117: (0x6600, 0x0000, 0x8008),  # UNKNOWN_117
-        118: (0x6200, 0x0180, 0x2000),  # UNKNOWN_118
-        119: (0x6600, 0x0000, 0x8000),  # UNKNOWN_119
-        120: (0x6000, 0x0000, 0x000a),  # UNKNOWN_120
-        125: (0x6000, 0x0180, 0x2000),  # UNKNOWN_125
-        126: (0x6600, 0x0080, 0x0000),  # UNKNOWN_126
-        136: (0x6000, 0x0000, 0x8408),  # MESSAGE_COMPUTER
-        137: (0x6400, 0x0000, 0x8408),  # UNKNOWN_137
-        138: (0x1000, 0x0000, 0x800c),  # CANDLE
-        139: (0x6400, 0x000c, 0x0000),  # TEETER_TOTTER
-        148: (0x6000, 0x0000, 0x8008),  # LASER_DETECTOR
-    }
-    
-    # Default flags for unknown parts: fixed, no special flags
-    return flags_map.get(part_type, (0x6000, 0x0000, 0x0008))
+    if part_type < len(DEFAULT_PART_FLAGS):
+        return DEFAULT_PART_FLAGS[part_type]
+    return FALLBACK_PART_FLAGS
+
+
+# Default sizes (width_1, height_1, width_2, height_2) extracted from ALL_ITEMS.TIM
+_DEFAULT_SIZES_MAP = {
+    0: (32, 32, 32, 32),
+    1: (32, 16, 32, 16),
+    2: (32, 32, 32, 32),
+    3: (80, 39, 80, 39),
+    4: (40, 51, 40, 51),
+    5: (48, 16, 48, 16),
+    6: (48, 32, 49, 33),
+    7: (24, 22, 24, 22),
+    9: (32, 32, 32, 32),
+    11: (64, 62, 64, 62),
+    12: (45, 42, 39, 42),
+    13: (33, 32, 33, 32),
+    14: (40, 35, 32, 32),
+    15: (67, 51, 64, 51),
+    16: (48, 51, 46, 51),
+    17: (40, 49, 37, 49),
+    18: (80, 61, 101, 78),
+    19: (53, 15, 53, 15),
+    21: (32, 32, 32, 32),
+    22: (35, 37, 30, 37),
+    23: (32, 15, 30, 15),
+    24: (32, 46, 27, 46),
+    25: (48, 21, 46, 21),
+    26: (81, 34, 81, 34),
+    27: (70, 44, 65, 44),
+    28: (24, 18, 18, 18),
+    29: (28, 65, 24, 65),
+    30: (24, 40, 18, 40),
+    31: (106, 79, 101, 79),
+    35: (56, 39, 53, 39),
+    36: (32, 85, 84, 84),
+    37: (61, 36, 55, 36),
+    38: (72, 32, 71, 32),
+    39: (56, 27, 49, 27),
+    40: (56, 55, 50, 55),
+    42: (24, 20, 20, 20),
+    43: (24, 23, 23, 23),
+    44: (16, 15, 15, 15),
+    45: (56, 29, 51, 29),
+    46: (32, 16, 32, 16),
+    47: (32, 32, 32, 32),
+    48: (32, 16, 32, 16),
+    50: (70, 54, 66, 54),
+    51: (65, 33, 59, 33),
+    52: (32, 18, 31, 18),
+    53: (24, 24, 24, 24),
+    54: (24, 26, 20, 26),
+    55: (62, 48, 60, 48),
+    56: (32, 16, 32, 16),
+    57: (72, 64, 72, 64),
+    58: (48, 64, 48, 64),
+    59: (24, 23, 23, 23),
+    60: (32, 16, 32, 16),
+    61: (100, 16, 94, 16),
+    62: (40, 41, 38, 41),
+    63: (24, 23, 23, 23),
+    64: (48, 41, 41, 41),
+    66: (24, 21, 19, 21),
+    67: (43, 51, 37, 51),
+    68: (32, 32, 32, 32),
+    69: (48, 16, 48, 16),
+    70: (32, 95, 96, 96),
+    71: (50, 32, 50, 32),
+    73: (53, 49, 48, 49),
+    74: (16, 29, 10, 29),
+    75: (43, 23, 36, 23),
+    77: (61, 33, 56, 33),
+    78: (48, 34, 46, 34),
+    79: (40, 83, 34, 83),
+    80: (26, 86, 23, 86),
+    81: (48, 35, 44, 35),
+    82: (32, 16, 32, 16),
+    83: (32, 16, 32, 16),
+    84: (32, 16, 32, 16),
+    85: (32, 16, 32, 16),
+    86: (24, 17, 16, 16),
+    87: (32, 27, 27, 27),
+    88: (40, 48, 40, 48),
+    89: (88, 49, 83, 49),
+    90: (24, 69, 22, 69),
+    91: (48, 18, 51, 51),
+    92: (48, 18, 51, 51),
+    93: (48, 18, 51, 51),
+    94: (24, 23, 23, 23),
+    95: (40, 40, 40, 40),
+    96: (32, 32, 32, 32),
+    97: (48, 38, 48, 38),
+    98: (80, 80, 80, 80),
+    99: (32, 32, 32, 32),
+    100: (32, 32, 32, 32),
+    101: (32, 32, 32, 32),
+    102: (32, 32, 32, 32),
+    103: (64, 64, 64, 64),
+    104: (64, 64, 64, 64),
+    105: (64, 64, 64, 64),
+    106: (64, 64, 64, 64),
+    107: (56, 55, 49, 55),
+    108: (40, 50, 35, 50),
+    109: (56, 36, 53, 36),
+    116: (48, 41, 45, 41),
+    117: (48, 9, 78, 78),
+    118: (32, 32, 32, 32),
+    119: (64, 64, 64, 64),
+    120: (32, 32, 25, 32),
+    125: (32, 16, 32, 16),
+    126: (32, 32, 32, 32),
+    136: (48, 43, 46, 43),
+    137: (50, 40, 49, 40),
+    138: (24, 33, 24, 33),
+    139: (88, 40, 81, 40),
+    148: (40, 32, 37, 32),
+}
+FALLBACK_PART_SIZE = (0x20, 0x20, 0x20, 0x20)
+
+# Default size of every part type, indexed by part type value
+DEFAULT_PART_SIZES: tuple[tuple[int, int, int, int], ...] = tuple(
+    _DEFAULT_SIZES_MAP.get(part_type, FALLBACK_PART_SIZE) for part_type in range(max(_DEFAULT_SIZES_MAP) + 1))
 
 
 def get_default_part_size(part_type: PartType) -> tuple[int, int, int, int]:
     """Get default size for a part type (width_1, height_1, width_2, height_2)"""
-    # Default sizes extracted from ALL_ITEMS.TIM
-    size_map = {
-        0: (32, 32, 32, 32),
-        1: (32, 16, 32, 16),
-        2: (32, 32, 32, 32),
-        3: (80, 39, 80, 39),
-        4: (40, 51, 40, 51),
-        5: (48, 16, 48, 16),
-        6: (48, 32, 49, 33),
-        7: (24, 22, 24, 22),
-        9: (32, 32, 32, 32),
-        11: (64, 62, 64, 62),
-        12: (45, 42, 39, 42),
-        13: (33, 32, 33, 32),
-        14: (40, 35, 32, 32),
-        15: (67, 51, 64, 51),
-        16: (48, 51, 46, 51),
-        17: (40, 49, 37, 49),
-        18: (80, 61, 101, 78),
-        19: (53, 15, 53, 15),
-        21: (32, 32, 32, 32),
-        22: (35, 37, 30, 37),
-        23: (32, 15, 30, 15),
-        24: (32, 46, 27, 46),
-        25: (48, 21, 46, 21),
-        26: (81, 34, 81, 34),
-        27: (70, 44, 65, 44),
-        28: (24, 18, 18, 18),
-        29: (28, 65, 24, 65),
-        30: (24, 40, 18, 40),
-        31: (106, 79, 101, 79),
-        35: (56, 39, 53, 39),
-        36: (32, 85, 84, 84),
-        37: (61, 36, 55, 36),
-        38: (72, 32, 71, 32),
-        39: (56, 27, 49, 27),
-        40: (56, 55, 50, 55),
-        42: (24, 20, 20, 20),
-        43: (24, 23, 23, 23),
-        44: (16, 15, 15, 15),
-        45: (56, 29, 51, 29),
-        46: (32, 16, 32, 16),
-        47: (32, 32, 32, 32),
-        48: (32, 16, 32, 16),
-        50: (70, 54, 66, 54),
-        51: (65, 33, 59, 33),
-        52: (32, 18, 31, 18),
-        53: (24, 24, 24, 24),
-        54: (24, 26, 20, 26),
-        55: (62, 48, 60, 48),
-        56: (32, 16, 32, 16),
-        57: (72, 64, 72, 64),
-        58: (48, 64, 48, 64),
-        59: (24, 23, 23, 23),
-        60: (32, 16, 32, 16),
-        61: (100, 16, 94, 16),
-        62: (40, 41, 38, 41),
-        63: (24, 23, 23, 23),
-        64: (48, 41, 41, 41),
-        66: (24, 21, 19, 21),
-        67: (43, 51, 37, 51),
-        68: (32, 32, 32, 32),
-        69: (48, 16, 48, 16),
-        70: (32, 95, 96, 96),
-        71: (50, 32, 50, 32),
-        73: (53, 49, 48, 49),
-        74: (16, 29, 10, 29),
-        75: (43, 23, 36, 23),
-        77: (61, 33, 56, 33),
-        78: (48, 34, 46, 34),
-        79: (40, 83, 34, 83),
-        80: (26, 86, 23, 86),
-        81: (48, 35, 44, 35),
-        82: (32, 16, 32, 16),
-        83: (32, 16, 32, 16),
-        84: (32, 16, 32, 16),
-        85: (32, 16, 32, 16),
-        86: (24, 17, 16, 16),
-        87: (32, 27, 27, 27),
-        88: (40, 48, 40, 48),
-        89: (88, 49, 83, 49),
-        90: (24, 69, 22, 69),
-        91: (48, 18, 51, 51),
-        92: (48, 18, 51, 51),
-        93: (48, 18, 51, 51),
-        94: (24, 23, 23, 23),
-        95: (40, 40, 40, 40),
-        96: (32, 32, 32, 32),
-        97: (48, 38, 48, 38),
-        98: (80, 80, 80, 80),
-        99: (32, 32, 32, 32),
-        100: (32, 32, 32, 32),
-        101: (32, 32, 32, 32),
-        102: (32, 32, 32, 32),
-        103: (64, 64, 64, 64),
-        104: (64, 64, 64, 64),
-        105: (64, 64, 64, 64),
-        106: (64, 64, 64, 64),
-        107: (56, 55, 49, 55),
-        108: (40, 50, 35, 50),
-        109: (56, 36, 53, 36),
-        116: (48, 41, 45, 41),
-        117: (48, 9, 78, 78),
-        118: (32, 32, 32, 32),
-        119: (64, 64, 64, 64),
-        120: (32, 32, 25, 32),
-        125: (32, 16, 32, 16),
-        126: (32, 32, 32, 32),
-        136: (48, 43, 46, 43),
-        137: (50, 40, 49, 40),
-        138: (24, 33, 24, 33),
-        139: (88, 40, 81, 40),
-        148: (40, 32, 37, 32),
-    }
-    
-    return size_map.get(part_type, (0x20, 0x20, 0x20, 0x20))
+    if part_type < len(DEFAULT_PART_SIZES):
+        return DEFAULT_PART_SIZES[part_type]
+    return FALLBACK_PART_SIZE
 
 
-@dataclass
+# Binary layouts of the part records as (field name, struct format code) pairs.
+# Every record type is described exactly once here; RecordLayout compiles the
+# tables into struct.Struct objects that are shared by encoding, decoding,
+# file size calculation and the JSON mappers.
+PART_HEADER_FIELDS = (  # 28 bytes, common to all record types
+    ('part_type', 'H'),
+    ('flags_1', 'H'),
+    ('flags_2', 'H'),
+    ('flags_3', 'H'),
+    ('appearance', 'H'),
+    ('unknown_10', 'H'),
+    ('width_1', 'H'),
+    ('height_1', 'H'),
+    ('width_2', 'H'),
+    ('height_2', 'H'),
+    ('pos_x', 'h'),
+    ('pos_y', 'h'),
+    ('behavior', 'H'),
+    ('unknown_26', 'H'),
+)
+
+PART_CONNECTION_FIELDS = (  # 12 bytes
+    ('belt_connect_pos_x', 'B'),
+    ('belt_connect_pos_y', 'B'),
+    ('belt_line_distance', 'H'),
+    ('unknown_32', 'H'),
+    ('rope_1_connect_pos_x', 'B'),
+    ('rope_1_connect_pos_y', 'B'),
+    ('unknown_36', 'H'),
+    ('rope_2_connect_pos_x', 'B'),
+    ('rope_2_connect_pos_y', 'B'),
+)
+
+PART_LINK_FIELDS = (  # 8 bytes
+    ('connected_1', 'h'),
+    ('connected_2', 'h'),
+    ('outlet_plugged_1', 'h'),
+    ('outlet_plugged_2', 'h'),
+)
+
+PART_FIELDS = PART_HEADER_FIELDS + PART_CONNECTION_FIELDS + PART_LINK_FIELDS  # 48 bytes
+
+# Belts replace the connection block with their own 16 bytes
+BELT_FIELDS = PART_HEADER_FIELDS + (
+    ('BASEBALL', 'H'),
+    ('unknown_30', 'H'),
+    ('belt_connected_part_1', 'h'),
+    ('belt_connected_part_2', 'h'),
+    ('unknown_36_belt', 'H'),
+    ('unknown_38', 'H'),
+    ('unknown_40', 'H'),
+    ('NEWTON_MOUSE', 'H'),
+) + PART_LINK_FIELDS  # 52 bytes
+
+ROPE_FIELDS = PART_FIELDS + (
+    ('rope_segment_length', 'H'),
+    ('BASEBALL', 'H'),
+    ('unknown_30', 'H'),
+)  # 54 bytes
+
+PULLEY_FIELDS = PART_FIELDS + (
+    ('BASEBALL', 'H'),
+    ('unknown_30', 'H'),
+    ('unknown_32_pulley', 'H'),
+    ('rope_index', 'h'),
+)  # 56 bytes
+
+PROGRAMMABLE_BALL_FIELDS = PART_FIELDS + (
+    ('density', 'H'),
+    ('elasticity', 'H'),
+    ('friction', 'H'),
+    ('gravity_buoyancy', 'H'),
+    ('mass', 'H'),
+    ('appearance_2', 'H'),
+)  # 60 bytes
+
+
+@dataclass(slots=True)
 class Part:
     """Base class for normal parts (48 bytes)"""
     part_type: PartType
@@ -475,129 +643,22 @@ class Part:
     outlet_plugged_2: int = -1
 
     def to_bytes(self) -> bytes:
-        """Pack the part data into 48 bytes"""
-        return struct.pack(
-            '<HHHHHHHHHHhhHHBBHHBBHBBhhhh',
-            self.part_type, self.flags_1, self.flags_2, self.flags_3,
-            self.appearance, self.unknown_10,
-            self.width_1, self.height_1, self.width_2, self.height_2,
-            self.pos_x, self.pos_y,
-            self.behavior, self.unknown_26,
-            self.belt_connect_pos_x, self.belt_connect_pos_y,
-            self.belt_line_distance, self.unknown_32,
-            self.rope_1_connect_pos_x, self.rope_1_connect_pos_y,
-            self.unknown_36,
-            self.rope_2_connect_pos_x, self.rope_2_connect_pos_y,
-            self.connected_1, self.connected_2,
-            self.outlet_plugged_1, self.outlet_plugged_2
-        )
+        """Pack the part data using the record layout of its class"""
+        return LAYOUTS_BY_CLASS[type(self)].pack(self)
+
+    def pack_into(self, buffer, offset: int) -> int:
+        """Pack the part data directly into buffer at offset, returns the offset after the record"""
+        layout = LAYOUTS_BY_CLASS[type(self)]
+        layout.pack_into(self, buffer, offset)
+        return offset + layout.size
 
     @classmethod
     def from_bytes(cls, data: bytes, offset: int = 0) -> 'Part':
-        """Unpack 48 bytes into a Part object"""
-        values = struct.unpack_from('<HHHHHHHHHHhhHHBBHHBBHBBhhhh', data, offset)
-        return cls(
-            part_type=PartType(values[0]),
-            flags_1=values[1],
-            flags_2=values[2],
-            flags_3=values[3],
-            appearance=values[4],
-            unknown_10=values[5],
-            width_1=values[6],
-            height_1=values[7],
-            width_2=values[8],
-            height_2=values[9],
-            pos_x=values[10],
-            pos_y=values[11],
-            behavior=values[12],
-            unknown_26=values[13],
-            belt_connect_pos_x=values[14],
-            belt_connect_pos_y=values[15],
-            belt_line_distance=values[16],
-            unknown_32=values[17],
-            rope_1_connect_pos_x=values[18],
-            rope_1_connect_pos_y=values[19],
-            unknown_36=values[20],
-            rope_2_connect_pos_x=values[21],
-            rope_2_connect_pos_y=values[22],
-            connected_1=values[23],
-            connected_2=values[24],
-            outlet_plugged_1=values[25],
-            outlet_plugged_2=values[26],
-        )
-
-
-def parse_part_from_bytes(data: bytes, offset: int) -> tuple[Part, int]:
-    """
-    Parse a part from bytes, automatically detecting the part type and size.
-    Returns (part, bytes_consumed).
-    """
-    # Peek at the part type
-    part_type_value = struct.unpack_from('<H', data, offset)[0]
-    
-    # Determine the size based on part type
-    if part_type_value == PartType.BELT:
-        # Parse as Belt (52 bytes)
-        base = Part.from_bytes(data, offset)
-        extra = struct.unpack_from('<HHhhhhhh', data, offset + 48)
-        return Belt(
-            **base.__dict__,
-            BASEBALL=extra[0],
-            unknown_30=extra[1],
-            belt_connected_part_1=extra[2],
-            belt_connected_part_2=extra[3],
-            unknown_36_belt=extra[4],
-            unknown_38=extra[5],
-            unknown_40=extra[6],
-            NEWTON_MOUSE=extra[7],
-        ), 52
-    elif part_type_value == PartType.ROPE:
-        # Parse as Rope (54 bytes)
-        base = Part.from_bytes(data, offset)
-        extra = struct.unpack_from('<HHHHhhHHHH', data, offset + 48)
-        return Rope(
-            **base.__dict__,
-            rope_segment_length=extra[0],
-            BASEBALL=extra[1],
-            unknown_30=extra[2],
-            unknown_32_rope=extra[3],
-            rope_connected_part_1=extra[4],
-            rope_connected_part_2=extra[5],
-            part_1_connect_field_usage=extra[6],
-            part_2_connect_field_usage=extra[7],
-            TENNIS_BALL=extra[8],
-            unknown_46=extra[9],
-        ), 54
-    elif part_type_value == PartType.PULLEY:
-        # Parse as Pulley (56 bytes)
-        base = Part.from_bytes(data, offset)
-        extra = struct.unpack_from('<HHHh', data, offset + 48)
-        return Pulley(
-            **base.__dict__,
-            BASEBALL=extra[0],
-            unknown_30=extra[1],
-            unknown_32_pulley=extra[2],
-            rope_index=extra[3],
-        ), 56
-    elif part_type_value == PartType.PROGRAMMABLE_BALL:
-        # Parse as ProgrammableBall (60 bytes)
-        base = Part.from_bytes(data, offset)
-        extra = struct.unpack_from('<HHHHHH', data, offset + 48)
-        return ProgrammableBall(
-            **base.__dict__,
-            density=extra[0],
-            elasticity=extra[1],
-            friction=extra[2],
-            gravity_buoyancy=extra[3],
-            mass=extra[4],
-            appearance_2=extra[5],
-        ), 60
-    else:
-        # Parse as regular Part (48 bytes)
-        return Part.from_bytes(data, offset), 48
+        """Unpack a record of this class from data at offset"""
+        return LAYOUTS_BY_CLASS[cls].unpack_from(data, offset)
 
 
-@dataclass
+@dataclass(slots=True)
 class Belt(Part):
     """Belt part (52 bytes)"""
     BASEBALL: int = 0
@@ -609,33 +670,14 @@ class Belt(Part):
     unknown_40: int = 0
     NEWTON_MOUSE: int = 0
 
-    def to_bytes(self) -> bytes:
-        """Pack the belt data into 52 bytes"""
-        base = struct.pack(
-            '<HHHHHHHHHHhhHHHHhhHHHH',
-            self.part_type, self.flags_1, self.flags_2, self.flags_3,
-            self.appearance, self.unknown_10,
-            self.width_1, self.height_1, self.width_2, self.height_2,
-            self.pos_x, self.pos_y,
-            self.behavior, self.unknown_26,
-            self.BASEBALL, self.unknown_30,
-            self.belt_connected_part_1, self.belt_connected_part_2,
-            self.unknown_36_belt, self.unknown_38, self.unknown_40, self.NEWTON_MOUSE
-        )
-        # Add the standard ending fields
-        ending = struct.pack('<hhhh', 
-            self.connected_1, self.connected_2,
-            self.outlet_plugged_1, self.outlet_plugged_2
-        )
-        return base + ending
-
 
-@dataclass
+@dataclass(slots=True)
 class Rope(Part):
     """Rope part (54 bytes)"""
     rope_segment_length: int = 0
     BASEBALL: int = 0
     unknown_30: int = 0
+    # Not stored in the 54-byte record, only carried through JSON
     unknown_32_rope: int = 1
     rope_connected_part_1: int = -1
     rope_connected_part_2: int = -1
@@ -644,34 +686,8 @@ class Rope(Part):
     TENNIS_BALL: int = 0
     unknown_46: int = 0
 
-    def to_bytes(self) -> bytes:
-        """Pack the rope data into 54 bytes"""
-        # First 48 bytes using base Part structure
-        base = struct.pack(
-            '<HHHHHHHHHHhhHHBBHHBBHBBhhhh',
-            self.part_type, self.flags_1, self.flags_2, self.flags_3,
-            self.appearance, self.unknown_10,
-            self.width_1, self.height_1, self.width_2, self.height_2,
-            self.pos_x, self.pos_y,
-            self.behavior, self.unknown_26,
-            self.belt_connect_pos_x, self.belt_connect_pos_y,
-            self.belt_line_distance, self.unknown_32,
-            self.rope_1_connect_pos_x, self.rope_1_connect_pos_y,
-            self.unknown_36,
-            self.rope_2_connect_pos_x, self.rope_2_connect_pos_y,
-            self.connected_1, self.connected_2,
-            self.outlet_plugged_1, self.outlet_plugged_2
-        )
-        # Extra 6 bytes specific to Rope: 3 H values
-        extra = struct.pack('<HHH',
-            self.rope_segment_length,
-            self.BASEBALL,
-            self.unknown_30
-        )
-        return base + extra
-
 
-@dataclass
+@dataclass(slots=True)
 class Pulley(Part):
     """Pulley part (56 bytes: 48 base + 8 extra)"""
     BASEBALL: int = 0
@@ -679,35 +695,8 @@ class Pulley(Part):
     unknown_32_pulley: int = 1
     rope_index: int = -1
 
-    def to_bytes(self) -> bytes:
-        """Pack the pulley data into 56 bytes"""
-        # First 48 bytes using base Part structure
-        base = struct.pack(
-            '<HHHHHHHHHHhhHHBBHHBBHBBhhhh',
-            self.part_type, self.flags_1, self.flags_2, self.flags_3,
-            self.appearance, self.unknown_10,
-            self.width_1, self.height_1, self.width_2, self.height_2,
-            self.pos_x, self.pos_y,
-            self.behavior, self.unknown_26,
-            self.belt_connect_pos_x, self.belt_connect_pos_y,
-            self.belt_line_distance, self.unknown_32,
-            self.rope_1_connect_pos_x, self.rope_1_connect_pos_y,
-            self.unknown_36,
-            self.rope_2_connect_pos_x, self.rope_2_connect_pos_y,
-            self.connected_1, self.connected_2,
-            self.outlet_plugged_1, self.outlet_plugged_2
-        )
-        # Extra 8 bytes specific to Pulley: 4 H values
-        extra = struct.pack('<HHHh',
-            self.BASEBALL,
-            self.unknown_30,
-            self.unknown_32_pulley,
-            self.rope_index
-        )
-        return base + extra
-
 
-@dataclass
+@dataclass(slots=True)
 class ProgrammableBall(Part):
     """Programmable ball part (60 bytes)"""
     density: int = 2832
@@ -717,361 +706,1695 @@ class ProgrammableBall(Part):
     mass: int = 200
     appearance_2: int = 0
 
-    def to_bytes(self) -> bytes:
-        """Pack the programmable ball data into 60 bytes"""
-        base = super().to_bytes()
-        extra = struct.pack('<HHHHHH',
-            self.density, self.elasticity, self.friction,
-            self.gravity_buoyancy, self.mass, self.appearance_2
+
+class RecordLayout:
+    """
+    A part record type compiled from its field table.
+
+    The struct.Struct is built once, and the pack/pack_into/unpack functions are
+    generated once per layout so encoding and decoding a record is a single call
+    without per-field lookups. Dataclass fields that are not part of the record keep
+    their defaults when decoding. The optional JSON block lists
+    (attribute, key) pairs for the type-specific object emitted by
+    part_to_dict; values equal to the dataclass default are omitted unless
+    json_always is set.
+    """
+
+    def __init__(self, cls: type[Part], fields: tuple[tuple[str, str], ...],
+                 json_block: str | None = None, json_fields: tuple[tuple[str, str], ...] = (),
+                 json_always: bool = False):
+        self.cls = cls
+        self.fields = fields
+        self.names = tuple(name for name, _ in fields)
+        self.struct = struct.Struct('<' + ''.join(code for _, code in fields))
+        self.size = self.struct.size
+        # Offset in the record and struct of every field, to patch a single field in place
+        self.field_structs: dict[str, tuple[int, struct.Struct]] = {}
+        offset = 0
+        for name, code in fields:
+            field_struct = struct.Struct('<' + code)
+            self.field_structs[name] = (offset, field_struct)
+            offset += field_struct.size
+        self.json_block = json_block
+        self.json_always = json_always
+        defaults = {f.name: f.default for f in dataclass_fields(cls)}
+        self.json_fields = tuple((attr, key, defaults[attr]) for attr, key in json_fields)
+
+        # Constructor arguments in dataclass order, defaults for fields missing from the record
+        args = []
+        for name, default in defaults.items():
+            if name == 'part_type':
+                args.append('_part_types[part_type] if part_type in _part_types else _PartType(part_type)')
+            elif name in self.names:
+                args.append(name)
+            else:
+                args.append(repr(default))
+        namespace = {
+            '_cls': cls,
+            '_pack': self.struct.pack,
+            '_pack_into': self.struct.pack_into,
+            '_unpack_from': self.struct.unpack_from,
+            '_part_types': PART_TYPES_BY_VALUE,
+            '_PartType': PartType,
+        }
+        exec(
+            f"def pack(part):\n"
+            f"    return _pack({', '.join('part.' + name for name in self.names)})\n"
+            f"def pack_into(part, buffer, offset):\n"
+            f"    _pack_into(buffer, offset, {', '.join('part.' + name for name in self.names)})\n"
+            f"def unpack_from(data, offset=0):\n"
+            f"    {', '.join(self.names)}, = _unpack_from(data, offset)\n"
+            f"    return _cls({', '.join(args)})\n",
+            namespace,
         )
-        return base + extra
+        self.pack: Callable[[Part], bytes] = namespace['pack']
+        self.pack_into: Callable[[Part, bytearray, int], None] = namespace['pack_into']
+        self.unpack_from: Callable[..., Part] = namespace['unpack_from']
 
 
-def make_part(part_type: PartType, x: int = 0, y: int = 0, moving: bool = True) -> Part:
+PART_TYPES_BY_VALUE: dict[int, PartType] = {t.value: t for t in PartType}
+
+PART_LAYOUT = RecordLayout(Part, PART_FIELDS)
+BELT_LAYOUT = RecordLayout(Belt, BELT_FIELDS, 'belt_data', (
+    ('BASEBALL', 'BASEBALL'),
+    ('unknown_30', 'unknown_30'),
+    ('belt_connected_part_1', 'connected_part_1'),
+    ('belt_connected_part_2', 'connected_part_2'),
+    ('unknown_36_belt', 'unknown_36'),
+    ('unknown_38', 'unknown_38'),
+    ('unknown_40', 'unknown_40'),
+    ('NEWTON_MOUSE', 'NEWTON_MOUSE'),
+))
+ROPE_LAYOUT = RecordLayout(Rope, ROPE_FIELDS, 'rope_data', (
+    ('rope_segment_length', 'segment_length'),
+    ('BASEBALL', 'BASEBALL'),
+    ('unknown_30', 'unknown_30'),
+    ('unknown_32_rope', 'unknown_32'),
+    ('rope_connected_part_1', 'connected_part_1'),
+    ('rope_connected_part_2', 'connected_part_2'),
+    ('part_1_connect_field_usage', 'part_1_connect_field_usage'),
+    ('part_2_connect_field_usage', 'part_2_connect_field_usage'),
+    ('TENNIS_BALL', 'TENNIS_BALL'),
+    ('unknown_46', 'unknown_46'),
+))
+PULLEY_LAYOUT = RecordLayout(Pulley, PULLEY_FIELDS, 'pulley_data', (
+    ('BASEBALL', 'BASEBALL'),
+    ('unknown_30', 'unknown_30'),
+    ('unknown_32_pulley', 'unknown_32'),
+    ('rope_index', 'rope_index'),
+))
+PROGRAMMABLE_BALL_LAYOUT = RecordLayout(ProgrammableBall, PROGRAMMABLE_BALL_FIELDS, 'programmable_ball_data', (
+    ('density', 'density'),
+    ('elasticity', 'elasticity'),
+    ('friction', 'friction'),
+    ('gravity_buoyancy', 'gravity_buoyancy'),
+    ('mass', 'mass'),
+    ('appearance_2', 'appearance_2'),
+), json_always=True)
+
+LAYOUTS_BY_CLASS: dict[type, RecordLayout] = {
+    Part: PART_LAYOUT,
+    Belt: BELT_LAYOUT,
+    Rope: ROPE_LAYOUT,
+    Pulley: PULLEY_LAYOUT,
+    ProgrammableBall: PROGRAMMABLE_BALL_LAYOUT,
+}
+
+# Part types stored in a record other than the 48-byte normal part
+LAYOUTS_BY_PART_TYPE: dict[int, RecordLayout] = {
+    PartType.BELT: BELT_LAYOUT,
+    PartType.ROPE: ROPE_LAYOUT,
+    PartType.PULLEY: PULLEY_LAYOUT,
+    PartType.PROGRAMMABLE_BALL: PROGRAMMABLE_BALL_LAYOUT,
+}
+
+PART_TYPE_STRUCT = struct.Struct('<H')
+
+
+def get_part_layout(part_type: int) -> RecordLayout:
+    """Get the record layout used to store a part type"""
+    return LAYOUTS_BY_PART_TYPE.get(part_type, PART_LAYOUT)
+
+
+def parse_part_from_bytes(data: bytes, offset: int) -> tuple[Part, int]:
     """
-    Create a part with sensible defaults based on type.
-    
-    Args:
-        part_type: The type of part to create
-        x: X position (0-560 for TIM2)
-        y: Y position (0-377 for TIM2)
-        moving: Whether the part is affected by gravity (moving parts)
-    
-    Returns:
-        A Part object (or subclass) with appropriate defaults
+    Parse a part from bytes, automatically detecting the part type and size.
+    Returns (part, bytes_consumed).
     """
-    # Common defaults for TIM2
-    flags_1 = Flags1.MOVING_PART if moving else (Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2)
-    flags_2 = 0
-    flags_3 = Flags3.UNKNOWN_0x8  # Common flag for many parts
-    
-    if part_type == PartType.BOWLING_BALL:
-        return Part(
-            part_type=part_type,
-            flags_1=flags_1,
-            flags_2=flags_2,
-            flags_3=flags_3,
-            width_1=0x20, height_1=0x20,
-            width_2=0x20, height_2=0x20,
-            pos_x=x, pos_y=y,
-        )
-    
-    elif part_type == PartType.BASKETBALL:
-        return Part(
-            part_type=part_type,
-            flags_1=flags_1,
-            flags_2=flags_2,
-            flags_3=flags_3,
-            width_1=0x20, height_1=0x20,
-            width_2=0x20, height_2=0x20,
-            pos_x=x, pos_y=y,
-        )
-    
-    elif part_type == PartType.BELT:
-        return Belt(
-            part_type=part_type,
-            flags_1=Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2,
-            flags_2=0,
-            flags_3=Flags3.LOCKED if not moving else 0,
-            appearance=0,
-            pos_x=-1, pos_y=-1,
-            unknown_26=1,
-        )
-    
-    elif part_type == PartType.ROPE:
-        return Rope(
-            part_type=part_type,
-            flags_1=Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2,
-            flags_2=0,
-            flags_3=Flags3.LOCKED if not moving else 0,
-            appearance=0,
-            pos_x=-1, pos_y=-1,
-            unknown_32_rope=1,
-        )
-    
-    elif part_type == PartType.PULLEY:
-        return Pulley(
-            part_type=part_type,
-            flags_1=Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2,
-            flags_2=Flags2.ROPE_CAN_CONNECT,
-            flags_3=(Flags3.LOCKED | Flags3.UNKNOWN_0x8) if not moving else Flags3.UNKNOWN_0x8,
-            appearance=0,
-            width_1=0x20, height_1=0x20,
-            width_2=0x20, height_2=0x20,
-            pos_x=x, pos_y=y,
-            unknown_32_pulley=1,
-        )
-    
-    elif part_type == PartType.PROGRAMMABLE_BALL:
-        return ProgrammableBall(
-            part_type=part_type,
-            flags_1=flags_1,
-            flags_2=flags_2,
-            flags_3=flags_3 | Flags3.SHOW_PROGRAM_ICON,
-            width_1=0x20, height_1=0x20,
-            width_2=0x20, height_2=0x20,
-            pos_x=x, pos_y=y,
-        )
-    
-    else:
-        # Generic part with defaults
-        return Part(
-            part_type=part_type,
-            flags_1=flags_1,
-            flags_2=flags_2,
-            flags_3=flags_3,
-            width_1=0x20, height_1=0x20,
-            width_2=0x20, height_2=0x20,
-            pos_x=x, pos_y=y,
+    # Peek at the part type
+    part_type_value = PART_TYPE_STRUCT.unpack_from(data, offset)[0]
+    layout = LAYOUTS_BY_PART_TYPE.get(part_type_value, PART_LAYOUT)
+    return layout.unpack_from(data, offset), layout.size
+
+
+MAGIC_NUMBER = 0xEFAC1301
+PREAMBLE_STRUCT = struct.Struct('>IBB')  # Magic number and background
+GLOBAL_INFO_STRUCT = struct.Struct('<H56xhhHHHHHH')  # Hint count, skipped hint data, global puzzle info
+SOLUTION_CONDITION_STRUCT = struct.Struct('<hHHHhhhh')
+SOLUTION_SIZE = 2 + 8 * SOLUTION_CONDITION_STRUCT.size + 2
+
+
+def read_exact(fileobj, size: int) -> bytes:
+    """Read exactly size bytes from a stream, pipes and sockets may return less per read"""
+    data = fileobj.read(size)
+    while len(data) < size:
+        chunk = fileobj.read(size - len(data))
+        if not chunk:
+            raise EOFError(f"Unexpected end of stream, expected {size} bytes but got {len(data)}")
+        data += chunk
+    return data
+
+
+@dataclass
+class LevelHeader:
+    """Everything in a TIM file before the parts"""
+    magic: int
+    bg_unknown: int
+    bg_color: int
+    quiz_title: str
+    goal_description: str
+    num_hints: int
+    pressure: int
+    gravity: int
+    unknown_4: int
+    unknown_6: int
+    music: int
+    num_fixed: int
+    num_moving: int
+    unknown_14: int
+
+    @property
+    def num_parts(self) -> int:
+        return self.num_fixed + self.num_moving
+
+    @classmethod
+    def unpack_from(cls, data: bytes, offset: int = 0) -> tuple['LevelHeader', int]:
+        """Parse the header from data. Returns (header, offset of the first part)."""
+        magic, bg_unknown, bg_color = PREAMBLE_STRUCT.unpack_from(data, offset)
+        offset += PREAMBLE_STRUCT.size
+        title_end = data.find(b'\0', offset)
+        desc_end = data.find(b'\0', title_end + 1)
+        if title_end < 0 or desc_end < 0:
+            raise ValueError("Quiz title or goal description is not null-terminated")
+        header = cls(
+            magic, bg_unknown, bg_color,
+            bytes(data[offset:title_end]).decode('latin-1'),
+            bytes(data[title_end + 1:desc_end]).decode('latin-1'),
+            *GLOBAL_INFO_STRUCT.unpack_from(data, desc_end + 1),
         )
+        return header, desc_end + 1 + GLOBAL_INFO_STRUCT.size
 
+    @classmethod
+    def read(cls, fileobj) -> 'LevelHeader':
+        """Read the header from a binary stream, consuming exactly its bytes"""
+        magic, bg_unknown, bg_color = PREAMBLE_STRUCT.unpack(read_exact(fileobj, PREAMBLE_STRUCT.size))
+        strings = []
+        for _ in range(2):
+            chars = bytearray()
+            while (char := read_exact(fileobj, 1)) != b'\0':
+                chars += char
+            strings.append(chars.decode('latin-1'))
+        return cls(magic, bg_unknown, bg_color, *strings,
+                   *GLOBAL_INFO_STRUCT.unpack(read_exact(fileobj, GLOBAL_INFO_STRUCT.size)))
 
-def insert_bowlingball(buffer, offset, x, y) -> int:
-    """Legacy function - creates a bowling ball part using the new data structures"""
-    assert 0 <= x <= 560
-    assert 0 <= y <= 377
-    
-    ball = make_part(PartType.BOWLING_BALL, x, y, moving=True)
-    buffer[offset:offset+48] = ball.to_bytes()
-    return offset + 48
 
-def calculate_filesize(title_length: int, description_length: int, num_normal_parts: int, num_belts: int, num_ropes: int, num_pulleys: int, num_programmable_balls: int) -> int:
-    '''
-    Returns the expected file size. Note that no hints are allowed currently.
+@dataclass
+class LevelSolution:
+    """Solution information at the end of a TIM file (132 bytes)"""
+    num_conditions: int
+    conditions: list[tuple[int, ...]]  # All 8 slots: (part_index, state_1, state_2, count, x, y, width, height)
+    delay: int
 
-    Title and description must be null-terminated and \0 included in their length.
-    '''
-    elements = {
-        'magic': 4,
-        'color': 2,
-        'title': title_length,
-        'description': description_length,
-        'hints': 2 + 7 * 8, #2 byte num hints, (7 byte per empty hint (x_u16,y_u16,flip_u16,text\0)), 8 hints even if empty
-        'global_puzzle_info': 16,
-        'normal_parts': num_normal_parts * 48,
-        'belts': num_belts * 52,
-        'ropes': num_ropes * 54,
-        'pulleys': num_pulleys * 56,
-        'programmable_balls': num_programmable_balls * 60,
-        'puzzle_solution_information': 132,
-    }
-    return sum(elements.values())
+    @classmethod
+    def unpack_from(cls, data: bytes, offset: int = 0) -> 'LevelSolution':
+        num_conditions = struct.unpack_from('<H', data, offset)[0]
+        conditions = [SOLUTION_CONDITION_STRUCT.unpack_from(data, offset + 2 + SOLUTION_CONDITION_STRUCT.size * i)
+                      for i in range(8)]
+        delay = struct.unpack_from('<H', data, offset + SOLUTION_SIZE - 2)[0]
+        return cls(num_conditions, conditions, delay)
 
-def calculate_num_parts(normal_parts: list, belts: list, ropes: list, pulleys: list) -> tuple[int,int]:
-    # TODO: actually parse them to check moving flags
-    num_fixed_parts = len(belts) + len(ropes) + len(pulleys)
-    num_moving_parts = len(normal_parts)
-    return num_fixed_parts, num_moving_parts
-    
-def make_buffer(color: int, music: int, quiz_title: bytes, goal_description: bytes, normal_parts: list, belts: list, ropes: list, pulleys: list) -> bytearray:
-    assert 0 <= color <= 16
-    assert 1000 <= music <= 1023
+    @classmethod
+    def read(cls, fileobj) -> 'LevelSolution':
+        return cls.unpack_from(read_exact(fileobj, SOLUTION_SIZE))
 
-    quiz_title_len=len(quiz_title)
-    goal_description_len=len(goal_description)
-    num_fixed_parts, num_moving_parts = calculate_num_parts(normal_parts, belts, ropes, pulleys)
-    filesize = calculate_filesize(quiz_title_len, goal_description_len, len(normal_parts), len(belts), len(ropes), len(pulleys), 0)
-    buffer=bytearray(filesize)
-    offset=0
-
-    #Magic number
-    struct.pack_into('>I', buffer, offset, 0xEFAC1301)
-    offset+=4
-
-    #Background
-    struct.pack_into('>BB', buffer, offset, 0, color)
-    offset+=2
-
-    #Quiz title
-    struct.pack_into(f'<{quiz_title_len}s', buffer, offset, quiz_title)
-    offset+=quiz_title_len
-
-    #Goal description
-    struct.pack_into(f'<{goal_description_len}s', buffer, offset, goal_description)
-    offset+=goal_description_len
-
-    #Hints. 2 byte num hints, (7 byte per empty hint (x_u16,y_u16,flip_u16,text\0)), 8 hints even if empty
-    hints_bytes_skip=2+7*8
-    offset+=hints_bytes_skip
-
-    #Global puzzle information
-    pressure_i16 = 67
-    gravity_i16 = 272
-    unknown_4_u16 = unknown_6_u16 = 0
-    music_u16 = music #1000-1023
-    num_parts_fixed_u16 = num_fixed_parts
-    num_parts_moving_u16 = num_moving_parts
-    unknown_14_u16 = 0
-    struct.pack_into('<hhHHHHHH', buffer, offset, pressure_i16, gravity_i16, unknown_4_u16, unknown_6_u16, music_u16, num_parts_fixed_u16, num_parts_moving_u16, unknown_14_u16)
-    offset+=16
-
-    #Basket Ball
-    for i in range(num_moving_parts):
-        num_rounds = 3
-        angle = i / num_moving_parts * 2 * math.pi * num_rounds
-        radius_min = 20
-        radius_max = 150
-        center_x = 300
-        center_y = 150
-        radius = int(radius_min + (radius_max - radius_min) * (i / num_moving_parts))
-        x = int(center_x + radius * math.cos(angle))
-        y = int(center_y + radius * math.sin(angle))
-        match i % 4:
-            case 0:
-                part_type = PartType.BOWLING_BALL
-            case 1:
-                part_type = PartType.BASKETBALL
-            case 2:
-                part_type = PartType.POOL_BALL
-            case _:
-                part_type = PartType.SUPER_BALL
-        ball = make_part(part_type, x, y, moving=True)
-        ball_bytes = ball.to_bytes()
-        buffer[offset:offset+len(ball_bytes)] = ball_bytes
-        offset += len(ball_bytes)
-
-    #Solution Information (132 bytes) u16 num, 8 entries * 16 byte each
-    num_solution_conditions_u16 = 0
-    struct.pack_into('<H', buffer, offset, num_solution_conditions_u16)
-    offset+=2
-    for _ in range(8):
-        part_index_i16 = -1
-        part_state_1_u16 = 0
-        part_state_2_u16 = 0
-        part_count_u16 = 0
-        position_rect_x_i16 = 0
-        position_rect_y_i16 = 0
-        position_rect_width_i16 = 0
-        position_rect_height_i16 = 0
-        struct.pack_into('<hHHHhhhh', buffer, offset, part_index_i16, part_state_1_u16, part_state_2_u16, part_count_u16, position_rect_x_i16, position_rect_y_i16, position_rect_width_i16, position_rect_height_i16)
-        offset+=16
-    delay_u16 = 0
-    struct.pack_into('<H', buffer, offset, delay_u16)
-    offset+=2
 
-    assert offset == len(buffer), f'{offset}, {len(buffer)}'
+def find_parts_block(data: bytes) -> tuple[int, int]:
+    """Locate the parts in TIM file data. Returns (offset, number of parts)."""
+    header, offset = LevelHeader.unpack_from(data)
+    return offset, header.num_parts
 
-    return buffer
-    
 
-def flags1_to_list(flags: int) -> list[str]:
-    """Convert Flags1 to list of flag names"""
-    result = []
-    if flags & Flags1.UNKNOWN_0x40:
-        result.append("UNKNOWN_0x40")
-    if flags & Flags1.CAN_FLIP_VERTICAL:
-        result.append("CAN_FLIP_VERTICAL")
-    if flags & Flags1.CAN_FLIP_HORIZONTAL:
-        result.append("CAN_FLIP_HORIZONTAL")
-    if flags & Flags1.MOVING_PART:
-        result.append("MOVING_PART")
-    if flags & Flags1.FIXED_PART_1:
-        result.append("FIXED_PART_1")
-    if flags & Flags1.FIXED_PART_2:
-        result.append("FIXED_PART_2")
-    return result
+@dataclass
+class Level:
+    """A fully decoded TIM file"""
+    header: LevelHeader
+    parts: list[Part]
+    solution: LevelSolution
+    file_size: int  # Bytes in the file
+    parsed_size: int  # Bytes covered by the header, parts and solution
 
-def flags2_to_list(flags: int) -> list[str]:
-    """Convert Flags2 to list of flag names"""
-    result = []
-    if flags & Flags2.BELT_CAN_CONNECT:
-        result.append("BELT_CAN_CONNECT")
-    if flags & Flags2.BELT_IS_CONNECTED:
-        result.append("BELT_IS_CONNECTED")
-    if flags & Flags2.ROPE_CAN_CONNECT:
-        result.append("ROPE_CAN_CONNECT")
-    if flags & Flags2.ROPE_CAN_CONNECT_2:
-        result.append("ROPE_CAN_CONNECT_2")
-    if flags & Flags2.SPRITE_FLIP_HORIZONTAL:
-        result.append("SPRITE_FLIP_HORIZONTAL")
-    if flags & Flags2.SPRITE_FLIP_VERTICAL:
-        result.append("SPRITE_FLIP_VERTICAL")
-    if flags & Flags2.PROBABLY_UNUSED:
-        result.append("PROBABLY_UNUSED")
-    if flags & Flags2.CAN_STRETCH_ONE_DIR:
-        result.append("CAN_STRETCH_ONE_DIR")
-    if flags & Flags2.CAN_STRETCH_BOTH:
-        result.append("CAN_STRETCH_BOTH")
-    return result
 
-def flags3_to_list(flags: int) -> list[str]:
-    """Convert Flags3 to list of flag names"""
-    result = []
-    if flags & Flags3.CAN_PLUG_OUTLET:
-        result.append("CAN_PLUG_OUTLET")
-    if flags & Flags3.IS_ELECTRIC_OUTLET:
-        result.append("IS_ELECTRIC_OUTLET")
-    if flags & Flags3.CAN_BURN_OR_FUSE:
-        result.append("CAN_BURN_OR_FUSE")
-    if flags & Flags3.UNKNOWN_0x8:
-        result.append("UNKNOWN_0x8")
-    if flags & Flags3.LOCKED:
-        result.append("LOCKED")
-    if flags & Flags3.SIZABLE_SCENERY:
-        result.append("SIZABLE_SCENERY")
-    if flags & Flags3.UNKNOWN_0x100:
-        result.append("UNKNOWN_0x100")
-    if flags & Flags3.SHOW_PROGRAM_ICON:
-        result.append("SHOW_PROGRAM_ICON")
-    if flags & Flags3.SCENERY_PART:
-        result.append("SCENERY_PART")
-    if flags & Flags3.WALL_PART:
-        result.append("WALL_PART")
-    if flags & Flags3.SHOW_SOLUTION_ICON:
-        result.append("SHOW_SOLUTION_ICON")
-    return result
+class TimReader:
+    """
+    Decodes TIM file data into a Level in a single pass.
 
-def list_to_flags1(flags_list: list[str]) -> int:
-    """Convert list of flag names to Flags1 value"""
-    flags = 0
-    for flag_name in flags_list:
-        if hasattr(Flags1, flag_name):
-            flags |= getattr(Flags1, flag_name)
-    return flags
+    The text report of parse_tim_file and the JSON export of tim_to_json are
+    both rendered from the Level, so a file is only ever decoded here.
+    """
 
-def list_to_flags2(flags_list: list[str]) -> int:
-    """Convert list of flag names to Flags2 value"""
-    flags = 0
-    for flag_name in flags_list:
-        if hasattr(Flags2, flag_name):
-            flags |= getattr(Flags2, flag_name)
-    return flags
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
 
-def list_to_flags3(flags_list: list[str]) -> int:
-    """Convert list of flag names to Flags3 value"""
-    flags = 0
-    for flag_name in flags_list:
-        if hasattr(Flags3, flag_name):
-            flags |= getattr(Flags3, flag_name)
-    return flags
+    @classmethod
+    def open(cls, filepath: str | Path) -> 'TimReader':
+        profiler = current_profiler()
+        start = profiler.now()
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        profiler.lap('io.read', start)
+        return cls(data)
 
-def part_to_dict(part: Part) -> dict:
-    """Convert a Part object to a JSON-serializable dictionary"""
-    result = {
-        "part_type": part.part_type.name,
-        "position": {"x": part.pos_x, "y": part.pos_y},
-        "size": {
-            "width_1": part.width_1,
-            "height_1": part.height_1,
-            "width_2": part.width_2,
-            "height_2": part.height_2
-        }
-    }
-    
-    # Only include flags if they differ from defaults
-    default_f1, default_f2, default_f3 = get_default_part_flags(part.part_type)
-    if part.flags_1 != default_f1:
-        result["flags_1"] = flags1_to_list(part.flags_1)
+    def read_header(self) -> LevelHeader:
+        """Decode the header and move to the first part"""
+        profiler = current_profiler()
+        start = profiler.now()
+        header, self.offset = LevelHeader.unpack_from(self.data)
+        profiler.lap('header', start)
+        return header
+
+    def iter_parts(self, num_parts: int):
+        """Decode num_parts records from the current offset, which is advanced once all were read"""
+        data = self.data
+        offset = self.offset
+        peek = PART_TYPE_STRUCT.unpack_from
+        layouts = LAYOUTS_BY_PART_TYPE
+        profiler = current_profiler()
+        if profiler.enabled:
+            for _ in range(num_parts):
+                part_start = profiler.now()
+                layout = layouts.get(peek(data, offset)[0], PART_LAYOUT)
+                part = layout.unpack_from(data, offset)
+                offset += layout.size
+                profiler.add_part('parts.decode', part.part_type, profiler.now() - part_start)
+                yield part
+        else:
+            for _ in range(num_parts):
+                layout = layouts.get(peek(data, offset)[0], PART_LAYOUT)
+                yield layout.unpack_from(data, offset)
+                offset += layout.size
+        self.offset = offset
+
+    def read_solution(self) -> LevelSolution:
+        """Decode the solution at the current offset"""
+        profiler = current_profiler()
+        start = profiler.now()
+        solution = LevelSolution.unpack_from(self.data, self.offset)
+        self.offset += SOLUTION_SIZE
+        profiler.lap('solution', start)
+        return solution
+
+    def read(self) -> Level:
+        """Decode the whole file"""
+        header = self.read_header()
+        parts = list(self.iter_parts(header.num_parts))
+        solution = self.read_solution()
+        return Level(header, parts, solution, len(self.data), self.offset)
+
+
+def read_tim_file(filepath: str | Path) -> Level:
+    """Decode a TIM file into a Level"""
+    return TimReader.open(filepath).read()
+
+
+def part_type_name(part_type: int) -> str:
+    """Name of a part type, also for values that are not in PartType"""
+    member = PART_TYPES_BY_VALUE.get(part_type)
+    return member.name if member is not None else f"UNKNOWN_{part_type}"
+
+
+NUMPY_FIELD_TYPES = {'H': '<u2', 'h': '<i2', 'B': 'u1'}
+_layout_dtypes: dict[RecordLayout, object] = {}
+
+
+def require_numpy():
+    """Raise a helpful error if the optional NumPy dependency is missing"""
+    if np is None:
+        raise ImportError("This feature requires NumPy, install it with 'uv sync --extra numpy'")
+
+
+def get_layout_dtype(layout: RecordLayout | None = None):
+    """
+    Get the NumPy structured dtype of a record layout, matching it byte for byte.
+    Without a layout, returns the dtype holding the union of all part fields.
+    """
+    require_numpy()
+    if layout not in _layout_dtypes:
+        if layout is None:
+            union = {}
+            for record_layout in LAYOUTS_BY_CLASS.values():
+                for name, code in record_layout.fields:
+                    assert union.setdefault(name, code) == code, name
+            fields = list(union.items())
+        else:
+            fields = layout.fields
+        dtype = np.dtype([(name, NUMPY_FIELD_TYPES[code]) for name, code in fields])
+        assert layout is None or dtype.itemsize == layout.size
+        _layout_dtypes[layout] = dtype
+    return _layout_dtypes[layout]
+
+
+class PartTable:
+    """
+    Columnar storage for the parts of a level, one NumPy column per part field.
+
+    All record types share one structured array holding the union of their
+    fields; fields a record type does not store keep their dataclass default.
+    Columns can be filtered and modified in bulk without creating Part objects:
+
+        table = PartTable.from_tim_file('level.TIM')
+        moving = table.filter(table['flags_1'] & Flags1.MOVING_PART != 0)
+    """
+
+    _default_record = None
+
+    def __init__(self, records):
+        require_numpy()
+        self.records = records
+
+    @classmethod
+    def empty(cls, num_parts: int) -> 'PartTable':
+        """Create a table of num_parts rows holding the default field values"""
+        dtype = get_layout_dtype()
+        if cls._default_record is None:
+            default_record = np.zeros(1, dtype=dtype)
+            for layout in LAYOUTS_BY_CLASS.values():
+                for field in dataclass_fields(layout.cls):
+                    if field.name in layout.names and field.default is not MISSING:
+                        default_record[field.name] = field.default
+            cls._default_record = default_record.view(np.uint8)
+        records = np.empty(num_parts, dtype=dtype)
+        records.view(np.uint8).reshape(num_parts, dtype.itemsize)[:] = cls._default_record
+        return cls(records)
+
+    @classmethod
+    def from_buffer(cls, data: bytes, offset: int, num_parts: int) -> 'PartTable':
+        """Build a table from num_parts consecutive part records starting at offset"""
+        require_numpy()
+        table = cls.empty(num_parts)
+        if num_parts == 0:
+            return table
+
+        # Fast path: only normal parts, the whole block is one 48-byte record array
+        end = offset + PART_LAYOUT.size * num_parts
+        if end <= len(data):
+            types = np.ndarray((num_parts,), '<u2', data, offset, (PART_LAYOUT.size,))
+            if not np.isin(types, list(LAYOUTS_BY_PART_TYPE)).any():
+                table._assign(PART_LAYOUT, slice(None),
+                              np.frombuffer(data, get_layout_dtype(PART_LAYOUT), num_parts, offset))
+                return table
+
+        # Variable-size records: walk the type of each record to find its offset
+        record_offsets = np.empty(num_parts, np.int64)
+        part_types = np.empty(num_parts, np.uint16)
+        position = offset
+        for i in range(num_parts):
+            part_type = data[position] | data[position + 1] << 8
+            record_offsets[i] = position - offset
+            part_types[i] = part_type
+            position += LAYOUTS_BY_PART_TYPE.get(part_type, PART_LAYOUT).size
+        if position > len(data):
+            raise IndexError(f"Data ends inside the last part record, {position - len(data)} bytes are missing")
+        block = np.frombuffer(data, np.uint8, position - offset, offset)
+
+        for layout, mask in cls._layout_masks(part_types):
+            rows = block[record_offsets[mask][:, None] + np.arange(layout.size)]
+            table._assign(layout, mask, rows.view(get_layout_dtype(layout)).reshape(-1))
+        return table
+
+    @classmethod
+    def from_tim_file(cls, filepath: str) -> 'PartTable':
+        """Build a table from the parts of a TIM file"""
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        offset, num_parts = find_parts_block(data)
+        return cls.from_buffer(data, offset, num_parts)
+
+    @staticmethod
+    def _layout_masks(part_types):
+        """Yield (layout, row mask) for every record layout present in part_types"""
+        normal = np.ones(len(part_types), dtype=bool)
+        masks = []
+        for part_type, layout in LAYOUTS_BY_PART_TYPE.items():
+            mask = part_types == part_type
+            if mask.any():
+                masks.append((layout, mask))
+                normal &= ~mask
+        if normal.any():
+            masks.insert(0, (PART_LAYOUT, normal))
+        return masks
+
+    def _assign(self, layout: RecordLayout, rows, records):
+        """Copy records of one layout into the given rows of the table"""
+        self.records[list(layout.names)][rows] = records
+
+    def _pack(self, layout: RecordLayout, rows):
+        """Gather the given rows into a record array of one layout"""
+        return self.records[rows][list(layout.names)].astype(get_layout_dtype(layout))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, name: str):
+        """Get the column of a part field, writes go straight into the table"""
+        return self.records[name]
+
+    def __setitem__(self, name: str, values):
+        self.records[name] = values
+
+    @property
+    def record_sizes(self):
+        """Size in bytes of every part record"""
+        sizes = np.full(len(self), PART_LAYOUT.size, dtype=np.int64)
+        for layout, mask in self._layout_masks(self.records['part_type']):
+            sizes[mask] = layout.size
+        return sizes
+
+    @property
+    def nbytes(self) -> int:
+        """Size in bytes of the encoded parts block"""
+        return int(self.record_sizes.sum())
+
+    def filter(self, mask) -> 'PartTable':
+        """
+        Select rows by boolean mask or index array. Part indices stored in the
+        connection fields still refer to the rows of the original table.
+        """
+        return PartTable(self.records[mask])
+
+    def part(self, index: int) -> Part:
+        """Materialize a single row as a Part object"""
+        layout = get_part_layout(int(self.records['part_type'][index]))
+        return layout.unpack_from(self._pack(layout, [index]).tobytes())
+
+    def to_bytes(self) -> bytes:
+        """Encode the table back into a parts block"""
+        masks = self._layout_masks(self.records['part_type'])
+        if len(masks) == 1:
+            layout, _ = masks[0]
+            return self._pack(layout, slice(None)).tobytes()
+
+        sizes = self.record_sizes
+        record_offsets = np.cumsum(sizes) - sizes
+        block = np.empty(int(sizes.sum()), dtype=np.uint8)
+        for layout, mask in masks:
+            rows = self._pack(layout, mask).view(np.uint8).reshape(-1, layout.size)
+            block[record_offsets[mask][:, None] + np.arange(layout.size)] = rows
+        return block.tobytes()
+
+
+class LazyLevel:
+    """
+    TIM level backed by a read-only memory map.
+
+    Opening parses only the header, strings and global info. Parts are decoded
+    on access, the offset index of the variable-size records is built on the
+    first access that needs it. Levels with only normal parts need no index,
+    their records are found by arithmetic.
+
+        with LazyLevel('level.TIM') as level:
+            part = level[12345]
+    """
+
+    _file_mode = 'rb'
+    _access = mmap.ACCESS_READ
+
+    def __init__(self, filepath: str):
+        with open(filepath, self._file_mode) as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=self._access)
+        self.header, self.parts_offset = LevelHeader.unpack_from(self._data)
+
+        self._num_parts = self.header.num_parts
+        self._parts: dict[int, Part] = {}
+        self._reset_index()
+
+    def _reset_index(self):
+        """Forget the offset index, it is rebuilt on the next access that needs it"""
+        self._record_offsets: array | None = None
+        # Records are at least 48 bytes, so a file that size is all normal parts
+        if len(self._data) - self.parts_offset - SOLUTION_SIZE == PART_LAYOUT.size * self._num_parts:
+            self._parts_end = len(self._data) - SOLUTION_SIZE
+        else:
+            self._parts_end = None
+
+    def __enter__(self) -> 'LazyLevel':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the memory map"""
+        self._data.close()
+
+    def __len__(self) -> int:
+        return self._num_parts
+
+    def _build_index(self) -> array:
+        """Walk the part types once to find the offset of every record"""
+        data = self._data
+        record_offsets = array('Q', bytes(8 * self._num_parts))
+        position = self.parts_offset
+        for i in range(self._num_parts):
+            record_offsets[i] = position
+            part_type = data[position] | data[position + 1] << 8
+            position += LAYOUTS_BY_PART_TYPE.get(part_type, PART_LAYOUT).size
+        self._record_offsets = record_offsets
+        self._parts_end = position
+        return record_offsets
+
+    def part_offset(self, index: int) -> int:
+        """File offset of a part record"""
+        if not 0 <= index < self._num_parts:
+            raise IndexError(f"part index {index} out of range")
+        if self._record_offsets is not None:
+            return self._record_offsets[index]
+        if self._parts_end is not None:
+            return self.parts_offset + PART_LAYOUT.size * index
+        return self._build_index()[index]
+
+    def __getitem__(self, index: int) -> Part:
+        if index < 0:
+            index += self._num_parts
+        part = self._parts.get(index)
+        if part is None:
+            part = parse_part_from_bytes(self._data, self.part_offset(index))[0]
+            self._parts[index] = part
+        return part
+
+    def __iter__(self):
+        for i in range(self._num_parts):
+            yield self[i]
+
+    @property
+    def parts_end(self) -> int:
+        """File offset right after the last part record"""
+        if self._parts_end is None:
+            self._build_index()
+        return self._parts_end
+
+    @cached_property
+    def solution(self) -> LevelSolution:
+        """Solution information, read on first access"""
+        return LevelSolution.unpack_from(self._data, self.parts_end)
+
+    def part_table(self) -> PartTable:
+        """Decode all parts at once into a columnar PartTable"""
+        return PartTable.from_buffer(self._data, self.parts_offset, self._num_parts)
+
+
+def iter_level(fileobj):
+    """
+    Stream a TIM level from any readable binary stream with constant memory.
+
+    Yields the LevelHeader, then every Part, then the LevelSolution. Each
+    record is read with at most two reads of exactly its size, so a consumer
+    can stop early without the rest of the stream being touched.
+    """
+    header = LevelHeader.read(fileobj)
+    yield header
+    for _ in range(header.num_parts):
+        # Every record is at least as large as a normal part, read that first
+        data = read_exact(fileobj, PART_LAYOUT.size)
+        layout = LAYOUTS_BY_PART_TYPE.get(data[0] | data[1] << 8, PART_LAYOUT)
+        if layout.size > PART_LAYOUT.size:
+            data += read_exact(fileobj, layout.size - PART_LAYOUT.size)
+        yield layout.unpack_from(data)
+    yield LevelSolution.read(fileobj)
+
+
+def iter_parts(fileobj):
+    """Stream only the parts of a TIM level, the solution trailer is not read"""
+    events = iter_level(fileobj)
+    header = next(events)
+    for _ in range(header.num_parts):
+        yield next(events)
+
+
+def measure_part_memory(filepath: str) -> tuple[int, float]:
+    """
+    Load every part of a level as Part objects and measure the memory they hold
+    with tracemalloc. Returns (number of parts, bytes per part).
+    """
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    try:
+        with open(filepath, 'rb') as f:
+            before = tracemalloc.get_traced_memory()[0]
+            parts = list(iter_parts(f))
+            used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+    return len(parts), used / len(parts) if parts else 0.0
+
+
+SPATIAL_LARGE_PART_CELLS = 64  # Parts touching more grid cells are not listed in the cells
+
+
+class SpatialIndex:
+    """
+    Uniform grid over the bounding boxes of level parts.
+
+    A part covers pos_x <= x < pos_x + width_1 and pos_y <= y < pos_y + height_1,
+    parts without a size cover the single pixel at their position. Each part
+    is listed in every grid cell its box touches. Queries only look at the
+    cells they cover, so their cost depends on the parts nearby rather than on
+    the size of the level. Parts touching more than SPATIAL_LARGE_PART_CELLS
+    cells are kept in a separate list that every query checks instead:
+
+        index = SpatialIndex(read_tim_file('level.TIM').parts)
+        index.query_rect(0, 0, 100, 100)  # Indices of the parts in a rectangle
+        index.overlaps()                  # All pairs of overlapping parts
+    """
+
+    def __init__(self, parts, cell_size: int | None = None):
+        boxes = array('l')
+        for part in parts:
+            boxes.extend((part.pos_x, part.pos_y,
+                          part.pos_x + max(part.width_1, 1), part.pos_y + max(part.height_1, 1)))
+        self.boxes = boxes
+        if cell_size is None:
+            # Typical parts then touch at most 4 cells
+            sizes = sorted(max(boxes[i + 2] - boxes[i], boxes[i + 3] - boxes[i + 1]) for i in range(0, len(boxes), 4))
+            cell_size = max(sizes[len(sizes) // 2], 8) if sizes else 32
+        self.cell_size = cell_size
+
+        cells: dict[tuple[int, int], list[int]] = {}
+        self.large: list[int] = []
+        for index in range(len(self)):
+            x0, y0, x1, y1 = boxes[4 * index:4 * index + 4]
+            cell_x0 = x0 // cell_size
+            cell_x1 = (x1 - 1) // cell_size
+            cell_y0 = y0 // cell_size
+            cell_y1 = (y1 - 1) // cell_size
+            if (cell_x1 - cell_x0 + 1) * (cell_y1 - cell_y0 + 1) > SPATIAL_LARGE_PART_CELLS:
+                self.large.append(index)
+                continue
+            for cell_y in range(cell_y0, cell_y1 + 1):
+                for cell_x in range(cell_x0, cell_x1 + 1):
+                    cell = cells.get((cell_x, cell_y))
+                    if cell is None:
+                        cells[cell_x, cell_y] = [index]
+                    else:
+                        cell.append(index)
+        self.cells = cells
+        # Range of the occupied cells, queries never look outside it
+        if cells:
+            self.cell_bounds = (min(x for x, _ in cells), min(y for _, y in cells),
+                                max(x for x, _ in cells), max(y for _, y in cells))
+        else:
+            self.cell_bounds = (0, 0, -1, -1)
+
+    def __len__(self) -> int:
+        return len(self.boxes) // 4
+
+    def box(self, index: int) -> tuple[int, int, int, int]:
+        """Bounding box of a part as (x0, y0, x1, y1), x1 and y1 exclusive"""
+        return tuple(self.boxes[4 * index:4 * index + 4])
+
+    def _cells_of(self, x0: int, y0: int, x1: int, y1: int):
+        """Occupied range of the grid cells touched by a box"""
+        cell_size = self.cell_size
+        min_x, min_y, max_x, max_y = self.cell_bounds
+        for cell_y in range(max(y0 // cell_size, min_y), min((y1 - 1) // cell_size, max_y) + 1):
+            for cell_x in range(max(x0 // cell_size, min_x), min((x1 - 1) // cell_size, max_x) + 1):
+                yield cell_x, cell_y
+
+    def query_rect(self, x: int, y: int, width: int, height: int) -> list[int]:
+        """Indices of the parts intersecting a rectangle, in part order"""
+        x1 = x + width
+        y1 = y + height
+        boxes = self.boxes
+        found = set()
+        for cell in self._cells_of(x, y, x1, y1):
+            for index in self.cells.get(cell, ()):
+                i = 4 * index
+                if max(boxes[i], x) < min(boxes[i + 2], x1) and max(boxes[i + 1], y) < min(boxes[i + 3], y1):
+                    found.add(index)
+        for index in self.large:
+            i = 4 * index
+            if max(boxes[i], x) < min(boxes[i + 2], x1) and max(boxes[i + 1], y) < min(boxes[i + 3], y1):
+                found.add(index)
+        return sorted(found)
+
+    def hit_test(self, x: int, y: int) -> list[int]:
+        """Indices of the parts covering a point, in part order"""
+        boxes = self.boxes
+        cell = (x // self.cell_size, y // self.cell_size)
+        return sorted(index for index in (*self.cells.get(cell, ()), *self.large)
+                      if boxes[4 * index] <= x < boxes[4 * index + 2] and boxes[4 * index + 1] <= y < boxes[4 * index + 3])
+
+    def overlaps(self) -> list[tuple[int, int]]:
+        """
+        All pairs (i, j), i < j, of parts whose boxes intersect. A pair sharing
+        several cells is only reported by the cell holding the top left corner
+        of their intersection. Large parts are compared with every part.
+        """
+        boxes = self.boxes
+        cell_size = self.cell_size
+        pairs = []
+        for (cell_x, cell_y), indices in self.cells.items():
+            if len(indices) < 2:
+                continue
+            # Sweep along x, a part can only overlap those starting before it ends
+            indices = sorted(indices, key=lambda index: boxes[4 * index])
+            for n, a in enumerate(indices):
+                ax0, ay0, ax1, ay1 = boxes[4 * a:4 * a + 4]
+                for b in indices[n + 1:]:
+                    bx0, by0, bx1, by1 = boxes[4 * b:4 * b + 4]
+                    if bx0 >= ax1:
+                        break
+                    left, top = max(ax0, bx0), max(ay0, by0)
+                    if left >= min(ax1, bx1) or top >= min(ay1, by1):
+                        continue
+                    if left // cell_size == cell_x and top // cell_size == cell_y:
+                        pairs.append((a, b) if a < b else (b, a))
+        large = set(self.large)
+        for a in self.large:
+            ax0, ay0, ax1, ay1 = boxes[4 * a:4 * a + 4]
+            for b in range(len(self)):
+                # Pairs of two large parts are found once, from the lower index
+                if b == a or (b in large and b < a):
+                    continue
+                i = 4 * b
+                if max(ax0, boxes[i]) < min(ax1, boxes[i + 2]) and max(ay0, boxes[i + 1]) < min(ay1, boxes[i + 3]):
+                    pairs.append((a, b) if a < b else (b, a))
+        pairs.sort()
+        return pairs
+
+
+# Fields holding the index of another part, -1 when unused
+PART_LINK_NAMES = tuple(name for name, _ in PART_LINK_FIELDS)
+LINK_FIELDS_BY_CLASS: dict[type, tuple[str, ...]] = {
+    Part: PART_LINK_NAMES,
+    Belt: PART_LINK_NAMES + ('belt_connected_part_1', 'belt_connected_part_2'),
+    Rope: PART_LINK_NAMES + ('rope_connected_part_1', 'rope_connected_part_2'),
+    Pulley: PART_LINK_NAMES + ('rope_index',),
+    ProgrammableBall: PART_LINK_NAMES,
+}
+
+
+class ConnectionGraph:
+    """
+    Links between the parts of a level, built in one pass over the link fields.
+
+    Every link is an edge (source, field, target) between part indices. Edges
+    are kept per source and per target, so both directions are looked up
+    without scanning the level. Links pointing outside the level are collected
+    in dangling instead:
+
+        graph = ConnectionGraph(read_tim_file('level.TIM').parts)
+        graph.neighbors(3)      # Parts linked to or from part 3
+        graph.component(3)      # Every part connected to part 3
+    """
+
+    def __init__(self, parts):
+        self.edges_from: list[list[tuple[str, int]]] = []
+        self.dangling: list[tuple[int, str, int]] = []
+        links = []
+        for source, part in enumerate(parts):
+            self.edges_from.append([])
+            for field in LINK_FIELDS_BY_CLASS[type(part)]:
+                target = getattr(part, field)
+                if target != -1:
+                    links.append((source, field, target))
+
+        num_parts = len(self.edges_from)
+        self.edges_to: list[list[tuple[int, str]]] = [[] for _ in range(num_parts)]
+        for source, field, target in links:
+            if 0 <= target < num_parts:
+                self.edges_from[source].append((field, target))
+                self.edges_to[target].append((source, field))
+            else:
+                self.dangling.append((source, field, target))
+        self._component_ids: list[int] | None = None
+        self._members: dict[int, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.edges_from)
+
+    @property
+    def num_edges(self) -> int:
+        return sum(len(edges) for edges in self.edges_from)
+
+    def targets(self, index: int) -> list[int]:
+        """Parts that a part links to"""
+        return [target for _, target in self.edges_from[index]]
+
+    def sources(self, index: int) -> list[int]:
+        """Parts linking to a part"""
+        return [source for source, _ in self.edges_to[index]]
+
+    def neighbors(self, index: int) -> list[int]:
+        """Parts linked to or from a part, in part order"""
+        return sorted({*self.targets(index), *self.sources(index)} - {index})
+
+    def _find_components(self):
+        """Union-find over all edges, ignoring their direction"""
+        parent = list(range(len(self)))
+
+        def find(index: int) -> int:
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        for source, edges in enumerate(self.edges_from):
+            for _, target in edges:
+                a, b = find(source), find(target)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+        self._component_ids = [find(index) for index in range(len(self))]
+        self._members = {}
+        for index, component_id in enumerate(self._component_ids):
+            self._members.setdefault(component_id, []).append(index)
+
+    @property
+    def component_ids(self) -> list[int]:
+        """Component of every part, named by its lowest part index. Computed on first access."""
+        if self._component_ids is None:
+            self._find_components()
+        return self._component_ids
+
+    def component(self, index: int) -> list[int]:
+        """Every part connected to a part through links in either direction, itself included"""
+        return self._members[self.component_ids[index]]
+
+    def components(self) -> list[list[int]]:
+        """Groups of at least two linked parts, ordered by their lowest part index"""
+        if self._component_ids is None:
+            self._find_components()
+        return [members for members in self._members.values() if len(members) > 1]
+
+
+# Record offsets of the link fields that are stored, all as int16
+LINK_STRUCT = struct.Struct('<h')
+LINK_OFFSETS_BY_LAYOUT: dict[RecordLayout, tuple[int, ...]] = {
+    layout: tuple(layout.field_structs[name][0] for name in LINK_FIELDS_BY_CLASS[cls] if name in layout.field_structs)
+    for cls, layout in LAYOUTS_BY_CLASS.items()
+}
+PART_COUNTS_STRUCT = struct.Struct('<HH')  # num_fixed and num_moving, followed by unknown_14 and the parts
+
+
+class LevelPatcher(LazyLevel):
+    """
+    TIM level opened for in-place edits through a writable memory map.
+
+    Parts are found with the offset index of LazyLevel and rewritten in their
+    record, so an edit that keeps the record size writes only those bytes.
+    Replacing a part with one of another record size, inserting and deleting
+    move the rest of the file within the map instead of encoding it again.
+    Inserting and deleting also update the part counts of the header and
+    renumber the links and solution conditions.
+
+        with LevelPatcher('level.TIM') as level:
+            level.set_fields(3, pos_x=120, pos_y=80)
+            level[4] = make_part(PartType.BELT, 200, 100, moving=False)
+    """
+
+    _file_mode = 'r+b'
+    _access = mmap.ACCESS_WRITE
+
+    def close(self):
+        """Write the changes to the file and release the memory map"""
+        if not self._data.closed:
+            self._data.flush()
+        super().close()
+
+    def _normalize_index(self, index: int) -> int:
+        return index + self._num_parts if index < 0 else index
+
+    def _record_layout(self, offset: int) -> RecordLayout:
+        return LAYOUTS_BY_PART_TYPE.get(PART_TYPE_STRUCT.unpack_from(self._data, offset)[0], PART_LAYOUT)
+
+    def set_fields(self, index: int, **values: int):
+        """
+        Write single fields of a part record, e.g. set_fields(3, pos_x=120).
+        The part type can only change to one stored with the same record layout.
+        """
+        index = self._normalize_index(index)
+        offset = self.part_offset(index)
+        layout = self._record_layout(offset)
+        if 'part_type' in values and get_part_layout(values['part_type']) is not layout:
+            raise ValueError(f"Part type {values['part_type']} is not stored as a {layout.cls.__name__}, "
+                             f"assign a new part instead")
+        # Pack everything first, so a bad value leaves the record untouched
+        patches = []
+        for name, value in values.items():
+            if name not in layout.field_structs:
+                raise ValueError(f"{layout.cls.__name__} has no field {name!r}")
+            field_offset, field_struct = layout.field_structs[name]
+            patches.append((offset + field_offset, field_struct.pack(value)))
+        if 'flags_1' in values:
+            self._update_moving(index, offset, values['flags_1'])
+        for field_offset, packed in patches:
+            self._data[field_offset:field_offset + len(packed)] = packed
+        self._parts.pop(index, None)
+
+    def __setitem__(self, index: int, part: Part):
+        index = self._normalize_index(index)
+        offset = self.part_offset(index)
+        record = self._pack(part)
+        old_size = self._record_layout(offset).size
+        self._update_moving(index, offset, part.flags_1)
+        if len(record) == old_size:
+            self._data[offset:offset + old_size] = record
+        else:
+            self._splice(offset, old_size, record)
+            self._shift_records(index + 1, len(record) - old_size)
+        self._parts.pop(index, None)
+
+    def insert(self, index: int, part: Part):
+        """
+        Insert a part before index, index len(level) appends it. Its links are
+        indices after the insertion. Moving parts come before the fixed parts,
+        so the index must be on the side of the moving count that matches the
+        MOVING_PART flag of the part.
+        """
+        index = self._normalize_index(index)
+        if not 0 <= index <= self._num_parts:
+            raise IndexError(f"part index {index} out of range")
+        moving = bool(part.flags_1 & Flags1.MOVING_PART)
+        num_moving = self.header.num_moving
+        if index > num_moving if moving else index < num_moving:
+            raise ValueError(f"A {'moving' if moving else 'fixed'} part cannot be inserted at {index}, "
+                             f"the level has {num_moving} moving part(s) first")
+        record = self._pack(part)
+        offset = self.part_offset(index) if index < self._num_parts else self.parts_end
+
+        self._renumber(index, inserted=True)
+        self._splice(offset, 0, record)
+        self._num_parts += 1
+        if self._record_offsets is not None:
+            self._record_offsets.insert(index, offset)
+        self._shift_records(index + 1, len(record))
+        if moving:
+            self.header.num_moving += 1
+        else:
+            self.header.num_fixed += 1
+        self._write_counts()
+
+    def __delitem__(self, index: int):
+        """Delete a part, links and solution conditions pointing at it become -1"""
+        index = self._normalize_index(index)
+        offset = self.part_offset(index)
+        old_size = self._record_layout(offset).size
+
+        self._splice(offset, old_size, b'')
+        self._num_parts -= 1
+        if self._record_offsets is not None:
+            del self._record_offsets[index]
+        self._shift_records(index, -old_size)
+        if index < self.header.num_moving:
+            self.header.num_moving -= 1
+        else:
+            self.header.num_fixed -= 1
+        self._write_counts()
+        self._renumber(index, inserted=False)
+
+    @staticmethod
+    def _pack(part: Part) -> bytes:
+        layout = LAYOUTS_BY_CLASS[type(part)]
+        if get_part_layout(part.part_type) is not layout:
+            raise ValueError(f"Part type {part.part_type!r} cannot be stored as a {type(part).__name__}")
+        return layout.pack(part)
+
+    def _splice(self, offset: int, old_size: int, record: bytes):
+        """Replace old_size bytes at offset with record, moving the rest of the file"""
+        data = self._data
+        end = offset + old_size
+        file_size = len(data)
+        new_size = file_size - old_size + len(record)
+        if new_size > file_size:
+            data.resize(new_size)
+        data.move(offset + len(record), end, file_size - end)
+        if new_size < file_size:
+            data.resize(new_size)
+        data[offset:offset + len(record)] = record
+
+    def _shift_records(self, first: int, delta: int):
+        """Move the indexed offsets of the records from first on by delta bytes"""
+        self._parts.clear()
+        self.__dict__.pop('solution', None)
+        if self._record_offsets is None:
+            self._reset_index()
+            return
+        record_offsets = self._record_offsets
+        for i in range(first, self._num_parts):
+            record_offsets[i] += delta
+        self._parts_end += delta
+
+    def _update_moving(self, index: int, offset: int, flags_1: int):
+        """
+        Update the part counts of the header for new flags_1 of the part at
+        index. Moving parts come first, so only the last moving part can become
+        fixed and only the first fixed part can become moving.
+        """
+        field_offset, field_struct = PART_LAYOUT.field_structs['flags_1']  # Common to all record layouts
+        was_moving = bool(field_struct.unpack_from(self._data, offset + field_offset)[0] & Flags1.MOVING_PART)
+        moving = bool(flags_1 & Flags1.MOVING_PART)
+        if moving == was_moving:
+            return
+        num_moving = self.header.num_moving
+        if moving and index == num_moving:
+            self.header.num_moving += 1
+            self.header.num_fixed -= 1
+        elif not moving and index == num_moving - 1:
+            self.header.num_moving -= 1
+            self.header.num_fixed += 1
+        else:
+            raise ValueError(f"Part {index} cannot become a {'moving' if moving else 'fixed'} part in place, "
+                             f"the level has {num_moving} moving part(s) first. Delete it and insert it instead")
+        self._write_counts()
+
+    def _write_counts(self):
+        PART_COUNTS_STRUCT.pack_into(self._data, self.parts_offset - PART_COUNTS_STRUCT.size - 2,
+                                     self.header.num_fixed, self.header.num_moving)
+
+    def _renumber(self, index: int, inserted: bool):
+        """
+        Renumber the links and solution conditions pointing at index or later,
+        for a part inserted before index or the part at index deleted.
+        """
+        def renumber(target: int) -> int:
+            if target < index:
+                return target
+            if inserted:
+                return target + 1
+            return -1 if target == index else target - 1
+
+        data = self._data
+        unpack_from, pack_into = LINK_STRUCT.unpack_from, LINK_STRUCT.pack_into
+        for i in range(self._num_parts):
+            offset = self.part_offset(i)
+            for field_offset in LINK_OFFSETS_BY_LAYOUT[self._record_layout(offset)]:
+                target = unpack_from(data, offset + field_offset)[0]
+                if target >= index:
+                    pack_into(data, offset + field_offset, renumber(target))
+
+        solution_offset = self.parts_end
+        num_conditions = min(struct.unpack_from('<H', data, solution_offset)[0], 8)
+        for i in range(num_conditions):
+            condition_offset = solution_offset + 2 + SOLUTION_CONDITION_STRUCT.size * i
+            target = unpack_from(data, condition_offset)[0]
+            if target >= index:
+                pack_into(data, condition_offset, renumber(target))
+        self._parts.clear()
+        self.__dict__.pop('solution', None)
+
+
+@dataclass(slots=True)
+class ValidationIssue:
+    """A problem found by validate_level, part is None for problems of the whole file"""
+    check: str
+    severity: str  # 'error' for files the game cannot load as written, 'warning' for suspicious values
+    message: str
+    part: int | None = None
+
+
+# Bits of flags_2 and flags_3 that describe what a part type can do, as opposed
+# to the state of one placed part (flipped, connected, locked)
+FLAGS_2_CAPABILITIES = (Flags2.BELT_CAN_CONNECT | Flags2.ROPE_CAN_CONNECT | Flags2.ROPE_CAN_CONNECT_2
+                        | Flags2.CAN_STRETCH_ONE_DIR | Flags2.CAN_STRETCH_BOTH)
+FLAGS_3_CAPABILITIES = (Flags3.CAN_PLUG_OUTLET | Flags3.IS_ELECTRIC_OUTLET | Flags3.CAN_BURN_OR_FUSE
+                        | Flags3.SCENERY_PART | Flags3.WALL_PART)
+FIXED_PART = Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2
+PLAYFIELD_BOUNDS = (0, 0, 560, 377)  # Inclusive range of part positions
+
+_default_part_arrays = None
+
+
+def get_default_part_arrays():
+    """
+    Per part type lookup arrays for validate_level, indexed by the part type value:
+    (known type, width_1, height_1, flags_2 capabilities, flags_3 capabilities)
+    """
+    global _default_part_arrays
+    if _default_part_arrays is None:
+        require_numpy()
+        num_types = max(PartType) + 1
+        known = np.zeros(num_types, dtype=bool)
+        sizes = np.zeros((num_types, 2), dtype=np.int64)
+        flags = np.zeros((num_types, 3), dtype=np.int64)
+        for part_type in PartType:
+            known[part_type] = True
+            sizes[part_type] = get_default_part_size(part_type)[:2]
+            flags[part_type] = get_default_part_flags(part_type)
+        _default_part_arrays = (known, sizes[:, 0], sizes[:, 1],
+                                flags[:, 1] & FLAGS_2_CAPABILITIES, flags[:, 2] & FLAGS_3_CAPABILITIES)
+    return _default_part_arrays
+
+
+def validate_level(data: bytes) -> list[ValidationIssue]:
+    """
+    Check TIM file data. The parts are loaded into a PartTable and every check
+    runs on whole columns at once:
+
+    - header: magic number, background color 0-16 and music 1000-1023
+    - file_size: the parts counted in the header and the solution fill the file exactly
+    - part_type: every part type is known
+    - bounds: positions of all parts but belts and ropes are inside the play field
+    - links: part indices in link fields are -1 or refer to a part of the level
+    - moving_count: the first num_moving parts, and only those, are moving parts (warnings)
+    - size, flags: parts have a size, sizes of parts that cannot stretch and the
+      capability flags match the defaults of their part type (warnings)
+    """
+    issues = []
+    try:
+        header, offset = LevelHeader.unpack_from(data)
+    except (struct.error, ValueError) as e:
+        return [ValidationIssue('header', 'error', f"Cannot read header: {e}")]
+    if header.magic != MAGIC_NUMBER:
+        issues.append(ValidationIssue('header', 'error', f"Magic number is 0x{header.magic:08X}, expected 0x{MAGIC_NUMBER:08X}"))
+    if not 0 <= header.bg_color <= 16:
+        issues.append(ValidationIssue('header', 'error', f"Background color {header.bg_color} is not in 0-16"))
+    if not 1000 <= header.music <= 1023:
+        issues.append(ValidationIssue('header', 'error', f"Music {header.music} is not in 1000-1023"))
+
+    try:
+        table = PartTable.from_buffer(data, offset, header.num_parts)
+    except IndexError:
+        issues.append(ValidationIssue('file_size', 'error', f"File ends inside the {header.num_parts} parts of the header"))
+        return issues
+    expected_size = offset + table.nbytes + SOLUTION_SIZE
+    if expected_size != len(data):
+        issues.append(ValidationIssue('file_size', 'error', f"File is {len(data)} bytes, the header's "
+                                      f"{header.num_parts} parts and the solution need {expected_size}"))
+
+    def part_issues(check: str, severity: str, mask, message: Callable[[int], str]):
+        for index in np.flatnonzero(mask).tolist():
+            issues.append(ValidationIssue(check, severity, message(index), index))
+
+    part_types = table['part_type'].astype(np.int64)
+    flags_1 = table['flags_1']
+    moving = (flags_1 & Flags1.MOVING_PART) != 0
+    in_moving_block = np.arange(len(table)) < header.num_moving
+    part_issues('moving_count', 'warning', moving != in_moving_block, lambda i: (
+        f"Part is {'' if moving[i] else 'not '}a moving part, but the header has {header.num_moving} moving parts first"))
+    part_issues('flags', 'warning', moving & ((flags_1 & FIXED_PART) != 0),
+                lambda i: "Part has both the MOVING_PART and FIXED_PART flags")
+
+    known, default_width, default_height, default_flags_2, default_flags_3 = get_default_part_arrays()
+    in_table = part_types < len(known)
+    is_known = in_table & known[np.where(in_table, part_types, 0)]
+    part_issues('part_type', 'error', ~is_known, lambda i: f"Unknown part type {part_types[i]}")
+
+    min_x, min_y, max_x, max_y = PLAYFIELD_BOUNDS
+    pos_x = table['pos_x']
+    pos_y = table['pos_y']
+    # Belts and ropes are placed by their connections, their position is unused
+    placed = (part_types != PartType.BELT) & (part_types != PartType.ROPE)
+    part_issues('bounds', 'error', placed & ((pos_x < min_x) | (pos_x > max_x) | (pos_y < min_y) | (pos_y > max_y)),
+                lambda i: f"Position ({pos_x[i]}, {pos_y[i]}) is outside the play field")
+
+    for field in (*PART_LINK_NAMES, 'belt_connected_part_1', 'belt_connected_part_2', 'rope_index'):
+        column = table[field]
+        part_issues('links', 'error', (column != -1) & ((column < 0) | (column >= len(table))),
+                    lambda i: f"{field} refers to part {column[i]}, the level has {len(table)}")
+
+    # Only compare against the defaults for known part types
+    types = np.where(is_known, part_types, 0)
+    width = table['width_1']
+    height = table['height_1']
+    can_stretch = (table['flags_2'] & (Flags2.CAN_STRETCH_ONE_DIR | Flags2.CAN_STRETCH_BOTH)) != 0
+    wrong_size = is_known & ~can_stretch & ((width != default_width[types]) | (height != default_height[types]))
+    part_issues('size', 'warning', wrong_size, lambda i: (
+        f"Size {width[i]}x{height[i]} of a part that cannot stretch differs from the "
+        f"default {default_width[types[i]]}x{default_height[types[i]]}"))
+    part_issues('size', 'warning', (width == 0) | (height == 0), lambda i: f"Part has no size ({width[i]}x{height[i]})")
+    wrong_flags = is_known & (((table['flags_2'] & FLAGS_2_CAPABILITIES) != default_flags_2[types])
+                              | ((table['flags_3'] & FLAGS_3_CAPABILITIES) != default_flags_3[types]))
+    part_issues('flags', 'warning', wrong_flags, lambda i: (
+        f"Capability flags differ from the defaults of {part_type_name(int(part_types[i]))}"))
+    return issues
+
+
+def validate_tim_file(filepath: str | Path) -> list[ValidationIssue]:
+    """Check a TIM file, see validate_level"""
+    with open(filepath, 'rb') as f:
+        return validate_level(f.read())
+
+
+def make_part(part_type: PartType, x: int = 0, y: int = 0, moving: bool = True) -> Part:
+    """
+    Create a part with sensible defaults based on type.
+    
+    Args:
+        part_type: The type of part to create
+        x: X position (0-560 for TIM2)
+        y: Y position (0-377 for TIM2)
+        moving: Whether the part is affected by gravity (moving parts)
+    
+    Returns:
+        A Part object (or subclass) with appropriate defaults
+    """
+    # Common defaults for TIM2
+    flags_1 = Flags1.MOVING_PART if moving else (Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2)
+    flags_2 = 0
+    flags_3 = Flags3.UNKNOWN_0x8  # Common flag for many parts
+    
+    if part_type == PartType.BOWLING_BALL:
+        return Part(
+            part_type=part_type,
+            flags_1=flags_1,
+            flags_2=flags_2,
+            flags_3=flags_3,
+            width_1=0x20, height_1=0x20,
+            width_2=0x20, height_2=0x20,
+            pos_x=x, pos_y=y,
+        )
+    
+    elif part_type == PartType.BASKETBALL:
+        return Part(
+            part_type=part_type,
+            flags_1=flags_1,
+            flags_2=flags_2,
+            flags_3=flags_3,
+            width_1=0x20, height_1=0x20,
+            width_2=0x20, height_2=0x20,
+            pos_x=x, pos_y=y,
+        )
+    
+    elif part_type == PartType.BELT:
+        return Belt(
+            part_type=part_type,
+            flags_1=Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2,
+            flags_2=0,
+            flags_3=Flags3.LOCKED if not moving else 0,
+            appearance=0,
+            pos_x=-1, pos_y=-1,
+            unknown_26=1,
+        )
+    
+    elif part_type == PartType.ROPE:
+        return Rope(
+            part_type=part_type,
+            flags_1=Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2,
+            flags_2=0,
+            flags_3=Flags3.LOCKED if not moving else 0,
+            appearance=0,
+            pos_x=-1, pos_y=-1,
+            unknown_32_rope=1,
+        )
+    
+    elif part_type == PartType.PULLEY:
+        return Pulley(
+            part_type=part_type,
+            flags_1=Flags1.FIXED_PART_1 | Flags1.FIXED_PART_2,
+            flags_2=Flags2.ROPE_CAN_CONNECT,
+            flags_3=(Flags3.LOCKED | Flags3.UNKNOWN_0x8) if not moving else Flags3.UNKNOWN_0x8,
+            appearance=0,
+            width_1=0x20, height_1=0x20,
+            width_2=0x20, height_2=0x20,
+            pos_x=x, pos_y=y,
+            unknown_32_pulley=1,
+        )
+    
+    elif part_type == PartType.PROGRAMMABLE_BALL:
+        return ProgrammableBall(
+            part_type=part_type,
+            flags_1=flags_1,
+            flags_2=flags_2,
+            flags_3=flags_3 | Flags3.SHOW_PROGRAM_ICON,
+            width_1=0x20, height_1=0x20,
+            width_2=0x20, height_2=0x20,
+            pos_x=x, pos_y=y,
+        )
+    
+    else:
+        # Generic part with defaults
+        return Part(
+            part_type=part_type,
+            flags_1=flags_1,
+            flags_2=flags_2,
+            flags_3=flags_3,
+            width_1=0x20, height_1=0x20,
+            width_2=0x20, height_2=0x20,
+            pos_x=x, pos_y=y,
+        )
+
+
+def insert_bowlingball(buffer, offset, x, y) -> int:
+    """Legacy function - creates a bowling ball part using the new data structures"""
+    assert 0 <= x <= 560
+    assert 0 <= y <= 377
+    
+    ball = make_part(PartType.BOWLING_BALL, x, y, moving=True)
+    return ball.pack_into(buffer, offset)
+
+# Play field of TIM2 levels, part positions are the top left corner
+PLAYFIELD_WIDTH = 560
+PLAYFIELD_HEIGHT = 377
+GENERATED_PART_SIZE = 0x20
+
+# Generated levels cycle through these moving parts
+BALL_PART_TYPES = (PartType.BOWLING_BALL, PartType.BASKETBALL, PartType.POOL_BALL, PartType.SUPER_BALL)
+
+
+def cycle_ball_types(num_parts: int):
+    """Part types for generated parts, cycling through BALL_PART_TYPES"""
+    repeats = -(-num_parts // len(BALL_PART_TYPES))
+    return np.tile(np.array(BALL_PART_TYPES, dtype=np.uint16), repeats)[:num_parts]
+
+
+def spiral_layout(num_parts: int, rng):
+    """
+    A 3-turn spiral around (300, 150) with the radius growing from 20 to 150.
+    Without NumPy the same positions are computed as lists, so the default
+    level can still be generated.
+    """
+    num_rounds = 3
+    radius_min = 20
+    radius_max = 150
+    center_x = 300
+    center_y = 150
+    if np is None:
+        fractions = [i / num_parts for i in range(num_parts)]
+        angles = [fraction * 2 * math.pi * num_rounds for fraction in fractions]
+        radii = [math.trunc(radius_min + (radius_max - radius_min) * fraction) for fraction in fractions]
+        x = [math.trunc(center_x + radius * math.cos(angle)) for radius, angle in zip(radii, angles)]
+        y = [math.trunc(center_y + radius * math.sin(angle)) for radius, angle in zip(radii, angles)]
+        return x, y, [BALL_PART_TYPES[i % len(BALL_PART_TYPES)] for i in range(num_parts)]
+    fraction = np.arange(num_parts) / num_parts
+    angle = fraction * 2 * math.pi * num_rounds
+    radius = np.trunc(radius_min + (radius_max - radius_min) * fraction)
+    x = np.trunc(center_x + radius * np.cos(angle))
+    y = np.trunc(center_y + radius * np.sin(angle))
+    return x, y, cycle_ball_types(num_parts)
+
+
+def grid_layout(num_parts: int, rng):
+    """Rows and columns filling the play field, about as many columns per pixel as rows"""
+    width = PLAYFIELD_WIDTH - GENERATED_PART_SIZE
+    height = PLAYFIELD_HEIGHT - GENERATED_PART_SIZE
+    columns = max(1, math.ceil(math.sqrt(num_parts * width / height)))
+    rows = max(1, math.ceil(num_parts / columns))
+    index = np.arange(num_parts)
+    x = (index % columns) * (width / max(columns - 1, 1))
+    y = (index // columns) * (height / max(rows - 1, 1))
+    return np.trunc(x), np.trunc(y), cycle_ball_types(num_parts)
+
+
+def ring_layout(num_parts: int, rng):
+    """Evenly spaced on one circle around the center of the play field"""
+    radius = (PLAYFIELD_HEIGHT - GENERATED_PART_SIZE) / 2
+    angle = np.arange(num_parts) * (2 * math.pi / max(num_parts, 1))
+    x = np.trunc((PLAYFIELD_WIDTH - GENERATED_PART_SIZE) / 2 + radius * np.cos(angle))
+    y = np.trunc(radius + radius * np.sin(angle))
+    return x, y, cycle_ball_types(num_parts)
+
+
+def scatter_layout(num_parts: int, rng):
+    """Jittered scatter: one random position inside each of num_parts randomly chosen grid cells"""
+    width = PLAYFIELD_WIDTH - GENERATED_PART_SIZE
+    height = PLAYFIELD_HEIGHT - GENERATED_PART_SIZE
+    columns = max(1, math.ceil(math.sqrt(num_parts * width / height)))
+    rows = max(1, math.ceil(num_parts / columns))
+    cells = rng.permutation(columns * rows)[:num_parts]
+    x = (cells % columns + rng.random(num_parts)) * (width / columns)
+    y = (cells // columns + rng.random(num_parts)) * (height / rows)
+    return np.trunc(x), np.trunc(y), cycle_ball_types(num_parts)
+
+
+def poisson_disk_points(width: float, height: float, radius: float, rng, attempts: int = 6):
+    """
+    Random points at least radius apart, as x and y arrays.
+
+    Uses a background grid of cells of size radius / sqrt(2), each holding at
+    most one point. Cells are processed in 9 interleaved phases: cells of one
+    phase are 3 cells apart, so their candidates can be tested against the
+    5x5 neighborhood in the grid all at once without conflicting each other.
+    """
+    cell = radius / math.sqrt(2)
+    columns = math.ceil(width / cell)
+    rows = math.ceil(height / cell)
+    stride = columns + 4  # Padded by the 2-cell neighborhood on every side
+    grid_x = np.full((rows + 4) * stride, np.nan)
+    grid_y = np.full((rows + 4) * stride, np.nan)
+    # Nearest cells first, they reject the most candidates
+    neighbors = sorted(((dy, dx) for dy in range(-2, 3) for dx in range(-2, 3) if dy or dx),
+                       key=lambda d: d[0] ** 2 + d[1] ** 2)
+    neighbor_offsets = [dy * stride + dx for dy, dx in neighbors]
+    radius_squared = radius * radius
+
+    phases = []
+    for phase_y in range(3):
+        for phase_x in range(3):
+            cell_y, cell_x = np.mgrid[phase_y:rows:3, phase_x:columns:3]
+            phases.append(((cell_y.ravel() + 2) * stride + cell_x.ravel() + 2, cell_x.ravel(), cell_y.ravel()))
+
+    for _ in range(attempts):
+        for phase, (index, cell_x, cell_y) in enumerate(phases):
+            # Filled cells stay filled, only keep trying the empty ones
+            empty = np.isnan(grid_x[index])
+            index, cell_x, cell_y = index[empty], cell_x[empty], cell_y[empty]
+            phases[phase] = (index, cell_x, cell_y)
+            x = (cell_x + rng.random(len(index))) * cell
+            y = (cell_y + rng.random(len(index))) * cell
+            inside = (x < width) & (y < height)
+            candidate, x, y = index[inside], x[inside], y[inside]
+            for offset in neighbor_offsets:
+                # NaN distances of empty cells compare False
+                far = ~((grid_x[candidate + offset] - x) ** 2 + (grid_y[candidate + offset] - y) ** 2 < radius_squared)
+                candidate, x, y = candidate[far], x[far], y[far]
+            grid_x[candidate] = x
+            grid_y[candidate] = y
+    filled = ~np.isnan(grid_x)
+    return grid_x[filled], grid_y[filled]
+
+
+def poisson_disk_layout(num_parts: int, rng):
+    """Random positions keeping a minimum distance, picked from a Poisson-disk sample of the play field"""
+    width = PLAYFIELD_WIDTH - GENERATED_PART_SIZE
+    height = PLAYFIELD_HEIGHT - GENERATED_PART_SIZE
+    # A saturated sample holds roughly 0.6 points per radius squared, aim a bit above num_parts
+    radius = math.sqrt(0.5 * width * height / max(num_parts, 1))
+    while True:
+        x, y = poisson_disk_points(width, height, radius, rng)
+        if len(x) >= num_parts:
+            break
+        radius *= 0.9
+    chosen = rng.permutation(len(x))[:num_parts]
+    return np.trunc(x[chosen]), np.trunc(y[chosen]), cycle_ball_types(num_parts)
+
+
+# Position generators for make_buffer and --layout. A generator takes the number
+# of parts and a numpy.random.Generator and returns x, y and part type arrays.
+# Add an entry to make another layout available on the command line.
+LEVEL_LAYOUTS: dict[str, Callable] = {
+    'spiral': spiral_layout,
+    'grid': grid_layout,
+    'ring': ring_layout,
+    'scatter': scatter_layout,
+    'poisson': poisson_disk_layout,
+}
+
+
+def part_templates(part_types):
+    """
+    Default moving part of every distinct part type, as (templates, template index per part).
+    Every generated part is a copy of its template with the position filled in.
+    """
+    part_types = np.asarray(part_types, dtype=np.uint16)
+    unique_types = np.flatnonzero(np.bincount(part_types, minlength=1))
+    lookup = np.zeros(int(unique_types[-1]) + 1 if len(unique_types) else 1, dtype=np.intp)
+    lookup[unique_types] = np.arange(len(unique_types))
+    templates = [make_part(PART_TYPES_BY_VALUE.get(int(t), int(t)), 0, 0, moving=True) for t in unique_types]
+    return templates, lookup[part_types]
+
+
+def run_layout(num_parts: int, layout: str | Callable, seed: int):
+    """
+    Run a layout generator, a LEVEL_LAYOUTS name or function, returning x, y
+    and part type arrays. Only the spiral runs without NumPy, on lists.
+    """
+    generator = LEVEL_LAYOUTS[layout] if isinstance(layout, str) else layout
+    if np is None and generator is spiral_layout:
+        return spiral_layout(num_parts, None)
+    require_numpy()
+    return generator(num_parts, np.random.default_rng(seed))
+
+
+def layout_table(x, y, part_types) -> 'PartTable':
+    """Build a PartTable of moving parts at the given positions"""
+    templates, type_index = part_templates(part_types)
+    template_block = b''.join(part.to_bytes() for part in templates)
+    table = PartTable(PartTable.from_buffer(template_block, 0, len(templates)).records[type_index])
+    table['pos_x'] = x
+    table['pos_y'] = y
+    return table
+
+
+def generate_parts(num_parts: int, layout: str | Callable = 'spiral', seed: int = 0) -> 'PartTable':
+    """
+    Generate moving parts with a layout generator, straight into a PartTable.
+    No Part objects are created per part, see part_templates.
+    """
+    return layout_table(*run_layout(num_parts, layout, seed))
+
+
+def generate_parts_block(num_parts: int, layout: str | Callable = 'spiral', seed: int = 0) -> bytes:
+    """Generate moving parts with a layout generator, encoded as a parts block"""
+    x, y, part_types = run_layout(num_parts, layout, seed)
+    templates, type_index = part_templates(part_types)
+    if any(LAYOUTS_BY_CLASS[type(part)] is not PART_LAYOUT for part in templates):
+        return layout_table(x, y, part_types).to_bytes()
+
+    # Fast path: only normal parts, copy the template records as raw 48-byte rows
+    template_rows = np.frombuffer(b''.join(part.to_bytes() for part in templates), np.uint8)
+    records = template_rows.reshape(-1, PART_LAYOUT.size)[type_index].view(get_layout_dtype(PART_LAYOUT)).reshape(-1)
+    records['pos_x'] = x
+    records['pos_y'] = y
+    return records.tobytes()
+
+
+def calculate_filesize(title_length: int, description_length: int, num_normal_parts: int, num_belts: int, num_ropes: int, num_pulleys: int, num_programmable_balls: int) -> int:
+    '''
+    Returns the expected file size. Note that no hints are allowed currently.
+
+    Title and description must be null-terminated and \0 included in their length.
+    '''
+    elements = {
+        'magic': 4,
+        'color': 2,
+        'title': title_length,
+        'description': description_length,
+        'hints': 2 + 7 * 8, #2 byte num hints, (7 byte per empty hint (x_u16,y_u16,flip_u16,text\0)), 8 hints even if empty
+        'global_puzzle_info': 16,
+        'normal_parts': num_normal_parts * PART_LAYOUT.size,
+        'belts': num_belts * BELT_LAYOUT.size,
+        'ropes': num_ropes * ROPE_LAYOUT.size,
+        'pulleys': num_pulleys * PULLEY_LAYOUT.size,
+        'programmable_balls': num_programmable_balls * PROGRAMMABLE_BALL_LAYOUT.size,
+        'puzzle_solution_information': 132,
+    }
+    return sum(elements.values())
+
+def make_buffer(color: int, music: int, quiz_title: bytes, goal_description: bytes, normal_parts: list, belts: list, ropes: list, pulleys: list,
+                layout: str | Callable = 'spiral', seed: int = 0) -> bytearray:
+    """
+    Build a level file. Part objects in the part lists are written as given,
+    moving parts first. Every other entry of normal_parts is a placeholder for a
+    moving part placed by the layout generator, a LEVEL_LAYOUTS name or function.
+    """
+    assert 0 <= color <= 16
+    assert 1000 <= music <= 1023
+
+    given_parts = [part for part in (*normal_parts, *belts, *ropes, *pulleys) if isinstance(part, Part)]
+    moving_parts = [part for part in given_parts if part.flags_1 & Flags1.MOVING_PART]
+    fixed_parts = [part for part in given_parts if not part.flags_1 & Flags1.MOVING_PART]
+    num_generated = sum(1 for part in normal_parts if not isinstance(part, Part))
+    num_moving_parts = len(moving_parts) + num_generated
+    num_fixed_parts = len(fixed_parts)
+    if num_moving_parts > 0xFFFF or num_fixed_parts > 0xFFFF:
+        raise ValueError(f"A level holds at most 65535 moving and 65535 fixed parts, "
+                         f"got {num_moving_parts} moving and {num_fixed_parts} fixed")
+
+    part_classes = Counter(type(part) for part in given_parts)
+    filesize = calculate_filesize(len(quiz_title), len(goal_description), num_generated + part_classes[Part],
+                                  part_classes[Belt], part_classes[Rope], part_classes[Pulley],
+                                  part_classes[ProgrammableBall])
+    buffer = bytearray(filesize)
+
+    PREAMBLE_STRUCT.pack_into(buffer, 0, MAGIC_NUMBER, 0, color)
+    offset = PREAMBLE_STRUCT.size
+    buffer[offset:offset + len(quiz_title)] = quiz_title
+    offset += len(quiz_title)
+    buffer[offset:offset + len(goal_description)] = goal_description
+    offset += len(goal_description)
+
+    #Global puzzle information, no hints
+    pressure = 67
+    gravity = 272
+    GLOBAL_INFO_STRUCT.pack_into(buffer, offset, 0, pressure, gravity, 0, 0, music, num_fixed_parts, num_moving_parts, 0)
+    offset += GLOBAL_INFO_STRUCT.size
+
+    for part in moving_parts:
+        offset = part.pack_into(buffer, offset)
+    if num_generated and np is not None:
+        generated = generate_parts_block(num_generated, layout, seed)
+        buffer[offset:offset + len(generated)] = generated
+        offset += len(generated)
+    elif num_generated:
+        for x, y, part_type in zip(*run_layout(num_generated, layout, seed)):
+            offset = make_part(part_type, x, y, moving=True).pack_into(buffer, offset)
+    for part in fixed_parts:
+        offset = part.pack_into(buffer, offset)
+
+    buffer[offset:offset + SOLUTION_SIZE] = encode_solution({})
+    offset += SOLUTION_SIZE
+
+    assert offset == len(buffer), f'{offset}, {len(buffer)}'
+    return buffer
+    
+
+def flags1_to_list(flags: int) -> list[str]:
+    """Convert Flags1 to list of flag names"""
+    return FLAGS_1.to_list(flags)
+
+def flags2_to_list(flags: int) -> list[str]:
+    """Convert Flags2 to list of flag names"""
+    return FLAGS_2.to_list(flags)
+
+def flags3_to_list(flags: int) -> list[str]:
+    """Convert Flags3 to list of flag names"""
+    return FLAGS_3.to_list(flags)
+
+def list_to_flags1(flags_list: list[str]) -> int:
+    """Convert list of flag names to Flags1 value"""
+    return FLAGS_1.from_names(flags_list)
+
+def list_to_flags2(flags_list: list[str]) -> int:
+    """Convert list of flag names to Flags2 value"""
+    return FLAGS_2.from_names(flags_list)
+
+def list_to_flags3(flags_list: list[str]) -> int:
+    """Convert list of flag names to Flags3 value"""
+    return FLAGS_3.from_names(flags_list)
+
+def part_to_dict(part: Part) -> dict:
+    """Convert a Part object to a JSON-serializable dictionary"""
+    result = {
+        "part_type": part.part_type.name,
+        "position": {"x": part.pos_x, "y": part.pos_y},
+        "size": {
+            "width_1": part.width_1,
+            "height_1": part.height_1,
+            "width_2": part.width_2,
+            "height_2": part.height_2
+        }
+    }
+    
+    # Only include flags if they differ from defaults
+    default_f1, default_f2, default_f3 = get_default_part_flags(part.part_type)
+    if part.flags_1 != default_f1:
+        result["flags_1"] = FLAGS_1.to_list(part.flags_1)
     if part.flags_2 != default_f2:
-        result["flags_2"] = flags2_to_list(part.flags_2)
+        result["flags_2"] = FLAGS_2.to_list(part.flags_2)
     if part.flags_3 != default_f3:
-        result["flags_3"] = flags3_to_list(part.flags_3)
+        result["flags_3"] = FLAGS_3.to_list(part.flags_3)
     
     # Add optional fields only if non-default (skip unknown_* fields that are 0)
     if part.appearance != 0:
         result["appearance"] = part.appearance
+    if part.unknown_10 != 0:
+        result["unknown_10"] = part.unknown_10
     if part.behavior != 0:
         result["behavior"] = part.behavior
+    if part.unknown_26 != 0:
+        result["unknown_26"] = part.unknown_26
     
     # Belt connections
     if part.belt_connect_pos_x != 0 or part.belt_connect_pos_y != 0 or part.belt_line_distance != 0 or part.unknown_32 != 0:
@@ -1108,71 +2431,15 @@ def part_to_dict(part: Part) -> dict:
         result["outlet_plugged_2"] = part.outlet_plugged_2
     
     # Type-specific fields
-    if isinstance(part, Belt):
-        belt_data = {}
-        if part.BASEBALL != 0:
-            belt_data["BASEBALL"] = part.BASEBALL
-        if part.unknown_30 != 0:
-            belt_data["unknown_30"] = part.unknown_30
-        if part.belt_connected_part_1 != -1:
-            belt_data["connected_part_1"] = part.belt_connected_part_1
-        if part.belt_connected_part_2 != -1:
-            belt_data["connected_part_2"] = part.belt_connected_part_2
-        if part.unknown_36_belt != 0:
-            belt_data["unknown_36"] = part.unknown_36_belt
-        if part.unknown_38 != 0:
-            belt_data["unknown_38"] = part.unknown_38
-        if part.unknown_40 != 0:
-            belt_data["unknown_40"] = part.unknown_40
-        if part.NEWTON_MOUSE != 0:
-            belt_data["NEWTON_MOUSE"] = part.NEWTON_MOUSE
-        if belt_data:  # Only add if there's data
-            result["belt_data"] = belt_data
-    elif isinstance(part, Rope):
-        rope_data = {}
-        if part.rope_segment_length != 0:
-            rope_data["segment_length"] = part.rope_segment_length
-        if part.BASEBALL != 0:
-            rope_data["BASEBALL"] = part.BASEBALL
-        if part.unknown_30 != 0:
-            rope_data["unknown_30"] = part.unknown_30
-        if part.unknown_32_rope != 1:  # Default is 1, not 0
-            rope_data["unknown_32"] = part.unknown_32_rope
-        if part.rope_connected_part_1 != -1:
-            rope_data["connected_part_1"] = part.rope_connected_part_1
-        if part.rope_connected_part_2 != -1:
-            rope_data["connected_part_2"] = part.rope_connected_part_2
-        if part.part_1_connect_field_usage != 0:
-            rope_data["part_1_connect_field_usage"] = part.part_1_connect_field_usage
-        if part.part_2_connect_field_usage != 0:
-            rope_data["part_2_connect_field_usage"] = part.part_2_connect_field_usage
-        if part.TENNIS_BALL != 0:
-            rope_data["TENNIS_BALL"] = part.TENNIS_BALL
-        if part.unknown_46 != 0:
-            rope_data["unknown_46"] = part.unknown_46
-        if rope_data:  # Only add if there's data
-            result["rope_data"] = rope_data
-    elif isinstance(part, Pulley):
-        pulley_data: dict[str, object] = {}
-        if part.BASEBALL != 0:
-            pulley_data["BASEBALL"] = part.BASEBALL
-        if part.unknown_30 != 0:
-            pulley_data["unknown_30"] = part.unknown_30
-        if part.unknown_32_pulley != 1:  # Default is 1, not 0
-            pulley_data["unknown_32"] = part.unknown_32_pulley
-        if part.rope_index != -1:
-            pulley_data["rope_index"] = part.rope_index
-        if pulley_data:  # Only add if there's data
-            result["pulley_data"] = pulley_data
-    elif isinstance(part, ProgrammableBall):
-        result["programmable_ball_data"] = {
-            "density": part.density,
-            "elasticity": part.elasticity,
-            "friction": part.friction,
-            "gravity_buoyancy": part.gravity_buoyancy,
-            "mass": part.mass,
-            "appearance_2": part.appearance_2
-        }
+    layout = LAYOUTS_BY_CLASS[type(part)]
+    if layout.json_block:
+        block_data = {}
+        for attr, key, default in layout.json_fields:
+            value = getattr(part, attr)
+            if layout.json_always or value != default:
+                block_data[key] = value
+        if block_data:  # Only add if there's data
+            result[layout.json_block] = block_data
     
     return result
 
@@ -1183,17 +2450,17 @@ def dict_to_part(part_dict: dict) -> Part:
     
     # Convert flags - use defaults if not specified
     if "flags_1" in part_dict:
-        flags_1 = list_to_flags1(part_dict["flags_1"])
+        flags_1 = FLAGS_1.from_names(part_dict["flags_1"])
     else:
         flags_1, _, _ = get_default_part_flags(part_type)
     
     if "flags_2" in part_dict:
-        flags_2 = list_to_flags2(part_dict["flags_2"])
+        flags_2 = FLAGS_2.from_names(part_dict["flags_2"])
     else:
         _, flags_2, _ = get_default_part_flags(part_type)
     
     if "flags_3" in part_dict:
-        flags_3 = list_to_flags3(part_dict["flags_3"])
+        flags_3 = FLAGS_3.from_names(part_dict["flags_3"])
     else:
         _, _, flags_3 = get_default_part_flags(part_type)
     
@@ -1224,8 +2491,8 @@ def dict_to_part(part_dict: dict) -> Part:
         "height_2": height_2,
         "appearance": part_dict.get("appearance", 0),
         "behavior": part_dict.get("behavior", 0),
-        "unknown_10": 0,  # Always 0, not in JSON
-        "unknown_26": 0,  # Always 0, not in JSON
+        "unknown_10": part_dict.get("unknown_10", 0),
+        "unknown_26": part_dict.get("unknown_26", 0),
         "unknown_32": 0,
         "unknown_36": 0
     }
@@ -1257,113 +2524,199 @@ def dict_to_part(part_dict: dict) -> Part:
     kwargs["outlet_plugged_1"] = part_dict.get("outlet_plugged_1", -1)
     kwargs["outlet_plugged_2"] = part_dict.get("outlet_plugged_2", -1)
     
-    # Create appropriate part type
-    if "belt_data" in part_dict:
-        bd = part_dict["belt_data"]
-        kwargs.update({
-            "BASEBALL": bd.get("BASEBALL", 0),
-            "unknown_30": bd.get("unknown_30", 0),
-            "belt_connected_part_1": bd.get("connected_part_1", -1),
-            "belt_connected_part_2": bd.get("connected_part_2", -1),
-            "unknown_36_belt": bd.get("unknown_36", 0),
-            "unknown_38": bd.get("unknown_38", 0),
-            "unknown_40": bd.get("unknown_40", 0),
-            "NEWTON_MOUSE": bd.get("NEWTON_MOUSE", 0)
-        })
-        return Belt(**kwargs)
-    elif "rope_data" in part_dict:
-        rd = part_dict["rope_data"]
-        kwargs.update({
-            "rope_segment_length": rd.get("segment_length", 0),
-            "BASEBALL": rd.get("BASEBALL", 0),
-            "unknown_30": rd.get("unknown_30", 0),
-            "unknown_32_rope": rd.get("unknown_32", 1),
-            "rope_connected_part_1": rd.get("connected_part_1", -1),
-            "rope_connected_part_2": rd.get("connected_part_2", -1),
-            "part_1_connect_field_usage": rd.get("part_1_connect_field_usage", 0),
-            "part_2_connect_field_usage": rd.get("part_2_connect_field_usage", 0),
-            "TENNIS_BALL": rd.get("TENNIS_BALL", 0),
-            "unknown_46": rd.get("unknown_46", 0)
-        })
-        return Rope(**kwargs)
-    elif "pulley_data" in part_dict:
-        pd = part_dict["pulley_data"]
-        kwargs.update({
-            "BASEBALL": pd.get("BASEBALL", 0),
-            "unknown_30": pd.get("unknown_30", 0),
-            "unknown_32_pulley": pd.get("unknown_32", 1),
-            "rope_index": pd.get("rope_index", -1)
-        })
-        return Pulley(**kwargs)
-    elif "programmable_ball_data" in part_dict:
-        pbd = part_dict["programmable_ball_data"]
-        kwargs.update({
-            "density": pbd.get("density", 2832),
-            "elasticity": pbd.get("elasticity", 128),
-            "friction": pbd.get("friction", 16),
-            "gravity_buoyancy": pbd.get("gravity_buoyancy", 269),
-            "mass": pbd.get("mass", 200),
-            "appearance_2": pbd.get("appearance_2", 0)
-        })
-        return ProgrammableBall(**kwargs)
-    else:
-        return Part(**kwargs)
+    # Create appropriate part type with its type-specific fields
+    layout = get_part_layout(part_type)
+    if layout.json_block:
+        block_data = part_dict.get(layout.json_block, {})
+        for attr, key, default in layout.json_fields:
+            kwargs[attr] = block_data.get(key, default)
+    return layout.cls(**kwargs)
+
+class Profiler:
+    """
+    Wall time and counts per conversion stage and per part type.
+
+    Instrumented code asks current_profiler() for the active profiler and
+    records laps between timestamps. Outside of profiling() that is
+    NULL_PROFILER, whose methods do nothing, so the cost is one call per stage.
+    The optional callback is called with (stage, seconds) for every lap.
+    """
+    enabled = True
+
+    def __init__(self, callback: Callable[[str, float], None] | None = None):
+        self.callback = callback
+        self.stage_seconds: dict[str, float] = {}
+        self.stage_calls: dict[str, int] = {}
+        self.part_seconds: dict[tuple[str, str], float] = {}
+        self.part_counts: dict[tuple[str, str], int] = {}
+        self.cprofile: cProfile.Profile | None = None
+        self.memory_snapshot: tracemalloc.Snapshot | None = None
+        self.memory_peak = 0
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def lap(self, stage: str, start: float) -> float:
+        """Add the time since start to a stage, returns the current time for the next lap"""
+        now = time.perf_counter()
+        self.add(stage, now - start)
+        return now
+
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+        if self.callback is not None:
+            self.callback(stage, seconds)
+
+    def add_part(self, stage: str, part_type: int, seconds: float):
+        """Add the time one part spent in a stage, both per type and to the stage total"""
+        key = (stage, part_type_name(part_type))
+        self.part_seconds[key] = self.part_seconds.get(key, 0.0) + seconds
+        self.part_counts[key] = self.part_counts.get(key, 0) + 1
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+        self.stage_calls[stage] = self.stage_calls.get(stage, 0) + 1
+
+    def report(self, top: int = 20) -> str:
+        """Human-readable summary of everything that was captured"""
+        lines = [f"{'Stage':<24}{'Calls':>10}{'Total ms':>12}"]
+        for stage, seconds in self.stage_seconds.items():
+            lines.append(f"{stage:<24}{self.stage_calls[stage]:>10}{seconds * 1000:>12.2f}")
+        if self.part_counts:
+            lines.append("")
+            lines.append(f"{'Part type':<28}{'Stage':<18}{'Count':>8}{'Total ms':>12}{'Avg us':>10}")
+            for (stage, type_name), count in sorted(self.part_counts.items(), key=lambda item: (item[0][0], -item[1])):
+                seconds = self.part_seconds[stage, type_name]
+                lines.append(f"{type_name:<28}{stage:<18}{count:>8}{seconds * 1000:>12.2f}{seconds / count * 1e6:>10.2f}")
+        if self.cprofile is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.cprofile, stream=stream).sort_stats('cumulative').print_stats(top)
+            lines.append("")
+            lines.append(stream.getvalue().rstrip())
+        if self.memory_snapshot is not None:
+            lines.append("")
+            lines.append(f"Peak traced memory: {self.memory_peak / 1024 / 1024:.1f} MiB")
+            for stat in self.memory_snapshot.statistics('lineno')[:top]:
+                lines.append(f"  {stat}")
+        return "\n".join(lines)
+
+
+class NullProfiler(Profiler):
+    """Profiler used when profiling is off, every method is a no-op"""
+    enabled = False
+
+    def now(self) -> float:
+        return 0.0
+
+    def lap(self, stage: str, start: float) -> float:
+        return 0.0
+
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        pass
+
+    def add_part(self, stage: str, part_type: int, seconds: float):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+_active_profiler: ContextVar[Profiler] = ContextVar('active_profiler', default=NULL_PROFILER)
+
+
+def current_profiler() -> Profiler:
+    """The profiler of the enclosing profiling() block, or NULL_PROFILER"""
+    return _active_profiler.get()
+
+
+@contextmanager
+def profiling(callback: Callable[[str, float], None] | None = None, cprofile: bool = False, memory: bool = False):
+    """
+    Profile the conversions run inside the block:
+
+        with profiling() as profiler:
+            tim_to_json('level.TIM')
+        print(profiler.report())
+
+    cprofile additionally captures a cProfile profile, memory a tracemalloc
+    snapshot and peak of the block.
+    """
+    profiler = Profiler(callback)
+    token = _active_profiler.set(profiler)
+    if memory:
+        tracemalloc.start()
+    if cprofile:
+        profiler.cprofile = cProfile.Profile()
+        profiler.cprofile.enable()
+    try:
+        yield profiler
+    finally:
+        if cprofile:
+            profiler.cprofile.disable()
+        if memory:
+            profiler.memory_peak = tracemalloc.get_traced_memory()[1]
+            profiler.memory_snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        _active_profiler.reset(token)
+
 
 def tim_to_json(tim_filepath: str) -> dict:
     """Parse a TIM file and convert to JSON-serializable dictionary"""
-    with open(tim_filepath, 'rb') as f:
-        data = f.read()
-    
-    offset = 0
-    
-    # Magic number
-    _magic = struct.unpack_from('>I', data, offset)[0]
-    offset += 4
-    
-    # Background
-    bg_unknown, bg_color = struct.unpack_from('>BB', data, offset)
-    offset += 2
-    
-    # Quiz title (null-terminated string)
-    title_start = offset
-    while data[offset] != 0:
-        offset += 1
-    offset += 1
-    quiz_title = data[title_start:offset-1].decode('latin-1')
-    
-    # Goal description (null-terminated string)
-    desc_start = offset
-    while data[offset] != 0:
-        offset += 1
-    offset += 1
-    goal_description = data[desc_start:offset-1].decode('latin-1')
-    
-    # Hints
-    num_hints = struct.unpack_from('<H', data, offset)[0]
-    offset += 2
-    offset += 7 * 8  # Skip hint data
-    
-    # Global puzzle information
-    pressure, gravity, unk4, unk6, music, num_fixed, num_moving, unk14 = struct.unpack_from('<hhHHHHHH', data, offset)
-    offset += 16
+    return level_to_json(read_tim_file(tim_filepath))
+
+def level_to_json(level: Level) -> dict:
+    """Render a decoded level as a JSON-serializable dictionary"""
+    result = header_to_json(level.header)
+    profiler = current_profiler()
+    if profiler.enabled:
+        parts = []
+        for part in level.parts:
+            part_start = profiler.now()
+            parts.append(part_to_dict(part))
+            profiler.add_part('parts.to_dict', part.part_type, profiler.now() - part_start)
+    else:
+        parts = [part_to_dict(part) for part in level.parts]
+    result["parts"] = parts
+    solution_data = solution_to_json(level.solution)
+    if solution_data:
+        result["solution"] = solution_data
+    return result
+
+def header_to_json(header: LevelHeader) -> dict:
+    """Members of the level JSON object that come before the parts"""
+    result: dict[str,object] = {
+        "version": "TIM2",
+        "title": header.quiz_title,
+        "description": header.goal_description
+    }
     
-    # Parse all parts (moving + fixed)
-    normal_parts = []
-    total_parts = num_moving + num_fixed
-    for _ in range(total_parts):
-        part, part_size = parse_part_from_bytes(data, offset)
-        offset += part_size
-        normal_parts.append(part_to_dict(part))
+    # Only include background.unknown if it's not 0
+    bg_data = {"color": header.bg_color}
+    if header.bg_unknown != 0:
+        bg_data["unknown"] = header.bg_unknown
+    result["background"] = bg_data
     
-    # Solution information
-    _num_conditions = struct.unpack_from('<H', data, offset)[0]
-    offset += 2
+    # Build global_settings, excluding zero unknowns
+    global_settings = {
+        "pressure": header.pressure,
+        "gravity": header.gravity,
+        "music": header.music,
+        "num_moving": header.num_moving  # Preserve this for round-trip conversion
+    }
+    if header.unknown_4 != 0:
+        global_settings["unknown_4"] = header.unknown_4
+    if header.unknown_6 != 0:
+        global_settings["unknown_6"] = header.unknown_6
+    if header.unknown_14 != 0:
+        global_settings["unknown_14"] = header.unknown_14
+    result["global_settings"] = global_settings
     
+    # Only include hints if there are any
+    if header.num_hints > 0:
+        result["hints"] = {"count": header.num_hints}
+    return result
+
+def solution_to_json(solution: LevelSolution) -> dict:
+    """The "solution" member of the level JSON object, empty if there is nothing to store"""
     solution_conditions = []
-    for _ in range(8):
-        cond_data = struct.unpack_from('<hHHHhhhh', data, offset)
-        offset += 16
-        part_idx, state1, state2, count, rect_x, rect_y, rect_w, rect_h = cond_data
+    for part_idx, state1, state2, count, rect_x, rect_y, rect_w, rect_h in solution.conditions:
         if part_idx != -1 or state1 != 0 or state2 != 0 or count != 0:
             solution_conditions.append({
                 "part_index": part_idx,
@@ -1377,380 +2730,1200 @@ def tim_to_json(tim_filepath: str) -> dict:
                     "height": rect_h
                 }
             })
+    solution_data = {}
+    if solution_conditions:
+        solution_data["conditions"] = solution_conditions
+    if solution.delay != 0:
+        solution_data["delay"] = solution.delay
+    return solution_data
+
+JSON_ENCODER = json.JSONEncoder(indent=2, ensure_ascii=False)
+
+def write_level_json(reader: TimReader, out):
+    """
+    Stream a level to a text file as JSON while decoding it, one part at a time.
+
+    The output is byte-identical to json.dump(tim_to_json(...), out, indent=2,
+    ensure_ascii=False), but only one part is held in memory. Encoded JSON
+    never contains raw newlines inside strings, so nested values are indented
+    by prefixing their line breaks.
+    """
+    encode = JSON_ENCODER.encode
+    profiler = current_profiler()
     
-    delay = struct.unpack_from('<H', data, offset)[0]
-    
-    # Build JSON structure
-    result: dict[str,object] = {
-        "version": "TIM2",
-        "title": quiz_title,
-        "description": goal_description
-    }
-    
-    # Only include background.unknown if it's not 0
-    bg_data = {"color": bg_color}
-    if bg_unknown != 0:
-        bg_data["unknown"] = bg_unknown
-    result["background"] = bg_data
-    
-    # Build global_settings, excluding zero unknowns
-    global_settings = {
-        "pressure": pressure,
-        "gravity": gravity,
-        "music": music,
-        "num_moving": num_moving  # Preserve this for round-trip conversion
-    }
-    if unk4 != 0:
-        global_settings["unknown_4"] = unk4
-    if unk6 != 0:
-        global_settings["unknown_6"] = unk6
-    if unk14 != 0:
-        global_settings["unknown_14"] = unk14
-    result["global_settings"] = global_settings
+    def write_member(separator: str, key: str, value: object):
+        out.write(separator)
+        out.write(encode(key))
+        out.write(': ')
+        out.write(encode(value).replace('\n', '\n  '))
     
-    # Only include hints if there are any
-    if num_hints > 0:
-        result["hints"] = {"count": num_hints}
+    header = reader.read_header()
+    separator = '{\n  '
+    for key, value in header_to_json(header).items():
+        write_member(separator, key, value)
+        separator = ',\n  '
     
-    result["parts"] = normal_parts
+    out.write(',\n  "parts": [')
+    separator = '\n    '
+    for part in reader.iter_parts(header.num_parts):
+        part_start = profiler.now()
+        out.write(separator)
+        out.write(encode(part_to_dict(part)).replace('\n', '\n    '))
+        separator = ',\n    '
+        profiler.add_part('parts.to_json', part.part_type, profiler.now() - part_start)
+    out.write(']' if header.num_parts == 0 else '\n  ]')
     
-    # Solution
-    solution_data = {}
-    if solution_conditions:
-        solution_data["conditions"] = solution_conditions
-    if delay != 0:
-        solution_data["delay"] = delay
+    solution_data = solution_to_json(reader.read_solution())
     if solution_data:
-        result["solution"] = solution_data
-    
-    return result
+        write_member(',\n  ', "solution", solution_data)
+    out.write('\n}')
+
+CANONICAL_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def strip_unknown_fields(data: dict) -> dict:
+    """Copy of a level JSON object without its unknown_* members, at any depth"""
+    return {key: strip_unknown_fields(value) if isinstance(value, dict) else value
+            for key, value in data.items() if not key.startswith('unknown')}
+
+
+def canonical_part_order(keys: list[str], links: list[list[int]], condition_targets: list[int]) -> list[int]:
+    """
+    Part indices sorted by key, ties broken by what the parts are linked to.
+
+    Starting from the rank of every key, each round ranks the parts again by
+    their rank, the ranks of the parts they link to and the (field, rank) of
+    the links and solution conditions pointing at them, until no rank splits
+    further. The result does not depend on the original part order, except
+    between parts that stay tied and are therefore interchangeable.
+    """
+    num_parts = len(keys)
+    incoming = [[] for _ in range(num_parts)]
+    for source, targets in enumerate(links):
+        for field, target in enumerate(targets):
+            if 0 <= target < num_parts:
+                incoming[target].append((field, source))
+    for slot, target in enumerate(condition_targets):
+        if 0 <= target < num_parts:
+            incoming[target].append((-1 - slot, -1))
+
+    distinct = sorted(set(keys))
+    rank_of = {key: rank for rank, key in enumerate(distinct)}
+    ranks = [rank_of[key] for key in keys]
+    num_ranks = len(distinct)
+    while num_ranks < num_parts:
+        signatures = [
+            (ranks[i],
+             tuple((0, ranks[target]) if 0 <= target < num_parts else (1, target) for target in links[i]),
+             tuple(sorted((field, ranks[source] if source >= 0 else -1) for field, source in incoming[i])))
+            for i in range(num_parts)
+        ]
+        distinct = sorted(set(signatures))
+        if len(distinct) == num_ranks:
+            break
+        rank_of = {signature: rank for rank, signature in enumerate(distinct)}
+        ranks = [rank_of[signature] for signature in signatures]
+        num_ranks = len(distinct)
+    return sorted(range(num_parts), key=ranks.__getitem__)
+
+
+def level_fingerprint(reader: TimReader) -> str:
+    """
+    SHA-256 of a canonical form of a level, equal for levels that only differ
+    in part order or unknown fields.
+
+    The canonical form is the level JSON of tim_to_json without unknown_*
+    members. Parts are sorted by their JSON with the link fields left out, ties
+    broken by canonical_part_order, then links and solution part indices are
+    renumbered to the sorted order. Only the JSON of every part is kept for
+    sorting, the hash is fed one part at a time.
+    """
+    encode = CANONICAL_ENCODER.encode
+    header = reader.read_header()
+    header_data = strip_unknown_fields(header_to_json(header))
+
+    keys = []
+    links = []
+    for part in reader.iter_parts(header.num_parts):
+        link_fields = LINK_FIELDS_BY_CLASS[type(part)]
+        links.append([getattr(part, field) for field in link_fields])
+        # The part was decoded just for this, unlink it in place
+        for field in link_fields:
+            setattr(part, field, -1)
+        keys.append(encode(strip_unknown_fields(part_to_dict(part))))
+    solution_data = strip_unknown_fields(solution_to_json(reader.read_solution()))
+    conditions = solution_data.get("conditions", ())
+    order = canonical_part_order(keys, links, [condition["part_index"] for condition in conditions])
+    canonical_index = {index: rank for rank, index in enumerate(order)}
+
+    digest = hashlib.sha256()
+    digest.update(encode(header_data).encode())
+    for index in order:
+        digest.update(b'\n')
+        digest.update(keys[index].encode())
+        digest.update(encode([canonical_index.get(target, target) for target in links[index]]).encode())
+    for condition in conditions:
+        condition["part_index"] = canonical_index.get(condition["part_index"], condition["part_index"])
+    digest.update(b'\n')
+    digest.update(encode(solution_data).encode())
+    return digest.hexdigest()
+
 
-def json_to_tim(json_data: dict) -> bytes:
-    """Convert a JSON dictionary to TIM file bytes"""
-    # Extract data
+def fingerprint_tim_file(filepath: str | Path) -> str:
+    """Canonical fingerprint of a TIM file, see level_fingerprint"""
+    with open(filepath, 'rb') as tim_file, mmap.mmap(tim_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return level_fingerprint(TimReader(data))
+
+
+def encode_level_header(json_data: dict, num_parts: int, num_flagged_moving: int) -> bytes:
+    """
+    Encode everything before the parts from the level JSON members. The moving
+    part count comes from global_settings if present, otherwise it is the
+    number of parts with the MOVING_PART flag.
+    """
     title = json_data["title"].encode('latin-1') + b'\0'
     description = json_data["description"].encode('latin-1') + b'\0'
     bg = json_data["background"]
     settings = json_data["global_settings"]
-    parts_data = json_data["parts"]
-    solution = json_data.get("solution", {})
-    
-    # Convert parts
-    parts = [dict_to_part(p) for p in parts_data]
-    
-    # Count part types
-    num_normal = len([p for p in parts if isinstance(p, Part) and not isinstance(p, (Belt, Rope, Pulley, ProgrammableBall))])
-    num_belts = len([p for p in parts if isinstance(p, Belt)])
-    num_ropes = len([p for p in parts if isinstance(p, Rope)])
-    num_pulleys = len([p for p in parts if isinstance(p, Pulley)])
-    num_programmable = len([p for p in parts if isinstance(p, ProgrammableBall)])
     
-    # Calculate file size
-    filesize = calculate_filesize(len(title), len(description), num_normal, num_belts, num_ropes, num_pulleys, num_programmable)
-    buffer = bytearray(filesize)
-    offset = 0
+    # Global settings - use num_moving from JSON if available, otherwise calculate from flags
+    num_moving = settings.get("num_moving", num_flagged_moving)
+    num_fixed = num_parts - num_moving
     
-    # Magic number
-    struct.pack_into('>I', buffer, offset, 0xEFAC1301)
-    offset += 4
+    # Hints are empty for now, only their count is kept
+    hints_count = json_data.get("hints", {}).get("count", 0)
+    return b''.join((
+        PREAMBLE_STRUCT.pack(MAGIC_NUMBER, bg.get("unknown", 0), bg["color"]),
+        title,
+        description,
+        GLOBAL_INFO_STRUCT.pack(hints_count,
+                                settings["pressure"], settings["gravity"],
+                                settings.get("unknown_4", 0), settings.get("unknown_6", 0),
+                                settings["music"], num_fixed, num_moving,
+                                settings.get("unknown_14", 0)),
+    ))
+
+def encode_solution(solution: dict) -> bytes:
+    """Encode the 132-byte solution block from the level JSON "solution" member"""
+    conditions = solution.get("conditions", [])
+    buffer = bytearray(SOLUTION_SIZE)
+    struct.pack_into('<H', buffer, 0, len(conditions))
     
-    # Background (unknown defaults to 0 if not present)
-    struct.pack_into('>BB', buffer, offset, bg.get("unknown", 0), bg["color"])
-    offset += 2
+    # Write up to 8 conditions
+    for i in range(8):
+        offset = 2 + i * SOLUTION_CONDITION_STRUCT.size
+        if i < len(conditions):
+            cond = conditions[i]
+            rect = cond["rectangle"]
+            SOLUTION_CONDITION_STRUCT.pack_into(buffer, offset,
+                                                cond["part_index"], cond["state_1"], cond["state_2"],
+                                                cond["count"], rect["x"], rect["y"],
+                                                rect["width"], rect["height"])
+        else:
+            SOLUTION_CONDITION_STRUCT.pack_into(buffer, offset, -1, 0, 0, 0, 0, 0, 0, 0)
     
-    # Title and description
-    struct.pack_into(f'<{len(title)}s', buffer, offset, title)
-    offset += len(title)
-    struct.pack_into(f'<{len(description)}s', buffer, offset, description)
-    offset += len(description)
+    struct.pack_into('<H', buffer, SOLUTION_SIZE - 2, solution.get("delay", 0))
+    return bytes(buffer)
+
+def json_to_tim(json_data: dict) -> bytearray:
+    """Convert a JSON dictionary to TIM file bytes, packed in place into one buffer"""
+    parts_data = json_data["parts"]
     
-    # Hints (empty for now)
-    hints_count = json_data.get("hints", {}).get("count", 0)
-    struct.pack_into('<H', buffer, offset, hints_count)
-    offset += 2
-    offset += 7 * 8  # Skip hint data
+    # Convert parts
+    profiler = current_profiler()
+    if profiler.enabled:
+        parts = []
+        for p in parts_data:
+            part_start = profiler.now()
+            parts.append(dict_to_part(p))
+            profiler.add_part('parts.from_dict', parts[-1].part_type, profiler.now() - part_start)
+    else:
+        parts = [dict_to_part(p) for p in parts_data]
+    start = profiler.now()
     
-    # Global settings - use num_moving from JSON if available, otherwise calculate from flags
-    if "num_moving" in settings:
-        num_moving = settings["num_moving"]
-        num_fixed = len(parts) - num_moving
+    if "num_moving" in json_data["global_settings"]:
+        num_flagged_moving = 0
     else:
         # Backward compatibility: calculate from MOVING_PART flags
-        num_moving = sum(1 for p in parts if p.flags_1 & Flags1.MOVING_PART)
-        num_fixed = len(parts) - num_moving
+        num_flagged_moving = sum(1 for p in parts if p.flags_1 & Flags1.MOVING_PART)
+    header = encode_level_header(json_data, len(parts), num_flagged_moving)
     
-    struct.pack_into('<hhHHHHHH', buffer, offset,
-                     settings["pressure"], settings["gravity"],
-                     settings.get("unknown_4", 0), settings.get("unknown_6", 0),
-                     settings["music"], num_fixed, num_moving,
-                     settings.get("unknown_14", 0))
-    offset += 16
+    # Count part types
+    counts = Counter(type(p) for p in parts)
+    
+    # Calculate file size
+    filesize = len(header) + SOLUTION_SIZE + sum(LAYOUTS_BY_CLASS[cls].size * count for cls, count in counts.items())
+    buffer = bytearray(filesize)
+    buffer[:len(header)] = header
+    offset = len(header)
+    start = profiler.lap('header', start)
     
     # Write parts in their original order from JSON
-    for part in parts:
-        part_bytes = part.to_bytes()
-        buffer[offset:offset+len(part_bytes)] = part_bytes
-        offset += len(part_bytes)
+    if profiler.enabled:
+        for part in parts:
+            part_start = profiler.now()
+            offset = part.pack_into(buffer, offset)
+            profiler.add_part('parts.encode', part.part_type, profiler.now() - part_start)
+        start = profiler.now()
+    else:
+        for part in parts:
+            offset = part.pack_into(buffer, offset)
     
-    # Solution information
-    conditions = solution.get("conditions", [])
-    struct.pack_into('<H', buffer, offset, len(conditions))
-    offset += 2
+    buffer[offset:] = encode_solution(json_data.get("solution", {}))
+    profiler.lap('solution', start)
     
-    # Write up to 8 conditions
-    for i in range(8):
-        if i < len(conditions):
-            cond = conditions[i]
-            rect = cond["rectangle"]
-            struct.pack_into('<hHHHhhhh', buffer, offset,
-                           cond["part_index"], cond["state_1"], cond["state_2"],
-                           cond["count"], rect["x"], rect["y"],
-                           rect["width"], rect["height"])
-        else:
-            struct.pack_into('<hHHHhhhh', buffer, offset, -1, 0, 0, 0, 0, 0, 0, 0)
-        offset += 16
+    return buffer
+
+class JsonStreamReader:
+    """
+    Incremental reader for one JSON document in a text stream.
+
+    Objects and arrays can be walked member by member, and every value is
+    decoded by the stdlib decoder as soon as it is complete, so only the
+    value being decoded has to fit in memory.
+    """
+    WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, fileobj, chunk_size: int = 1 << 16):
+        self.fileobj = fileobj
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Drop the consumed text and read more, returns False at the end of the stream"""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        # Grow the reads with the buffer, so a large value is not re-decoded too often
+        chunk = self.fileobj.read(max(self.chunk_size, len(self.buffer)))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer += chunk
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character, empty at the end of the stream"""
+        while True:
+            self.pos = self.WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self) -> object:
+        """Decode the next complete value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def iter_object(self):
+        """Yield the keys of an object, the value of each key must be read before the next one"""
+        self._expect('{')
+        if self._peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            if self._peek() != '"':
+                raise json.JSONDecodeError("Expecting property name enclosed in double quotes", self.buffer, self.pos)
+            key = self.value()
+            self._expect(':')
+            yield key
+            if self._expect(',}') == '}':
+                return
+
+    def iter_array(self):
+        """Yield the decoded elements of an array one by one"""
+        self._expect('[')
+        if self._peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._expect(',]') == ']':
+                return
+
+    def end(self):
+        """Check that nothing but whitespace follows the document"""
+        if self._peek():
+            raise json.JSONDecodeError("Extra data", self.buffer, self.pos)
+
+def stream_json_to_tim(json_file, tim_file) -> int:
+    """
+    Convert a level JSON text stream to a seekable binary stream, encoding each
+    part as soon as it is read. Returns the number of bytes written.
+
+    When the title and description come before the parts, as in files written
+    by tim2json, a placeholder header is written first and patched with the
+    part counts at the end. Otherwise the parts are spooled to a temporary file
+    until the header is known.
+    """
+    reader = JsonStreamReader(json_file)
+    profiler = current_profiler()
+    members = {}  # Every member of the level except the parts
+    parts_file = None
+    header_size = 0
+    num_parts = num_flagged_moving = 0
+    buffer = bytearray(max(layout.size for layout in LAYOUTS_BY_CLASS.values()))
+    view = memoryview(buffer)
+    moving_part = Flags1.MOVING_PART.value  # Plain int, IntFlag operators are slow
     
-    struct.pack_into('<H', buffer, offset, solution.get("delay", 0))
-    offset += 2
+    for key in reader.iter_object():
+        if key != "parts":
+            members[key] = reader.value()
+            continue
+        if "title" in members and "description" in members:
+            parts_file = tim_file
+            header_size = len(members["title"].encode('latin-1')) + len(members["description"].encode('latin-1')) + \
+                PREAMBLE_STRUCT.size + 2 + GLOBAL_INFO_STRUCT.size
+            tim_file.write(bytes(header_size))
+        else:
+            parts_file = tempfile.TemporaryFile()
+        for part_dict in reader.iter_array():
+            part_start = profiler.now()
+            part = dict_to_part(part_dict)
+            size = part.pack_into(buffer, 0)
+            parts_file.write(view[:size])
+            num_parts += 1
+            if part.flags_1 & moving_part:
+                num_flagged_moving += 1
+            profiler.add_part('parts.encode', part.part_type, profiler.now() - part_start)
+    reader.end()
+    if parts_file is None:
+        raise KeyError("parts")
     
-    return bytes(buffer)
+    header = encode_level_header(members, num_parts, num_flagged_moving)
+    if parts_file is tim_file:
+        if len(header) != header_size:
+            raise ValueError("Title or description was redefined after the parts")
+        parts_end = tim_file.tell()
+        tim_file.seek(0)
+        tim_file.write(header)
+        tim_file.seek(parts_end)
+    else:
+        tim_file.write(header)
+        with parts_file:
+            parts_file.seek(0)
+            shutil.copyfileobj(parts_file, tim_file)
+    tim_file.write(encode_solution(members.get("solution", {})))
+    return tim_file.tell()
 
-def parse_tim_file(filepath: str):
-    '''Parse a TIM file and print all information to console'''
-    with open(filepath, 'rb') as f:
-        data = f.read()
-    
-    offset = 0
-    
-    # Magic number
-    magic = struct.unpack_from('>I', data, offset)[0]
-    offset += 4
-    print(f"Magic Number: 0x{magic:08X}")
-    if magic != 0xEFAC1301:
-        print("Warning: Invalid magic number!")
-    
-    # Background
-    bg_unknown, bg_color = struct.unpack_from('>BB', data, offset)
-    offset += 2
-    print(f"Background: unknown={bg_unknown}, color={bg_color}")
-    
-    # Quiz title (null-terminated string)
-    title_start = offset
-    while data[offset] != 0:
-        offset += 1
-    offset += 1  # Include null terminator
-    quiz_title = data[title_start:offset-1].decode('latin-1')
-    print(f"Quiz Title: '{quiz_title}'")
-    
-    # Goal description (null-terminated string)
-    desc_start = offset
-    while data[offset] != 0:
-        offset += 1
-    offset += 1  # Include null terminator
-    goal_description = data[desc_start:offset-1].decode('latin-1')
-    print(f"Goal Description: '{goal_description}'")
-    
-    # Hints (2 byte num + 8 * 7 bytes)
-    num_hints = struct.unpack_from('<H', data, offset)[0]
-    offset += 2
-    print(f"Number of Hints: {num_hints}")
-    # Skip hint data (8 hints * 7 bytes each)
-    offset += 7 * 8
+def parse_tim_file(filepath: str, file=None):
+    '''Parse a TIM file and print all information to console, or to file if given'''
+    print_level(read_tim_file(filepath), file)
+
+
+def print_level(level: Level, file=None):
+    '''Print all information of a decoded level to console, or to file if given'''
+    report = partial(print, file=file)
+    header = level.header
+    profiler = current_profiler()
+    start = profiler.now()
+    
+    report(f"Magic Number: 0x{header.magic:08X}")
+    if header.magic != MAGIC_NUMBER:
+        report("Warning: Invalid magic number!")
+    report(f"Background: unknown={header.bg_unknown}, color={header.bg_color}")
+    report(f"Quiz Title: '{header.quiz_title}'")
+    report(f"Goal Description: '{header.goal_description}'")
+    report(f"Number of Hints: {header.num_hints}")
     
     # Global puzzle information
-    pressure, gravity, unk4, unk6, music, num_fixed, num_moving, unk14 = struct.unpack_from('<hhHHHHHH', data, offset)
-    offset += 16
-    print(f"\n{'='*60}")
-    print("Global Puzzle Information:")
-    print(f"{'='*60}")
-    print(f"  Pressure: {pressure}")
-    print(f"  Gravity: {gravity}")
-    print(f"  Unknown_4: {unk4}")
-    print(f"  Unknown_6: {unk6}")
-    print(f"  Music: {music}")
-    print(f"  Fixed Parts: {num_fixed}")
-    print(f"  Moving Parts: {num_moving}")
-    print(f"  Unknown_14: {unk14}")
-    
-    def get_part_type_name(part_type_val: int) -> str:
-        """Get human-readable part type name"""
-        try:
-            return PartType(part_type_val).name
-        except ValueError:
-            return f"UNKNOWN_{part_type_val}"
-    
-    def format_flags1(flags: int) -> list[str]:
-        """Format Flags1 into readable list"""
-        result = []
-        if flags & Flags1.UNKNOWN_0x40:
-            result.append("UNKNOWN_0x40")
-        if flags & Flags1.CAN_FLIP_VERTICAL:
-            result.append("CAN_FLIP_VERTICAL")
-        if flags & Flags1.CAN_FLIP_HORIZONTAL:
-            result.append("CAN_FLIP_HORIZONTAL")
-        if flags & Flags1.MOVING_PART:
-            result.append("MOVING_PART")
-        if flags & Flags1.FIXED_PART_1:
-            result.append("FIXED_PART_1")
-        if flags & Flags1.FIXED_PART_2:
-            result.append("FIXED_PART_2")
-        return result if result else ["NONE"]
-    
-    def format_flags2(flags: int) -> list[str]:
-        """Format Flags2 into readable list"""
-        result = []
-        if flags & Flags2.BELT_CAN_CONNECT:
-            result.append("BELT_CAN_CONNECT")
-        if flags & Flags2.BELT_IS_CONNECTED:
-            result.append("BELT_IS_CONNECTED")
-        if flags & Flags2.ROPE_CAN_CONNECT:
-            result.append("ROPE_CAN_CONNECT")
-        if flags & Flags2.ROPE_CAN_CONNECT_2:
-            result.append("ROPE_CAN_CONNECT_2")
-        if flags & Flags2.SPRITE_FLIP_HORIZONTAL:
-            result.append("SPRITE_FLIP_HORIZONTAL")
-        if flags & Flags2.SPRITE_FLIP_VERTICAL:
-            result.append("SPRITE_FLIP_VERTICAL")
-        if flags & Flags2.PROBABLY_UNUSED:
-            result.append("PROBABLY_UNUSED")
-        if flags & Flags2.CAN_STRETCH_ONE_DIR:
-            result.append("CAN_STRETCH_ONE_DIR")
-        if flags & Flags2.CAN_STRETCH_BOTH:
-            result.append("CAN_STRETCH_BOTH")
-        return result if result else ["NONE"]
-    
-    def format_flags3(flags: int) -> list[str]:
-        """Format Flags3 into readable list"""
-        result = []
-        if flags & Flags3.CAN_PLUG_OUTLET:
-            result.append("CAN_PLUG_OUTLET")
-        if flags & Flags3.IS_ELECTRIC_OUTLET:
-            result.append("IS_ELECTRIC_OUTLET")
-        if flags & Flags3.CAN_BURN_OR_FUSE:
-            result.append("CAN_BURN_OR_FUSE")
-        if flags & Flags3.UNKNOWN_0x8:
-            result.append("UNKNOWN_0x8")
-        if flags & Flags3.LOCKED:
-            result.append("LOCKED")
-        if flags & Flags3.SIZABLE_SCENERY:
-            result.append("SIZABLE_SCENERY")
-        if flags & Flags3.UNKNOWN_0x100:
-            result.append("UNKNOWN_0x100")
-        if flags & Flags3.SHOW_PROGRAM_ICON:
-            result.append("SHOW_PROGRAM_ICON")
-        if flags & Flags3.SCENERY_PART:
-            result.append("SCENERY_PART")
-        if flags & Flags3.WALL_PART:
-            result.append("WALL_PART")
-        if flags & Flags3.SHOW_SOLUTION_ICON:
-            result.append("SHOW_SOLUTION_ICON")
-        return result if result else ["NONE"]
-    
-    # Parse all parts (moving and fixed)
-    print(f"\n{'='*60}")
-    print(f"All Parts ({num_moving} moving + {num_fixed} fixed = {num_moving + num_fixed}):")
-    print(f"{'='*60}")
-    total_parts = num_moving + num_fixed
-    for i in range(total_parts):
-        part, part_size = parse_part_from_bytes(data, offset)
-        offset += part_size
-        
+    num_fixed, num_moving = header.num_fixed, header.num_moving
+    report(f"\n{'='*60}")
+    report("Global Puzzle Information:")
+    report(f"{'='*60}")
+    report(f"  Pressure: {header.pressure}")
+    report(f"  Gravity: {header.gravity}")
+    report(f"  Unknown_4: {header.unknown_4}")
+    report(f"  Unknown_6: {header.unknown_6}")
+    report(f"  Music: {header.music}")
+    report(f"  Fixed Parts: {num_fixed}")
+    report(f"  Moving Parts: {num_moving}")
+    report(f"  Unknown_14: {header.unknown_14}")
+    
+    # All parts (moving and fixed)
+    report(f"\n{'='*60}")
+    report(f"All Parts ({num_moving} moving + {num_fixed} fixed = {num_moving + num_fixed}):")
+    report(f"{'='*60}")
+    for i, part in enumerate(level.parts):
+        part_size = LAYOUTS_BY_CLASS[type(part)].size
         part_category = "MOVING" if i < num_moving else "FIXED"
-        print(f"\n  Part {i} ({part_category}): {get_part_type_name(part.part_type)} [{part_size} bytes]")
-        print(f"    Position: ({part.pos_x}, {part.pos_y})")
-        print(f"    Size 1: {part.width_1} x {part.height_1}")
-        print(f"    Size 2: {part.width_2} x {part.height_2}")
-        print(f"    Appearance: {part.appearance}")
-        print(f"    Behavior: {part.behavior}")
-        print(f"    Flags1 (0x{part.flags_1:04X}): {', '.join(format_flags1(part.flags_1))}")
-        print(f"    Flags2 (0x{part.flags_2:04X}): {', '.join(format_flags2(part.flags_2))}")
-        print(f"    Flags3 (0x{part.flags_3:04X}): {', '.join(format_flags3(part.flags_3))}")
+        report(f"\n  Part {i} ({part_category}): {part_type_name(part.part_type)} [{part_size} bytes]")
+        report(f"    Position: ({part.pos_x}, {part.pos_y})")
+        report(f"    Size 1: {part.width_1} x {part.height_1}")
+        report(f"    Size 2: {part.width_2} x {part.height_2}")
+        report(f"    Appearance: {part.appearance}")
+        report(f"    Behavior: {part.behavior}")
+        report(f"    Flags1 (0x{part.flags_1:04X}): {', '.join(FLAGS_1.names(part.flags_1) or ('NONE',))}")
+        report(f"    Flags2 (0x{part.flags_2:04X}): {', '.join(FLAGS_2.names(part.flags_2) or ('NONE',))}")
+        report(f"    Flags3 (0x{part.flags_3:04X}): {', '.join(FLAGS_3.names(part.flags_3) or ('NONE',))}")
         
         if part.belt_connect_pos_x != 0 or part.belt_connect_pos_y != 0:
-            print(f"    Belt Connect: ({part.belt_connect_pos_x}, {part.belt_connect_pos_y}), Distance: {part.belt_line_distance}")
+            report(f"    Belt Connect: ({part.belt_connect_pos_x}, {part.belt_connect_pos_y}), Distance: {part.belt_line_distance}")
         if part.rope_1_connect_pos_x != 0 or part.rope_1_connect_pos_y != 0:
-            print(f"    Rope 1 Connect: ({part.rope_1_connect_pos_x}, {part.rope_1_connect_pos_y})")
+            report(f"    Rope 1 Connect: ({part.rope_1_connect_pos_x}, {part.rope_1_connect_pos_y})")
         if part.rope_2_connect_pos_x != 0 or part.rope_2_connect_pos_y != 0:
-            print(f"    Rope 2 Connect: ({part.rope_2_connect_pos_x}, {part.rope_2_connect_pos_y})")
+            report(f"    Rope 2 Connect: ({part.rope_2_connect_pos_x}, {part.rope_2_connect_pos_y})")
         if part.connected_1 != -1:
-            print(f"    Connected 1: {part.connected_1}")
+            report(f"    Connected 1: {part.connected_1}")
         if part.connected_2 != -1:
-            print(f"    Connected 2: {part.connected_2}")
+            report(f"    Connected 2: {part.connected_2}")
         if part.outlet_plugged_1 != -1:
-            print(f"    Outlet Plugged 1: {part.outlet_plugged_1}")
+            report(f"    Outlet Plugged 1: {part.outlet_plugged_1}")
         if part.outlet_plugged_2 != -1:
-            print(f"    Outlet Plugged 2: {part.outlet_plugged_2}")
+            report(f"    Outlet Plugged 2: {part.outlet_plugged_2}")
         if part.unknown_10 != 0:
-            print(f"    Unknown_10: {part.unknown_10}")
+            report(f"    Unknown_10: {part.unknown_10}")
         if part.unknown_26 != 0:
-            print(f"    Unknown_26: {part.unknown_26}")
+            report(f"    Unknown_26: {part.unknown_26}")
         if part.unknown_32 != 0:
-            print(f"    Unknown_32: {part.unknown_32}")
+            report(f"    Unknown_32: {part.unknown_32}")
         if part.unknown_36 != 0:
-            print(f"    Unknown_36: {part.unknown_36}")
+            report(f"    Unknown_36: {part.unknown_36}")
         
         # Type-specific fields
         if isinstance(part, Belt):
             if part.BASEBALL != 0:
-                print(f"    Belt BASEBALL: {part.BASEBALL}")
+                report(f"    Belt BASEBALL: {part.BASEBALL}")
             if part.unknown_30 != 0:
-                print(f"    Belt Unknown_30: {part.unknown_30}")
+                report(f"    Belt Unknown_30: {part.unknown_30}")
             if part.belt_connected_part_1 != -1:
-                print(f"    Belt Connected Part 1: {part.belt_connected_part_1}")
+                report(f"    Belt Connected Part 1: {part.belt_connected_part_1}")
             if part.belt_connected_part_2 != -1:
-                print(f"    Belt Connected Part 2: {part.belt_connected_part_2}")
+                report(f"    Belt Connected Part 2: {part.belt_connected_part_2}")
         elif isinstance(part, Rope):
             if part.rope_segment_length != 0:
-                print(f"    Rope Segment Length: {part.rope_segment_length}")
+                report(f"    Rope Segment Length: {part.rope_segment_length}")
             if part.rope_connected_part_1 != -1:
-                print(f"    Rope Connected Part 1: {part.rope_connected_part_1}")
+                report(f"    Rope Connected Part 1: {part.rope_connected_part_1}")
             if part.rope_connected_part_2 != -1:
-                print(f"    Rope Connected Part 2: {part.rope_connected_part_2}")
+                report(f"    Rope Connected Part 2: {part.rope_connected_part_2}")
         elif isinstance(part, Pulley):
-            print(f"    Pulley BASEBALL: {part.BASEBALL}")
-            print(f"    Pulley unknown_30: {part.unknown_30}")
-            print(f"    Pulley unknown_32: {part.unknown_32_pulley}")
+            report(f"    Pulley BASEBALL: {part.BASEBALL}")
+            report(f"    Pulley unknown_30: {part.unknown_30}")
+            report(f"    Pulley unknown_32: {part.unknown_32_pulley}")
             if part.rope_index != -1:
-                print(f"    Pulley rope_index: {part.rope_index}")
+                report(f"    Pulley rope_index: {part.rope_index}")
         elif isinstance(part, ProgrammableBall):
-            print(f"    Density: {part.density}")
-            print(f"    Elasticity: {part.elasticity}")
-            print(f"    Friction: {part.friction}")
-            print(f"    Gravity/Buoyancy: {part.gravity_buoyancy}")
-            print(f"    Mass: {part.mass}")
+            report(f"    Density: {part.density}")
+            report(f"    Elasticity: {part.elasticity}")
+            report(f"    Friction: {part.friction}")
+            report(f"    Gravity/Buoyancy: {part.gravity_buoyancy}")
+            report(f"    Mass: {part.mass}")
+    
+    start = profiler.lap('parts.report', start)
     
     # Solution information (132 bytes)
-    print(f"\n{'='*60}")
-    print("Solution Information:")
-    print(f"{'='*60}")
-    num_conditions = struct.unpack_from('<H', data, offset)[0]
-    offset += 2
-    print(f"Number of Conditions: {num_conditions}")
-    for i in range(8):
-        cond_data = struct.unpack_from('<hHHHhhhh', data, offset)
-        offset += 16
-        part_idx, state1, state2, count, rect_x, rect_y, rect_w, rect_h = cond_data
+    report(f"\n{'='*60}")
+    report("Solution Information:")
+    report(f"{'='*60}")
+    report(f"Number of Conditions: {level.solution.num_conditions}")
+    for i, (part_idx, state1, state2, count, rect_x, rect_y, rect_w, rect_h) in enumerate(level.solution.conditions):
         if part_idx != -1 or state1 != 0 or state2 != 0 or count != 0:
-            print(f"\n  Condition {i}:")
-            print(f"    Part Index: {part_idx}")
-            print(f"    State 1: {state1}")
-            print(f"    State 2: {state2}")
-            print(f"    Count: {count}")
-            print(f"    Rectangle: ({rect_x}, {rect_y}) {rect_w}x{rect_h}")
-    
-    delay = struct.unpack_from('<H', data, offset)[0]
-    offset += 2
-    print(f"\nDelay: {delay}")
-    
-    print(f"\n{'='*60}")
-    print("File Statistics:")
-    print(f"{'='*60}")
-    print(f"Total file size: {len(data)} bytes")
-    print(f"Bytes parsed: {offset}")
-    if offset != len(data):
-        print(f"Warning: {len(data) - offset} bytes remaining!")
+            report(f"\n  Condition {i}:")
+            report(f"    Part Index: {part_idx}")
+            report(f"    State 1: {state1}")
+            report(f"    State 2: {state2}")
+            report(f"    Count: {count}")
+            report(f"    Rectangle: ({rect_x}, {rect_y}) {rect_w}x{rect_h}")
+    
+    report(f"\nDelay: {level.solution.delay}")
+    
+    report(f"\n{'='*60}")
+    report("File Statistics:")
+    report(f"{'='*60}")
+    report(f"Total file size: {level.file_size} bytes")
+    report(f"Bytes parsed: {level.parsed_size}")
+    if level.parsed_size != level.file_size:
+        report(f"Warning: {level.file_size - level.parsed_size} bytes remaining!")
+    else:
+        report("File parsed successfully!")
+    profiler.lap('solution.report', start)
+
+
+def convert_tim_to_json_file(input_path: Path, output_path: Path):
+    """Convert a TIM file to a pretty-printed JSON file"""
+    with open(input_path, 'rb') as tim_file, mmap.mmap(tim_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        try:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                write_level_json(TimReader(data), f)
+        except BaseException:
+            # The JSON is written while the level decodes, do not leave the part written so far
+            Path(output_path).unlink(missing_ok=True)
+            raise
+
+
+def convert_json_to_tim_file(input_path: Path, output_path: Path) -> int:
+    """Convert a JSON file to a TIM file with constant memory, returns the number of bytes written"""
+    try:
+        with open(input_path, 'r', encoding='utf-8') as json_file, open(output_path, 'wb') as tim_file:
+            return stream_json_to_tim(json_file, tim_file)
+    except BaseException:
+        # Do not leave a partially written level behind
+        Path(output_path).unlink(missing_ok=True)
+        raise
+
+
+def try_convert(convert: Callable, input_path: Path, output_path: Path) -> str | None:
+    """Run a conversion, returning the error message instead of raising"""
+    try:
+        convert(input_path, output_path)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def convert_files(convert: Callable, input_files: list[Path], output_files: list[Path], jobs: int = 1) -> list[tuple[Path, str]]:
+    """
+    Convert files one to one, in a process pool when jobs > 1.
+
+    Progress is printed in input order no matter which worker finishes first.
+    A failing file does not stop the batch, returns the (file, error) pairs.
+    """
+    failures = []
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        chunksize = max(1, len(input_files) // (jobs * 4))
+        results = executor.map(try_convert, repeat(convert), input_files, output_files, chunksize=chunksize)
+    else:
+        executor = None
+        results = map(try_convert, repeat(convert), input_files, output_files)
+    try:
+        for input_file, output_file, error in zip(input_files, output_files, results):
+            if error is None:
+                print(f"  {input_file.name} -> {output_file.name}")
+            else:
+                print(f"  {input_file.name} -> {output_file.name} FAILED: {error}")
+                failures.append((input_file, error))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return failures
+
+
+def print_failures(failures: list[tuple[Path, str]]):
+    """Print the summary of a batch conversion's failed files"""
+    if failures:
+        print(f"Failed to convert {len(failures)} file(s):")
+        for input_file, error in failures:
+            print(f"  {input_file}: {error}")
+
+
+def decode_level(data: bytes) -> Level:
+    """Decode TIM file data into a Level"""
+    return TimReader(data).read()
+
+
+def tim_data_to_json(data: bytes) -> dict:
+    """Convert TIM file data to the level JSON object"""
+    return level_to_json(decode_level(data))
+
+
+# Async counterparts for asyncio services. File I/O runs in a thread with
+# asyncio.to_thread. Decoding and encoding run in the given executor, or the
+# loop's default thread pool when it is None. Pass a ProcessPoolExecutor to
+# keep CPU-bound work from holding the GIL of the event loop's process.
+
+async def load_level_async(filepath: str | Path, executor=None) -> Level:
+    """Async read_tim_file"""
+    data = await asyncio.to_thread(Path(filepath).read_bytes)
+    return await asyncio.get_running_loop().run_in_executor(executor, decode_level, data)
+
+
+async def save_tim_async(filepath: str | Path, data: bytes) -> int:
+    """Write TIM file data, returns the number of bytes written"""
+    return await asyncio.to_thread(Path(filepath).write_bytes, data)
+
+
+async def tim_to_json_async(filepath: str | Path, executor=None) -> dict:
+    """Async tim_to_json"""
+    data = await asyncio.to_thread(Path(filepath).read_bytes)
+    return await asyncio.get_running_loop().run_in_executor(executor, tim_data_to_json, data)
+
+
+async def json_to_tim_async(json_data: dict, executor=None) -> bytearray:
+    """Async json_to_tim"""
+    return await asyncio.get_running_loop().run_in_executor(executor, json_to_tim, json_data)
+
+
+async def convert_files_async(convert: Callable, input_files: list[Path], output_files: list[Path],
+                              concurrency: int = 4, executor=None) -> list[tuple[Path, str]]:
+    """
+    Async convert_files: convert files one to one with at most concurrency
+    conversions in flight. convert is convert_tim_to_json_file,
+    convert_json_to_tim_file or another function of (input path, output path).
+    A failing file does not stop the batch, returns the (file, error) pairs.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def convert_one(input_file: Path, output_file: Path) -> str | None:
+        async with semaphore:
+            return await loop.run_in_executor(executor, try_convert, convert, input_file, output_file)
+
+    errors = await asyncio.gather(*map(convert_one, input_files, output_files))
+    return [(input_file, error) for input_file, error in zip(input_files, errors) if error is not None]
+
+
+def validation_report(input_path: Path) -> dict:
+    """Validate a TIM file into one entry of the --validate report"""
+    try:
+        issues = validate_tim_file(input_path)
+    except OSError as e:
+        issues = [ValidationIssue('read', 'error', f"{type(e).__name__}: {e}")]
+    except (struct.error, ValueError, IndexError) as e:
+        # Malformed data the checks did not anticipate, report it instead of failing the whole run
+        issues = [ValidationIssue('decode', 'error', f"{type(e).__name__}: {e}")]
+    num_errors = sum(1 for issue in issues if issue.severity == 'error')
+    return {
+        "file": str(input_path),
+        "errors": num_errors,
+        "warnings": len(issues) - num_errors,
+        "issues": [{"check": issue.check, "severity": issue.severity, "message": issue.message, "part": issue.part}
+                   for issue in issues],
+    }
+
+
+def validate_files(input_files: list[Path], out, jobs: int = 1) -> int:
+    """
+    Validate TIM files, in a process pool when jobs > 1, and write the report
+    as one JSON object per line in input order. Returns the number of files with errors.
+    """
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        chunksize = max(1, len(input_files) // (jobs * 4))
+        reports = executor.map(validation_report, input_files, chunksize=chunksize)
+    else:
+        executor = None
+        reports = map(validation_report, input_files)
+    num_invalid = 0
+    try:
+        for report in reports:
+            out.write(json.dumps(report, ensure_ascii=False) + '\n')
+            if report["errors"]:
+                num_invalid += 1
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return num_invalid
+
+
+def try_fingerprint(input_path: Path) -> tuple[str | None, str | None]:
+    """Fingerprint a TIM file, returning (fingerprint, None) or (None, error message)"""
+    try:
+        return fingerprint_tim_file(input_path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def find_duplicates(input_files: list[Path], jobs: int = 1) -> tuple[dict[str, list[Path]], list[tuple[Path, str]]]:
+    """
+    Fingerprint files in one pass, in a process pool when jobs > 1.
+    Returns the files of every fingerprint shared by several files, and the (file, error) pairs of failed ones.
+    """
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        chunksize = max(1, len(input_files) // (jobs * 4))
+        results = executor.map(try_fingerprint, input_files, chunksize=chunksize)
     else:
-        print("File parsed successfully!")
+        executor = None
+        results = map(try_fingerprint, input_files)
+    groups: dict[str, list[Path]] = {}
+    failures = []
+    try:
+        for input_file, (fingerprint, error) in zip(input_files, results):
+            if error is None:
+                groups.setdefault(fingerprint, []).append(input_file)
+            else:
+                failures.append((input_file, error))
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    return {fingerprint: files for fingerprint, files in groups.items() if len(files) > 1}, failures
+
+
+CONVERTER_VERSION = '0.1.0'  # Bump when conversion output changes, invalidates incremental manifests
+MANIFEST_FILENAME = '.tim2leveler-manifest'
+
+
+def file_sha256(path: Path) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.file_digest(f, 'sha256').hexdigest()
+
+
+class ConversionManifest:
+    """
+    Record of the files converted into an output directory, for incremental runs.
+
+    Entries are keyed by output file name and hold the source path, size,
+    mtime, content hash and converter version. A source whose size and mtime
+    are unchanged is not even hashed.
+    """
+
+    def __init__(self, output_dir: Path, entries: dict[str, dict]):
+        self.path = output_dir / MANIFEST_FILENAME
+        self.entries = entries
+
+    @classmethod
+    def load(cls, output_dir: Path) -> 'ConversionManifest':
+        try:
+            with open(output_dir / MANIFEST_FILENAME, 'r', encoding='utf-8') as f:
+                entries = json.load(f)["entries"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            entries = {}
+        return cls(output_dir, entries)
+
+    def save(self):
+        """Write the manifest, replacing the previous one atomically"""
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"entries": self.entries}, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def is_current(self, source: Path, output: Path) -> bool:
+        """Whether output was converted from the current content of source"""
+        entry = self.entries.get(output.name)
+        if (entry is None or entry["converter_version"] != CONVERTER_VERSION
+                or entry["source"] != str(source.resolve()) or not output.exists()):
+            return False
+        stat = source.stat()
+        if stat.st_size != entry["size"]:
+            return False
+        if stat.st_mtime_ns != entry["mtime_ns"]:
+            # Touched but maybe not modified, compare the content
+            if file_sha256(source) != entry["sha256"]:
+                return False
+            entry["mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def record(self, source: Path, output: Path):
+        stat = source.stat()
+        self.entries[output.name] = {
+            "source": str(source.resolve()),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_sha256(source),
+            "converter_version": CONVERTER_VERSION,
+        }
+
+    def forget(self, output: Path):
+        self.entries.pop(output.name, None)
+
+    def prune(self) -> list[Path]:
+        """Delete outputs whose source no longer exists, returns the deleted paths"""
+        pruned = []
+        for name, entry in list(self.entries.items()):
+            if not Path(entry["source"]).exists():
+                output = self.path.parent / name
+                output.unlink(missing_ok=True)
+                del self.entries[name]
+                pruned.append(output)
+        return pruned
+
+
+def convert_directory(convert: Callable, input_files: list[Path], output_dir: Path, output_suffix: str,
+                      jobs: int = 1, incremental: bool = False) -> tuple[int, list[tuple[Path, str]]]:
+    """
+    Convert input_files into output_dir, optionally skipping unchanged inputs.
+    Returns (number of files converted, failures).
+    """
+    output_files = [output_dir / input_file.with_suffix(output_suffix).name for input_file in input_files]
+    manifest = None
+    if incremental:
+        manifest = ConversionManifest.load(output_dir)
+        for output_file in manifest.prune():
+            print(f"  Pruned {output_file.name}, its source was deleted")
+        stale = [i for i, (input_file, output_file) in enumerate(zip(input_files, output_files))
+                 if not manifest.is_current(input_file, output_file)]
+        if len(stale) < len(input_files):
+            print(f"  Skipping {len(input_files) - len(stale)} unchanged file(s)")
+        input_files = [input_files[i] for i in stale]
+        output_files = [output_files[i] for i in stale]
+
+    failures = convert_files(convert, input_files, output_files, jobs)
+
+    if manifest is not None:
+        failed = {input_file for input_file, _ in failures}
+        for input_file, output_file in zip(input_files, output_files):
+            if input_file in failed:
+                manifest.forget(output_file)
+            else:
+                manifest.record(input_file, output_file)
+        manifest.save()
+    return len(input_files), failures
+
+
+WATCH_POLL_INTERVAL = 0.1  # Seconds between directory scans in --watch mode
+WATCH_SETTLE_TIME = 0.25  # Seconds a changed file must stay unchanged before it is converted
+
+
+def file_snapshot(path: Path) -> tuple[int, int] | None:
+    """(size, mtime) of a file, None if it does not exist"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def reconvert_json_file(input_path: Path, output_path: Path) -> str | None:
+    """
+    Convert a JSON file to TIM through a temporary file, so a failed
+    conversion keeps the previous output. Returns the error message, if any.
+    """
+    temp_path = output_path.with_name(output_path.name + '.tmp')
+    error = try_convert(convert_json_to_tim_file, input_path, temp_path)
+    if error is None:
+        os.replace(temp_path, output_path)
+    return error
+
+
+def watch_json_directory(input_dir: Path, output_dir: Path, poll_interval: float = WATCH_POLL_INTERVAL,
+                         settle_time: float = WATCH_SETTLE_TIME):
+    """
+    Convert the JSON files of a directory to TIM whenever they change, until interrupted.
+
+    The directory is polled for the size and mtime of its JSON files. A changed
+    file is converted once it has not changed for settle_time, so a burst of
+    saves is converted once. Files newer than their TIM output are converted on start.
+    """
+    def output_path(input_path: Path) -> Path:
+        return output_dir / input_path.with_suffix('.TIM').name
+
+    snapshots = {input_path: file_snapshot(input_path) for input_path in input_dir.glob('*.json')}
+    pending: dict[Path, float] = {}  # Changed files and when they were last seen changing
+    for input_path, snapshot in snapshots.items():
+        output_snapshot = file_snapshot(output_path(input_path))
+        if snapshot is not None and (output_snapshot is None or output_snapshot[1] < snapshot[1]):
+            pending[input_path] = 0.0
+
+    while True:
+        now = time.monotonic()
+        current = {input_path: file_snapshot(input_path) for input_path in input_dir.glob('*.json')}
+        for input_path, snapshot in current.items():
+            if snapshot is not None and snapshot != snapshots.get(input_path):
+                pending[input_path] = now
+        snapshots = current
+
+        for input_path, changed in list(pending.items()):
+            if now - changed < settle_time:
+                continue
+            del pending[input_path]
+            if input_path not in snapshots:
+                continue
+            start = time.perf_counter()
+            error = reconvert_json_file(input_path, output_path(input_path))
+            if error is None:
+                print(f"  {input_path.name} -> {output_path(input_path).name} "
+                      f"({(time.perf_counter() - start) * 1000:.0f} ms)", flush=True)
+            else:
+                print(f"  {input_path.name} FAILED: {error}", flush=True)
+        time.sleep(poll_interval)
+
+
+def rpc_parse(params: dict) -> str:
+    """The --parse report of params["path"]"""
+    out = io.StringIO()
+    parse_tim_file(params["path"], out)
+    return out.getvalue()
+
+
+def rpc_tim2json(params: dict) -> dict:
+    """Convert params["input"] to JSON, written to params["output"] if given, otherwise returned"""
+    if params.get("output"):
+        convert_tim_to_json_file(Path(params["input"]), Path(params["output"]))
+        return {"output": params["output"]}
+    return tim_to_json(params["input"])
+
+
+def rpc_json2tim(params: dict) -> dict:
+    """Convert params["input"] to a TIM file at params["output"]"""
+    num_bytes = convert_json_to_tim_file(Path(params["input"]), Path(params["output"]))
+    return {"output": params["output"], "bytes": num_bytes}
+
+
+def rpc_validate(params: dict) -> dict:
+    """The --validate report entry of params["path"]"""
+    return validation_report(Path(params["path"]))
+
+
+# Method name: (function, required params)
+RPC_METHODS: dict[str, tuple[Callable[[dict], object], tuple[str, ...]]] = {
+    'parse': (rpc_parse, ('path',)),
+    'tim2json': (rpc_tim2json, ('input',)),
+    'json2tim': (rpc_json2tim, ('input', 'output')),
+    'validate': (rpc_validate, ('path',)),
+}
+
+# JSON-RPC 2.0 error codes
+RPC_PARSE_ERROR = -32700
+RPC_INVALID_REQUEST = -32600
+RPC_METHOD_NOT_FOUND = -32601
+RPC_INVALID_PARAMS = -32602
+RPC_SERVER_ERROR = -32000
+
+
+def handle_rpc_request(line: str | bytes, executor=None) -> str:
+    """
+    Answer one line of line-delimited JSON-RPC 2.0 with one line of JSON, without
+    the line break. The method runs in executor if given, otherwise in this thread.
+    """
+    request_id = None
+
+    def error(code: int, message: str) -> str:
+        return json.dumps({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}},
+                          ensure_ascii=False)
+
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        return error(RPC_PARSE_ERROR, f"Parse error: {e}")
+    if not isinstance(request, dict):
+        return error(RPC_INVALID_REQUEST, "Request must be a JSON object")
+    request_id = request.get("id")
+    if request.get("method") not in RPC_METHODS:
+        return error(RPC_METHOD_NOT_FOUND, f"Unknown method {request.get('method')!r}, "
+                                           f"expected one of {', '.join(RPC_METHODS)}")
+    method, required = RPC_METHODS[request["method"]]
+    params = request.get("params", {})
+    if not isinstance(params, dict):
+        return error(RPC_INVALID_PARAMS, "params must be an object")
+    missing = [name for name in required if name not in params]
+    if missing:
+        return error(RPC_INVALID_PARAMS, f"Missing parameter(s): {', '.join(missing)}")
+    try:
+        result = executor.submit(method, params).result() if executor is not None else method(params)
+    except Exception as e:
+        return error(RPC_SERVER_ERROR, f"{type(e).__name__}: {e}")
+    return json.dumps({"jsonrpc": "2.0", "id": request_id, "result": result}, ensure_ascii=False)
+
+
+class RpcRequestHandler(socketserver.StreamRequestHandler):
+    """Serves the requests of one client connection, one per line, in order"""
+
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(handle_rpc_request(line, self.server.executor).encode() + b'\n')
+                self.wfile.flush()
+
+
+class RpcServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Conversion daemon on a Unix domain socket. Every client gets its own
+    thread, and the conversions run in a shared worker pool if one is given.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, executor=None):
+        self.executor = executor
+        super().__init__(socket_path, RpcRequestHandler)
+
+
+def ignore_stop_signals():
+    """Worker initializer, the parent stops the workers when it shuts the pool down"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def serve(address: str, jobs: int = 1):
+    """
+    Serve JSON-RPC conversion requests until interrupted, on the Unix domain socket
+    at address, or on stdin and stdout if address is '-'.
+    """
+    executor = None
+    if jobs > 1:
+        # Spawned rather than forked from a threaded server, and left alone by Ctrl+C and SIGTERM
+        executor = ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=ignore_stop_signals)
+    try:
+        if address == '-':
+            for line in sys.stdin:
+                if line.strip():
+                    print(handle_rpc_request(line, executor), flush=True)
+            return
+        Path(address).unlink(missing_ok=True)  # Left behind by a previous run
+        signal.signal(signal.SIGTERM, signal.default_int_handler)  # Stop like Ctrl+C so the socket is removed
+        with RpcServer(address, executor) as server:
+            print(f"Serving on {address} with {jobs} worker(s), press Ctrl+C to stop", file=sys.stderr, flush=True)
+            try:
+                server.serve_forever()
+            finally:
+                Path(address).unlink(missing_ok=True)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+
+
+INDEX_FILENAME = '.tim2leveler-index.sqlite'
+INDEX_SCHEMA_VERSION = 1  # Bump when the tables change, the index is then rebuilt
+# Columns of the levels table and operators accepted by CorpusIndex.find
+INDEX_QUERY_COLUMNS = ('path', 'size', 'title', 'description', 'bg_color', 'music', 'pressure', 'gravity',
+                       'num_hints', 'num_fixed', 'num_moving', 'num_parts')
+INDEX_QUERY_OPERATORS = ('<=', '>=', '!=', '=', '<', '>', 'LIKE')
+INDEX_SCHEMA = """
+CREATE TABLE levels (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    title TEXT, description TEXT, bg_color INTEGER, music INTEGER, pressure INTEGER, gravity INTEGER,
+    num_hints INTEGER, num_fixed INTEGER, num_moving INTEGER, num_parts INTEGER
+);
+CREATE TABLE part_counts (
+    level_id INTEGER NOT NULL REFERENCES levels(id) ON DELETE CASCADE,
+    part_type TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (level_id, part_type)
+);
+CREATE TABLE parts (
+    level_id INTEGER NOT NULL REFERENCES levels(id) ON DELETE CASCADE,
+    part_index INTEGER NOT NULL,
+    part_type TEXT NOT NULL,
+    moving INTEGER NOT NULL,
+    pos_x INTEGER, pos_y INTEGER, width INTEGER, height INTEGER,
+    flags_1 INTEGER, flags_2 INTEGER, flags_3 INTEGER,
+    PRIMARY KEY (level_id, part_index)
+);
+CREATE INDEX part_counts_by_type ON part_counts (part_type, count);
+CREATE INDEX parts_by_type ON parts (part_type);
+CREATE INDEX levels_by_music ON levels (music);
+"""
+
+
+class CorpusIndex:
+    """
+    SQLite database of the levels in a directory, for searching a corpus without parsing it again.
+
+    Holds the header of every level in levels, the number of parts of every
+    type in part_counts and every part in parts. update() only parses files
+    whose size or mtime changed since they were indexed:
+
+        with CorpusIndex(Path('levels')) as index:
+            index.update()
+            index.find(uses=['PULLEY'], filters=[('num_moving', '>', 20), ('music', '=', 1005)])
+
+    With read_only the database is opened with mode=ro, for searching an
+    index built before without any way to change it.
+    """
+
+    def __init__(self, directory: Path, db_path: Path | None = None, read_only: bool = False):
+        self.directory = directory
+        db_path = db_path or directory / INDEX_FILENAME
+        if read_only:
+            if not Path(db_path).exists():
+                raise ValueError(f"{db_path} is missing, build it with --index first")
+            self.db = sqlite3.connect(f'{Path(db_path).resolve().as_uri()}?mode=ro', uri=True)
+            if self.db.execute('PRAGMA user_version').fetchone()[0] != INDEX_SCHEMA_VERSION:
+                self.db.close()
+                raise ValueError(f"{db_path} is outdated, update it with --index first")
+            return
+        self.db = sqlite3.connect(db_path)
+        self.db.execute('PRAGMA foreign_keys = ON')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != INDEX_SCHEMA_VERSION:
+            with self.db:
+                for table in ('parts', 'part_counts', 'levels'):
+                    self.db.execute(f'DROP TABLE IF EXISTS {table}')
+                self.db.executescript(INDEX_SCHEMA)
+                self.db.execute(f'PRAGMA user_version = {INDEX_SCHEMA_VERSION}')
+
+    def __enter__(self) -> 'CorpusIndex':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def update(self) -> tuple[int, int, int, list[tuple[Path, str]]]:
+        """
+        Index new and changed TIM files of the directory and drop deleted ones.
+        Returns (files indexed, files unchanged, files removed, failures).
+        """
+        tim_files = sorted(set(self.directory.glob('*.TIM')) | set(self.directory.glob('*.tim')))
+        indexed = {path: (size, mtime_ns) for path, size, mtime_ns
+                   in self.db.execute('SELECT path, size, mtime_ns FROM levels')}
+        num_indexed = num_unchanged = 0
+        failures = []
+        with self.db:
+            for tim_file in tim_files:
+                stat = tim_file.stat()
+                if indexed.pop(str(tim_file), None) == (stat.st_size, stat.st_mtime_ns):
+                    num_unchanged += 1
+                    continue
+                try:
+                    level = read_tim_file(tim_file)
+                except Exception as e:
+                    self.db.execute('DELETE FROM levels WHERE path = ?', (str(tim_file),))
+                    failures.append((tim_file, f"{type(e).__name__}: {e}"))
+                    continue
+                self._store(tim_file, stat, level)
+                num_indexed += 1
+            self.db.executemany('DELETE FROM levels WHERE path = ?', ((path,) for path in indexed))
+        return num_indexed, num_unchanged, len(indexed), failures
+
+    def _store(self, tim_file: Path, stat: os.stat_result, level: Level):
+        """Replace the rows of one level"""
+        header = level.header
+        self.db.execute('DELETE FROM levels WHERE path = ?', (str(tim_file),))
+        level_id = self.db.execute(
+            'INSERT INTO levels (path, size, mtime_ns, title, description, bg_color, music, pressure, gravity, '
+            'num_hints, num_fixed, num_moving, num_parts) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (str(tim_file), stat.st_size, stat.st_mtime_ns, header.quiz_title, header.goal_description,
+             header.bg_color, header.music, header.pressure, header.gravity,
+             header.num_hints, header.num_fixed, header.num_moving, len(level.parts)),
+        ).lastrowid
+        part_types = [part_type_name(part.part_type) for part in level.parts]
+        self.db.executemany('INSERT INTO part_counts VALUES (?, ?, ?)',
+                            ((level_id, name, count) for name, count in Counter(part_types).items()))
+        self.db.executemany('INSERT INTO parts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+            (level_id, index, name, bool(part.flags_1 & Flags1.MOVING_PART), part.pos_x, part.pos_y,
+             part.width_1, part.height_1, part.flags_1, part.flags_2, part.flags_3)
+            for index, (name, part) in enumerate(zip(part_types, level.parts))))
+
+    def find(self, uses=(), filters=()) -> list[str]:
+        """
+        Paths of the indexed levels using all part types in uses and matching
+        all (column, operator, value) filters on the columns of the levels
+        table. Values are bound as parameters, columns and operators are
+        checked against INDEX_QUERY_COLUMNS and INDEX_QUERY_OPERATORS.
+        """
+        conditions = ['EXISTS (SELECT 1 FROM part_counts WHERE level_id = levels.id AND part_type = ?)'] * len(uses)
+        values = list(uses)
+        for column, operator, value in filters:
+            if column not in INDEX_QUERY_COLUMNS:
+                raise ValueError(f"Cannot filter on {column!r}, expected one of {', '.join(INDEX_QUERY_COLUMNS)}")
+            if operator not in INDEX_QUERY_OPERATORS:
+                raise ValueError(f"Unknown operator {operator!r}, expected one of {' '.join(INDEX_QUERY_OPERATORS)}")
+            conditions.append(f'{column} {operator} ?')
+            values.append(value)
+        sql = 'SELECT path FROM levels'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        return [path for path, in self.db.execute(sql + ' ORDER BY path', values)]
 
 
 def main():
@@ -1773,9 +3946,86 @@ def main():
                         help='Convert a TIM file to JSON format')
     parser.add_argument('--json2tim', type=str, metavar='FILE',
                         help='Convert a JSON file to TIM format')
+    parser.add_argument('--profile', nargs='?', const='stages', choices=['stages', 'cprofile', 'memory', 'all'],
+                        help='Print per-stage timings of --parse, --tim2json or --json2tim to stderr, '
+                             'optionally with a cProfile or tracemalloc capture')
+    parser.add_argument('--part-memory', type=str, metavar='FILE',
+                        help='Report the memory used per decoded part when loading a TIM file')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help='Number of worker processes for directory conversion (0 = one per CPU)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only convert changed files of a directory and prune outputs of deleted ones')
+    parser.add_argument('--validate', type=str, metavar='PATH',
+                        help='Check a TIM file or every TIM file in a directory, '
+                             'writing a JSON lines report to --output or stdout')
+    parser.add_argument('--duplicates', type=str, metavar='DIR',
+                        help='Group the TIM files of a directory that hold the same level')
+    parser.add_argument('--serve', type=str, metavar='SOCKET',
+                        help='Serve parse, tim2json, json2tim and validate requests as line-delimited JSON-RPC '
+                             'on a Unix domain socket, or on stdin and stdout if SOCKET is -')
+    parser.add_argument('--watch', type=str, metavar='DIR',
+                        help='Convert the JSON files of a directory to TIM whenever they change, into --output DIR if given')
+    parser.add_argument('--index', type=str, metavar='DIR',
+                        help=f'Update the search index ({INDEX_FILENAME}) of the TIM files in a directory')
+    parser.add_argument('--query', type=str, metavar='DIR',
+                        help='List the indexed levels of a directory matching --uses and --where')
+    parser.add_argument('--uses', type=str, action='append', default=[], metavar='PART_TYPE',
+                        help='With --query, only levels containing this part type (repeatable)')
+    parser.add_argument('--where', type=parse_level_filter, action='append', default=[], metavar='FILTER',
+                        help='With --query, a condition on a level column, e.g. "num_moving > 20" or "title LIKE %%ball%%" (repeatable)')
+    parser.add_argument('--patch', type=str, metavar='FILE',
+                        help='Rewrite fields of one part of a TIM file in place, see --part and --set')
+    parser.add_argument('--part', type=int, metavar='N',
+                        help='With --patch, the index of the part')
+    parser.add_argument('--set', type=parse_field_assignment, action='append', default=[], metavar='FIELD=VALUE',
+                        help='With --patch, a record field and its new value, e.g. pos_x=120 or flags_1=0x1000 (repeatable)')
+    parser.add_argument('--layout', choices=list(LEVEL_LAYOUTS), default='spiral',
+                        help='How the generated level places its parts')
+    parser.add_argument('--num-parts', type=int, default=150, metavar='N',
+                        help='Number of parts in the generated level')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed of the scatter and poisson layouts')
     
     args = parser.parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
     
+    if args.profile:
+        # Worker processes are not profiled, keep everything in this one
+        with profiling(cprofile=args.profile in ('cprofile', 'all'),
+                       memory=args.profile in ('memory', 'all')) as profiler:
+            run_mode(args, jobs=1)
+        print(profiler.report(), file=sys.stderr)
+        return
+    run_mode(args, jobs)
+
+
+def parse_field_assignment(text: str) -> tuple[str, int]:
+    """Parse a FIELD=VALUE command line argument, the value may be written in hex"""
+    name, sep, value = text.partition('=')
+    try:
+        if not sep:
+            raise ValueError
+        return name.strip(), int(value, 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected FIELD=VALUE with an integer value, got {text!r}") from None
+
+
+def parse_level_filter(text: str) -> tuple[str, str, int | str]:
+    """Parse a COLUMN OPERATOR VALUE command line filter, numeric values are compared as numbers"""
+    operators = '|'.join(re.escape(operator) for operator in INDEX_QUERY_OPERATORS)
+    match = re.fullmatch(rf'\s*(\w+)\s*({operators})\s*(.*?)\s*', text, re.IGNORECASE)
+    if not match or match[1] not in INDEX_QUERY_COLUMNS:
+        raise argparse.ArgumentTypeError(f"expected COLUMN OPERATOR VALUE with a column of "
+                                         f"{', '.join(INDEX_QUERY_COLUMNS)}, got {text!r}")
+    column, operator, value = match[1], match[2].upper(), match[3]
+    try:
+        return column, operator, int(value, 0)
+    except ValueError:
+        return column, operator, value
+
+
+def run_mode(args: argparse.Namespace, jobs: int):
+    """Run the mode selected on the command line"""
     # If tim2json mode, convert TIM to JSON and exit
     if args.tim2json:
         input_path = Path(args.tim2json)
@@ -1786,20 +4036,19 @@ def main():
             output_dir = Path(args.output) if args.output else input_path
             output_dir.mkdir(parents=True, exist_ok=True)
             
-            tim_files = list(input_path.glob('*.TIM')) + list(input_path.glob('*.tim'))
-            if not tim_files:
+            tim_files = sorted(set(input_path.glob('*.TIM')) | set(input_path.glob('*.tim')))
+            if not tim_files and not args.incremental:
                 print(f"No TIM files found in {input_path}")
                 return
             
             print(f"Converting {len(tim_files)} TIM file(s) from {input_path}...")
-            for tim_file in tim_files:
-                output_file = output_dir / tim_file.with_suffix('.json').name
-                print(f"  {tim_file.name} -> {output_file.name}")
-                json_data = tim_to_json(str(tim_file))
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(json_data, f, indent=2, ensure_ascii=False)
+            num_converted, failures = convert_directory(convert_tim_to_json_file, tim_files, output_dir, '.json',
+                                                        jobs, args.incremental)
             
-            print(f"Saved {len(tim_files)} JSON file(s) to {output_dir}")
+            print(f"Saved {num_converted - len(failures)} JSON file(s) to {output_dir}")
+            print_failures(failures)
+            if failures:
+                sys.exit(1)
             return
         else:
             # Process single file
@@ -1809,10 +4058,7 @@ def main():
                 output_path = input_path.with_suffix('.json')
             
             print(f"Converting {input_path} to JSON...")
-            json_data = tim_to_json(str(input_path))
-            
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, indent=2, ensure_ascii=False)
+            convert_tim_to_json_file(input_path, output_path)
             
             print(f"Saved to {output_path}")
             return
@@ -1827,22 +4073,19 @@ def main():
             output_dir = Path(args.output) if args.output else input_path
             output_dir.mkdir(parents=True, exist_ok=True)
             
-            json_files = list(input_path.glob('*.json'))
-            if not json_files:
+            json_files = sorted(input_path.glob('*.json'))
+            if not json_files and not args.incremental:
                 print(f"No JSON files found in {input_path}")
                 return
             
             print(f"Converting {len(json_files)} JSON file(s) from {input_path}...")
-            for json_file in json_files:
-                output_file = output_dir / json_file.with_suffix('.TIM').name
-                print(f"  {json_file.name} -> {output_file.name}")
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-                tim_bytes = json_to_tim(json_data)
-                with open(output_file, 'wb') as f:
-                    f.write(tim_bytes)
+            num_converted, failures = convert_directory(convert_json_to_tim_file, json_files, output_dir, '.TIM',
+                                                        jobs, args.incremental)
             
-            print(f"Saved {len(json_files)} TIM file(s) to {output_dir}")
+            print(f"Saved {num_converted - len(failures)} TIM file(s) to {output_dir}")
+            print_failures(failures)
+            if failures:
+                sys.exit(1)
             return
         else:
             # Process single file
@@ -1852,18 +4095,100 @@ def main():
                 output_path = input_path.with_suffix('.TIM')
             
             print(f"Converting {input_path} to TIM...")
+            num_bytes = convert_json_to_tim_file(input_path, output_path)
             
-            with open(input_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-            
-            tim_bytes = json_to_tim(json_data)
-            
-            with open(output_path, 'wb') as f:
-                f.write(tim_bytes)
-            
-            print(f"Saved {len(tim_bytes)} bytes to {output_path}")
+            print(f"Saved {num_bytes} bytes to {output_path}")
             return
     
+    if args.part_memory:
+        num_parts, bytes_per_part = measure_part_memory(args.part_memory)
+        print(f"Loaded {num_parts} parts: {bytes_per_part:.0f} bytes per part, "
+              f"{num_parts * bytes_per_part / 1024 / 1024:.1f} MiB in total")
+        return
+    
+    if args.validate:
+        input_path = Path(args.validate)
+        if input_path.is_dir():
+            tim_files = sorted(set(input_path.glob('*.TIM')) | set(input_path.glob('*.tim')))
+        else:
+            tim_files = [input_path]
+        start = time.perf_counter()
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as out:
+                num_invalid = validate_files(tim_files, out, jobs)
+        else:
+            num_invalid = validate_files(tim_files, sys.stdout, jobs)
+        seconds = time.perf_counter() - start
+        print(f"Validated {len(tim_files)} file(s) in {seconds:.2f} s, {num_invalid} with errors", file=sys.stderr)
+        if num_invalid:
+            sys.exit(1)
+        return
+    
+    if args.duplicates:
+        input_path = Path(args.duplicates)
+        tim_files = sorted(set(input_path.glob('*.TIM')) | set(input_path.glob('*.tim')))
+        groups, failures = find_duplicates(tim_files, jobs)
+        print(f"Found {len(groups)} group(s) of duplicates among {len(tim_files)} TIM file(s)")
+        for fingerprint, files in groups.items():
+            print(f"  {fingerprint[:16]} ({len(files)} files):")
+            for file in files:
+                print(f"    {file.name}")
+        if failures:
+            print(f"Failed to read {len(failures)} file(s):")
+            for input_file, error in failures:
+                print(f"  {input_file}: {error}")
+            sys.exit(1)
+        return
+    
+    if args.patch:
+        if args.part is None or not args.set:
+            sys.exit("--patch needs --part and at least one --set FIELD=VALUE")
+        with LevelPatcher(args.patch) as level:
+            level.set_fields(args.part, **dict(args.set))
+        print(f"Patched part {args.part} of {args.patch}: {', '.join(f'{name}={value}' for name, value in args.set)}")
+        return
+    
+    if args.serve:
+        try:
+            serve(args.serve, jobs)
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    if args.watch:
+        input_dir = Path(args.watch)
+        output_dir = Path(args.output) if args.output else input_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"Watching {input_dir} for JSON changes, press Ctrl+C to stop", flush=True)
+        try:
+            watch_json_directory(input_dir, output_dir)
+        except KeyboardInterrupt:
+            pass
+        return
+    
+    if args.index:
+        with CorpusIndex(Path(args.index)) as index:
+            num_indexed, num_unchanged, num_removed, failures = index.update()
+        print(f"Indexed {num_indexed} file(s), {num_unchanged} unchanged, {num_removed} removed")
+        if failures:
+            print(f"Failed to index {len(failures)} file(s):")
+            for input_file, error in failures:
+                print(f"  {input_file}: {error}")
+            sys.exit(1)
+        return
+    
+    if args.query:
+        try:
+            index = CorpusIndex(Path(args.query), read_only=True)
+        except ValueError as e:
+            sys.exit(str(e))
+        with index:
+            paths = index.find(args.uses, args.where)
+        for path in paths:
+            print(path)
+        print(f"{len(paths)} matching level(s)", file=sys.stderr)
+        return
+    
     # If parse mode, parse the file and exit
     if args.parse:
         parse_tim_file(args.parse)
@@ -1876,17 +4201,17 @@ def main():
     color = args.color
     music = args.music
 
-    num_basketballs = 150
-
     buffer = make_buffer(
         color=color,
         music=music,
         quiz_title=quiz_title,
         goal_description=goal_description,
-        normal_parts=[i for i in range(num_basketballs)],
+        normal_parts=[i for i in range(args.num_parts)],
         belts=[],
         ropes=[],
         pulleys=[],
+        layout=args.layout,
+        seed=args.seed,
     )
 
     if args.debug:
@@ -0,0 +1,33 @@
+"""Levels shared by the tests"""
+from main import PartType, make_buffer, make_part
+
+
+def build_level(parts, music: int = 1000) -> bytes:
+    """Level file data with the given parts, moving parts are written first"""
+    return bytes(make_buffer(color=3, music=music, quiz_title=b"Test\0", goal_description=b"Test\0",
+                             normal_parts=list(parts), belts=[], ropes=[], pulleys=[]))
+
+
+def mixed_parts():
+    """One part of every record type, all fixed"""
+    return [make_part(part_type, 10 * i, 20, moving=False)
+            for i, part_type in enumerate((PartType.BOWLING_BALL, PartType.BELT, PartType.ROPE,
+                                           PartType.PULLEY, PartType.PROGRAMMABLE_BALL))]
+
+
+def linked_parts():
+    """Moving balls and fixed parts of every record type, with links between them"""
+    balls = [make_part(PartType.BOWLING_BALL, 30 * i, 40) for i in range(3)]
+    balls[1].flags_2 = 0x10
+    wall = make_part(PartType.RED_BRICK_WALL, 200, 300, moving=False)
+    wall.connected_1 = 0
+    belt = make_part(PartType.BELT, 0, 0, moving=False)
+    belt.belt_connected_part_1 = 1
+    belt.belt_connected_part_2 = 3
+    rope = make_part(PartType.ROPE, 0, 0, moving=False)
+    rope.rope_segment_length = 12
+    pulley = make_part(PartType.PULLEY, 150, 100, moving=False)
+    pulley.rope_index = 5
+    ball = make_part(PartType.PROGRAMMABLE_BALL, 400, 20, moving=False)
+    ball.mass = 321
+    return balls + [wall, belt, rope, pulley, ball]
@@ -0,0 +1,22 @@
+import main
+from benchmark import MAX_LINK_TARGETS, encode_parts_block, run_benchmarks, synthesize_level
+
+
+def test_small_run_covers_every_case(tmp_path, capsys):
+    results = run_benchmarks([150], 1, tmp_path)
+    assert {"parse_part_from_bytes", "make_buffer", "json_to_tim", "tim_to_json", "parse_tim_file",
+            "LevelPatcher"} <= {result["name"] for result in results}
+    assert all("skipped" not in result and result["peak_bytes"] >= 0 for result in results)
+    # The parse report goes to devnull, only the result lines are printed
+    assert "Quiz Title" not in capsys.readouterr().out
+    assert main.read_tim_file(tmp_path / "bench_150_patch.TIM").parts[75].pos_x == 100
+
+
+def test_links_of_large_levels_fit_the_link_fields():
+    num_parts = MAX_LINK_TARGETS + 1000
+    block = encode_parts_block(synthesize_level(num_parts))
+    offset = count = 0
+    while offset < len(block):
+        offset += main.parse_part_from_bytes(block, offset)[1]
+        count += 1
+    assert count == num_parts
@@ -0,0 +1,68 @@
+import random
+import struct
+
+import pytest
+
+from main import (_DEFAULT_FLAGS_MAP, _DEFAULT_SIZES_MAP, FALLBACK_PART_FLAGS, FALLBACK_PART_SIZE, FLAGS_1, FLAGS_2,
+                  FLAGS_3, LAYOUTS_BY_CLASS, PART_LAYOUT, Flags1, PartType, dict_to_part, get_default_part_flags,
+                  get_default_part_size, get_part_layout, make_part, parse_part_from_bytes, part_to_dict)
+
+FIELD_RANGES = {'B': (0, 0xFF), 'h': (-0x8000, 0x7FFF), 'H': (0, 0xFFFF)}
+
+
+def random_part(layout, rng):
+    """A part of the layout's class with a random value in every stored field"""
+    values = {name: rng.randint(*FIELD_RANGES[code]) for name, code in layout.fields}
+    values['part_type'] = rng.choice([t for t in PartType if get_part_layout(t) is layout])
+    return layout.cls(**values)
+
+
+@pytest.mark.parametrize("cls", list(LAYOUTS_BY_CLASS), ids=lambda cls: cls.__name__)
+def test_record_round_trip(cls):
+    layout = LAYOUTS_BY_CLASS[cls]
+    rng = random.Random(cls.__name__)
+    for _ in range(50):
+        part = random_part(layout, rng)
+        data = part.to_bytes()
+        assert len(data) == layout.size == struct.calcsize('<' + ''.join(code for _, code in layout.fields))
+        assert cls.from_bytes(data) == part
+        assert parse_part_from_bytes(b'\xAA' * 3 + data, 3) == (part, layout.size)
+
+        buffer = bytearray(layout.size + 5)
+        assert part.pack_into(buffer, 5) == len(buffer)
+        assert bytes(buffer[5:]) == data
+
+
+def test_field_structs_address_single_fields():
+    part = make_part(PartType.BOWLING_BALL, 123, 45)
+    data = part.to_bytes()
+    for name, (offset, field_struct) in PART_LAYOUT.field_structs.items():
+        assert field_struct.unpack_from(data, offset)[0] == getattr(part, name)
+
+
+@pytest.mark.parametrize("codec, flag_class", [(FLAGS_1, Flags1), (FLAGS_2, FLAGS_2.flag_class),
+                                               (FLAGS_3, FLAGS_3.flag_class)])
+def test_flag_names_round_trip(codec, flag_class):
+    rng = random.Random(0)
+    for value in [0, 0xFFFF, *(rng.randrange(0x10000) for _ in range(200))]:
+        names = codec.to_list(value)
+        assert names == [flag.name for flag in flag_class if value & flag.value]
+        assert codec.from_names(names) == value & codec.mask
+        assert codec.names(value) == tuple(names)
+    assert codec.from_names(["NOT_A_FLAG"]) == 0
+
+
+def test_default_tables():
+    for part_type in PartType:
+        assert get_default_part_flags(part_type) == _DEFAULT_FLAGS_MAP.get(part_type, FALLBACK_PART_FLAGS)
+        assert get_default_part_size(part_type) == _DEFAULT_SIZES_MAP.get(part_type, FALLBACK_PART_SIZE)
+    assert get_default_part_flags(0xFFFF) == FALLBACK_PART_FLAGS
+    assert get_default_part_size(0xFFFF) == FALLBACK_PART_SIZE
+
+
+@pytest.mark.parametrize("part_type", list(PartType), ids=lambda t: t.name)
+def test_part_dict_round_trip(part_type):
+    part = make_part(part_type, 17, 29, moving=part_type % 2 == 0)
+    part.unknown_10 = 3
+    part.connected_2 = 4
+    assert dict_to_part(part_to_dict(part)) == part
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+import benchmark
+from levels import build_level, linked_parts, mixed_parts
+from main import (SOLUTION_SIZE, convert_directory, convert_files_async, convert_json_to_tim_file,
+                  convert_tim_to_json_file, json_to_tim, reconvert_json_file, tim_to_json, tim_to_json_async)
+
+
+@pytest.fixture(params=["linked", "synthesized"])
+def level_data(request) -> bytes:
+    if request.param == "linked":
+        return build_level(linked_parts())
+    return bytes(json_to_tim(benchmark.synthesize_level(500, seed=7)))
+
+
+def test_json_round_trip_is_byte_identical(tmp_path, level_data):
+    tim_path = tmp_path / "level.TIM"
+    tim_path.write_bytes(level_data)
+    assert json_to_tim(tim_to_json(str(tim_path))) == level_data
+
+
+def test_streaming_file_round_trip(tmp_path, level_data):
+    tim_path = tmp_path / "level.TIM"
+    tim_path.write_bytes(level_data)
+    json_path = tmp_path / "level.json"
+    convert_tim_to_json_file(tim_path, json_path)
+    assert json_path.read_text(encoding='utf-8') == json.dumps(tim_to_json(str(tim_path)), indent=2)
+
+    out_path = tmp_path / "out.TIM"
+    assert convert_json_to_tim_file(json_path, out_path) == len(level_data)
+    assert out_path.read_bytes() == level_data
+
+
+def test_streaming_with_parts_before_title(tmp_path, level_data):
+    tim_path = tmp_path / "level.TIM"
+    tim_path.write_bytes(level_data)
+    json_data = tim_to_json(str(tim_path))
+    reordered = {"parts": json_data.pop("parts"), **json_data}
+    json_path = tmp_path / "level.json"
+    json_path.write_text(json.dumps(reordered), encoding='utf-8')
+    out_path = tmp_path / "out.TIM"
+    convert_json_to_tim_file(json_path, out_path)
+    assert out_path.read_bytes() == level_data
+
+
+def test_truncated_tim_leaves_no_json(tmp_path):
+    data = build_level(mixed_parts())
+    tim_path = tmp_path / "trunc.TIM"
+    tim_path.write_bytes(data[:len(data) - SOLUTION_SIZE - 20])
+    json_path = tmp_path / "trunc.json"
+    with pytest.raises(Exception):
+        convert_tim_to_json_file(tim_path, json_path)
+    assert not json_path.exists()
+
+
+def test_directory_run_leaves_no_json_for_bad_files(tmp_path):
+    data = build_level(mixed_parts())
+    (tmp_path / "good.TIM").write_bytes(data)
+    (tmp_path / "bad.TIM").write_bytes(data[:len(data) - SOLUTION_SIZE - 20])
+    out = tmp_path / "out"
+    out.mkdir()
+    num_converted, failures = convert_directory(convert_tim_to_json_file, sorted(tmp_path.glob('*.TIM')), out,
+                                                '.json', 1, False)
+    assert [path.name for path, _ in failures] == ["bad.TIM"]
+    assert sorted(path.name for path in out.iterdir() if not path.name.startswith('.')) == ["good.json"]
+
+
+def write_levels(directory, count):
+    paths = []
+    for i in range(count):
+        path = directory / f"level_{i}.TIM"
+        path.write_bytes(bytes(json_to_tim(benchmark.synthesize_level(50 + i, seed=i))))
+        paths.append(path)
+    return paths
+
+
+def test_process_pool_matches_serial(tmp_path):
+    files = write_levels(tmp_path, 6)
+    serial = tmp_path / "serial"
+    pool = tmp_path / "pool"
+    serial.mkdir()
+    pool.mkdir()
+    assert convert_directory(convert_tim_to_json_file, files, serial, '.json', 1, False) == (6, [])
+    assert convert_directory(convert_tim_to_json_file, files, pool, '.json', 2, False) == (6, [])
+    for path in serial.iterdir():
+        assert (pool / path.name).read_bytes() == path.read_bytes()
+
+
+def test_incremental_skips_unchanged_and_prunes_deleted(tmp_path):
+    source = tmp_path / "levels"
+    out = tmp_path / "out"
+    source.mkdir()
+    out.mkdir()
+    files = write_levels(source, 3)
+    assert convert_directory(convert_tim_to_json_file, files, out, '.json', 1, True)[0] == 3
+    assert convert_directory(convert_tim_to_json_file, files, out, '.json', 1, True)[0] == 0
+
+    files[1].write_bytes(bytes(json_to_tim(benchmark.synthesize_level(80, seed=99))))
+    assert convert_directory(convert_tim_to_json_file, files, out, '.json', 1, True)[0] == 1
+    assert json.loads((out / "level_1.json").read_text()) == tim_to_json(str(files[1]))
+
+    files[2].unlink()
+    assert convert_directory(convert_tim_to_json_file, files[:2], out, '.json', 1, True)[0] == 0
+    assert not (out / "level_2.json").exists()
+
+
+def test_async_conversion_matches_sync(tmp_path):
+    files = write_levels(tmp_path, 4)
+    files.append(tmp_path / "missing.TIM")
+    outputs = [path.with_suffix('.json') for path in files]
+    failures = asyncio.run(convert_files_async(convert_tim_to_json_file, files, outputs, concurrency=2))
+    assert [path.name for path, _ in failures] == ["missing.TIM"]
+    for path, output in zip(files[:4], outputs):
+        assert json.loads(output.read_text()) == tim_to_json(str(path))
+    assert asyncio.run(tim_to_json_async(files[0])) == tim_to_json(str(files[0]))
+
+
+def test_reconvert_keeps_previous_output_on_failure(tmp_path):
+    data = build_level(mixed_parts())
+    tim_path = tmp_path / "level.TIM"
+    tim_path.write_bytes(data)
+    json_path = tmp_path / "level.json"
+    convert_tim_to_json_file(tim_path, json_path)
+    out_path = tmp_path / "out.TIM"
+    assert reconvert_json_file(json_path, out_path) is None
+    assert out_path.read_bytes() == data
+
+    text = json_path.read_text()
+    json_path.write_text(text[:random.Random(0).randrange(len(text) // 2, len(text))])
+    assert reconvert_json_file(json_path, out_path) is not None
+    assert out_path.read_bytes() == data
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["level.TIM", "level.json", "out.TIM"]
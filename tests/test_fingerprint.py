@@ -0,0 +1,58 @@
+import copy
+import random
+
+from levels import build_level
+from main import LAYOUTS_BY_CLASS, LINK_FIELDS_BY_CLASS, PartType, TimReader, level_fingerprint, make_part
+
+
+def fingerprint(parts) -> str:
+    return level_fingerprint(TimReader(build_level(parts)))
+
+
+def permuted(parts, order):
+    """The parts in the given order, with their stored links renumbered to it"""
+    new_index = {old: new for new, old in enumerate(order)}
+    result = []
+    for old in order:
+        part = copy.copy(parts[old])
+        for field in LINK_FIELDS_BY_CLASS[type(part)]:
+            if field in LAYOUTS_BY_CLASS[type(part)].names and getattr(part, field) >= 0:
+                setattr(part, field, new_index[getattr(part, field)])
+        result.append(part)
+    return result
+
+
+def belt_level():
+    """Two gears and two belts that only differ in the gear they drive"""
+    gear_1 = make_part(PartType.GEAR, 100, 100, moving=False)
+    gear_2 = make_part(PartType.GEAR, 300, 100, moving=False)
+    belts = []
+    for gear in (0, 1):
+        belt = make_part(PartType.BELT, 200, 200, moving=False)
+        belt.belt_connected_part_1 = gear
+        belts.append(belt)
+    return [gear_1, gear_2, *belts]
+
+
+def test_swapping_tied_linked_parts_keeps_fingerprint():
+    parts = belt_level()
+    assert fingerprint(parts) == fingerprint(permuted(parts, [0, 1, 3, 2]))
+
+
+def test_random_permutations_keep_fingerprint():
+    rng = random.Random(0)
+    parts = belt_level() + [make_part(PartType.BOWLING_BALL, 50, 50, moving=False) for _ in range(4)]
+    parts[4].connected_1 = 2
+    parts[5].connected_1 = 3
+    expected = fingerprint(parts)
+    for _ in range(20):
+        order = list(range(len(parts)))
+        rng.shuffle(order)
+        assert fingerprint(permuted(parts, order)) == expected
+
+
+def test_different_links_change_fingerprint():
+    parts = belt_level()
+    relinked = belt_level()
+    relinked[3].belt_connected_part_1 = 0
+    assert fingerprint(parts) != fingerprint(relinked)
@@ -0,0 +1,60 @@
+import random
+
+from main import LINK_FIELDS_BY_CLASS, ConnectionGraph, PartType, make_part
+
+
+def random_linked_parts(rng, count):
+    """Parts of every record type with random links, some of them dangling"""
+    part_types = (PartType.BOWLING_BALL, PartType.RED_BRICK_WALL, PartType.BELT, PartType.ROPE, PartType.PULLEY)
+    parts = [make_part(rng.choice(part_types), moving=False) for _ in range(count)]
+    for part in parts:
+        for field in LINK_FIELDS_BY_CLASS[type(part)]:
+            if rng.random() < 0.15:
+                setattr(part, field, rng.randrange(-3, count + 3))
+    return parts
+
+
+def brute_components(num_parts, edges):
+    """Connected parts by repeated flooding, ignoring edge direction"""
+    components = []
+    seen = set()
+    for start in range(num_parts):
+        if start in seen:
+            continue
+        members = {start}
+        frontier = [start]
+        while frontier:
+            index = frontier.pop()
+            for a, b in edges:
+                for other in ((b,) if a == index else (a,) if b == index else ()):
+                    if other not in members:
+                        members.add(other)
+                        frontier.append(other)
+        seen |= members
+        components.append(sorted(members))
+    return components
+
+
+def test_graph_matches_brute_force():
+    rng = random.Random(4)
+    for _ in range(20):
+        parts = random_linked_parts(rng, rng.randrange(1, 40))
+        graph = ConnectionGraph(parts)
+        links = [(source, field, getattr(part, field)) for source, part in enumerate(parts)
+                 for field in LINK_FIELDS_BY_CLASS[type(part)] if getattr(part, field) != -1]
+        edges = [(source, target) for source, _, target in links if 0 <= target < len(parts)]
+
+        assert sorted(graph.dangling) == sorted(link for link in links if not 0 <= link[2] < len(parts))
+        assert graph.num_edges == len(edges)
+        for index in range(len(parts)):
+            assert sorted(graph.targets(index)) == sorted(b for a, b in edges if a == index)
+            assert sorted(graph.sources(index)) == sorted(a for a, b in edges if b == index)
+            linked = {b for a, b in edges if a == index} | {a for a, b in edges if b == index}
+            assert graph.neighbors(index) == sorted(linked - {index})
+
+        components = brute_components(len(parts), edges)
+        assert graph.components() == [members for members in components if len(members) > 1]
+        for members in components:
+            for index in members:
+                assert graph.component(index) == members
+                assert graph.component_ids[index] == members[0]
@@ -0,0 +1,97 @@
+import operator
+import sqlite3
+
+import pytest
+
+from benchmark import synthesize_level
+from main import CorpusIndex, Flags1, json_to_tim, part_type_name, read_tim_file
+
+OPERATORS = {'=': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le, '>': operator.gt,
+             '>=': operator.ge}
+
+
+def write_corpus(directory, count):
+    for i in range(count):
+        json_data = synthesize_level(5 + 7 * i, seed=i)
+        json_data["global_settings"]["music"] = 1000 + i % 4
+        (directory / f"level_{i:02}.TIM").write_bytes(json_to_tim(json_data))
+
+
+def brute_find(directory, uses=(), filters=()):
+    """Paths of the levels matching a query, by parsing every file"""
+    paths = []
+    for path in sorted(directory.glob('*.TIM')):
+        level = read_tim_file(path)
+        values = {**vars(level.header), 'num_parts': len(level.parts), 'title': level.header.quiz_title}
+        part_types = {part_type_name(part.part_type) for part in level.parts}
+        if set(uses) <= part_types and all(OPERATORS[op](values[column], value) for column, op, value in filters):
+            paths.append(str(path))
+    return paths
+
+
+QUERIES = [
+    ((), ()),
+    (('PULLEY',), ()),
+    (('BELT', 'ROPE'), ()),
+    ((), (('music', '=', 1002),)),
+    (('BOWLING_BALL',), (('num_moving', '>', 20), ('num_parts', '<=', 100))),
+    ((), (('num_fixed', '!=', 0), ('music', '>=', 1001))),
+]
+
+
+@pytest.mark.parametrize("uses, filters", QUERIES)
+def test_find_matches_brute_force(tmp_path, uses, filters):
+    write_corpus(tmp_path, 16)
+    with CorpusIndex(tmp_path) as index:
+        assert index.update()[:3] == (16, 0, 0)
+        assert index.find(uses, filters) == brute_find(tmp_path, uses, filters)
+
+
+def test_parts_table_holds_every_part(tmp_path):
+    write_corpus(tmp_path, 3)
+    with CorpusIndex(tmp_path) as index:
+        index.update()
+        for path in sorted(tmp_path.glob('*.TIM')):
+            rows = index.db.execute(
+                'SELECT part_type, moving, pos_x, pos_y FROM parts JOIN levels ON levels.id = level_id '
+                'WHERE path = ? ORDER BY part_index', (str(path),)).fetchall()
+            assert rows == [(part_type_name(p.part_type), int(bool(p.flags_1 & Flags1.MOVING_PART)), p.pos_x, p.pos_y)
+                            for p in read_tim_file(path).parts]
+
+
+def test_update_tracks_changes(tmp_path):
+    write_corpus(tmp_path, 4)
+    with CorpusIndex(tmp_path) as index:
+        assert index.update()[:3] == (4, 0, 0)
+        assert index.update()[:3] == (0, 4, 0)
+
+        changed = tmp_path / "level_01.TIM"
+        changed.write_bytes(json_to_tim(synthesize_level(300, seed=42)))
+        (tmp_path / "level_02.TIM").unlink()
+        (tmp_path / "broken.TIM").write_bytes(b"\x00" * 10)
+        num_indexed, num_unchanged, num_removed, failures = index.update()
+        assert (num_indexed, num_unchanged, num_removed) == (1, 2, 1)
+        assert [path.name for path, _ in failures] == ["broken.TIM"]
+        assert index.find((), [('num_parts', '=', 300)]) == [str(changed)]
+        (tmp_path / "broken.TIM").unlink()
+        assert index.find() == brute_find(tmp_path)
+
+
+def test_find_rejects_unknown_columns_and_operators(tmp_path):
+    with CorpusIndex(tmp_path) as index:
+        with pytest.raises(ValueError):
+            index.find((), [('music; DROP TABLE levels', '=', 1)])
+        with pytest.raises(ValueError):
+            index.find((), [('music', 'OR 1 =', 1)])
+
+
+def test_read_only_index(tmp_path):
+    with pytest.raises(ValueError):
+        CorpusIndex(tmp_path, read_only=True)
+    write_corpus(tmp_path, 2)
+    with CorpusIndex(tmp_path) as index:
+        index.update()
+    with CorpusIndex(tmp_path, read_only=True) as index:
+        assert index.find() == brute_find(tmp_path)
+        with pytest.raises(sqlite3.OperationalError):
+            index.db.execute('DELETE FROM levels')
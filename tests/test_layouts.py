@@ -0,0 +1,49 @@
+import pytest
+
+import main
+from main import (LEVEL_LAYOUTS, PLAYFIELD_BOUNDS, Flags1, PartType, decode_level, generate_parts, generate_parts_block,
+                  make_buffer, make_part)
+
+needs_numpy = pytest.mark.skipif(main.np is None, reason="layout generators need NumPy")
+
+
+def build_level(normal_parts, layout='spiral', seed=0) -> bytes:
+    return bytes(make_buffer(color=3, music=1000, quiz_title=b"Test\0", goal_description=b"Test\0",
+                             normal_parts=normal_parts, belts=[], ropes=[], pulleys=[], layout=layout, seed=seed))
+
+
+@needs_numpy
+@pytest.mark.parametrize("layout", sorted(LEVEL_LAYOUTS))
+def test_block_matches_table(layout):
+    assert generate_parts_block(200, layout, seed=3) == generate_parts(200, layout, seed=3).to_bytes()
+
+
+@needs_numpy
+@pytest.mark.parametrize("layout", sorted(LEVEL_LAYOUTS))
+def test_generated_parts_are_moving_and_inside_the_play_field(layout):
+    min_x, min_y, max_x, max_y = PLAYFIELD_BOUNDS
+    level = decode_level(build_level([None] * 150, layout, seed=5))
+    assert level.header.num_moving == len(level.parts) == 150
+    for part in level.parts:
+        assert part.flags_1 & Flags1.MOVING_PART
+        assert min_x <= part.pos_x <= max_x and min_y <= part.pos_y <= max_y
+
+
+@needs_numpy
+def test_spiral_without_numpy_is_identical(monkeypatch):
+    expected = build_level([None] * 150)
+    monkeypatch.setattr(main, 'np', None)
+    assert build_level([None] * 150) == expected
+
+
+@pytest.mark.parametrize("layout", ['spiral', 'grid'])
+def test_placeholders_with_given_moving_and_fixed_parts(layout):
+    if main.np is None and layout != 'spiral':
+        pytest.skip("layout generators need NumPy")
+    ball = make_part(PartType.BOWLING_BALL, 5, 5)
+    wall = make_part(PartType.RED_BRICK_WALL, 100, 100, moving=False)
+    belt = make_part(PartType.BELT, 50, 50, moving=False)
+    level = decode_level(build_level([wall, None, ball, None, belt], layout))
+    generated = decode_level(build_level([None, None], layout)).parts
+    assert (level.header.num_moving, level.header.num_fixed) == (3, 2)
+    assert level.parts == [ball, *generated, wall, belt]
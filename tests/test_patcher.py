@@ -0,0 +1,77 @@
+import copy
+
+import pytest
+
+from levels import build_level
+from main import LevelPatcher, PartType, make_part
+
+
+def level_parts():
+    """Three moving balls then three fixed walls, the first wall linked to the last ball"""
+    balls = [make_part(PartType.BOWLING_BALL, 10 * i, 10) for i in range(3)]
+    walls = [make_part(PartType.RED_BRICK_WALL, 100 + 10 * i, 200, moving=False) for i in range(3)]
+    walls[0].connected_1 = 2
+    return balls + walls
+
+
+@pytest.fixture
+def level_file(tmp_path):
+    path = tmp_path / "level.TIM"
+    path.write_bytes(build_level(level_parts()))
+    return path
+
+
+def test_set_fields_rewrites_only_the_record(level_file):
+    with LevelPatcher(str(level_file)) as level:
+        level.set_fields(4, pos_x=123, flags_2=0x10)
+    expected = level_parts()
+    expected[4].pos_x = 123
+    expected[4].flags_2 = 0x10
+    assert level_file.read_bytes() == build_level(expected)
+
+
+def test_replace_with_other_record_size(level_file):
+    belt = make_part(PartType.BELT, 50, 50, moving=False)
+    with LevelPatcher(str(level_file)) as level:
+        level[4] = belt
+        assert level[5].pos_x == 120
+    expected = level_parts()
+    expected[4] = copy.copy(belt)
+    assert level_file.read_bytes() == build_level(expected)
+
+
+def test_insert_and_delete_renumber_links(level_file):
+    ball = make_part(PartType.BASKETBALL, 5, 5)
+    with LevelPatcher(str(level_file)) as level:
+        level.insert(0, ball)
+        del level[1]
+    expected = level_parts()
+    expected[0] = copy.copy(ball)
+    assert level_file.read_bytes() == build_level(expected)
+
+    with LevelPatcher(str(level_file)) as level:
+        del level[2]
+    del expected[2]
+    expected[2].connected_1 = -1
+    assert level_file.read_bytes() == build_level(expected)
+
+
+@pytest.mark.parametrize("index, moving", [(2, False), (3, True)])
+def test_moving_flag_change_at_the_boundary_updates_counts(level_file, index, moving):
+    expected = level_parts()
+    expected[index] = make_part(expected[index].part_type, expected[index].pos_x, expected[index].pos_y, moving=moving)
+    if index == 3:
+        expected[index].connected_1 = 2
+    with LevelPatcher(str(level_file)) as level:
+        level[index] = copy.copy(expected[index])
+    assert level_file.read_bytes() == build_level(expected)
+
+
+def test_moving_flag_change_inside_a_block_is_rejected(level_file):
+    before = level_file.read_bytes()
+    with LevelPatcher(str(level_file)) as level:
+        with pytest.raises(ValueError):
+            level[0] = make_part(PartType.BOWLING_BALL, 0, 10, moving=False)
+        with pytest.raises(ValueError):
+            level.set_fields(5, flags_1=0x1000)
+    assert level_file.read_bytes() == before
@@ -0,0 +1,114 @@
+import io
+import json
+import socket
+import threading
+
+import pytest
+
+import benchmark
+import main
+from levels import build_level, linked_parts
+from main import (LazyLevel, PartTable, TimReader, decode_level, iter_level, iter_parts, json_to_tim, parse_tim_file,
+                  profiling, read_tim_file, tim_to_json, write_level_json)
+
+
+class TrickleStream(io.RawIOBase):
+    """Binary stream returning at most a few bytes per read, like a pipe"""
+
+    def __init__(self, data: bytes, chunk: int = 5):
+        self.data = data
+        self.position = 0
+        self.chunk = chunk
+
+    def read(self, size=-1):
+        size = min(size if size >= 0 else len(self.data), self.chunk)
+        data = self.data[self.position:self.position + size]
+        self.position += len(data)
+        return data
+
+
+@pytest.fixture(params=["linked", "synthesized"])
+def level_file(request, tmp_path):
+    if request.param == "linked":
+        data = build_level(linked_parts())
+    else:
+        data = bytes(json_to_tim(benchmark.synthesize_level(400, seed=3)))
+    path = tmp_path / "level.TIM"
+    path.write_bytes(data)
+    return path
+
+
+def test_lazy_level_matches_full_decode(level_file):
+    level = read_tim_file(level_file)
+    with LazyLevel(str(level_file)) as lazy:
+        assert lazy.header == level.header
+        assert len(lazy) == len(level.parts)
+        for index in reversed(range(len(lazy))):
+            assert lazy[index] == level.parts[index]
+        assert lazy[-1] == level.parts[-1]
+        assert list(lazy) == level.parts
+        assert lazy.solution == level.solution
+        assert lazy.parts_end == level_file.stat().st_size - main.SOLUTION_SIZE
+        with pytest.raises(IndexError):
+            lazy.part_offset(len(lazy))
+
+
+def test_iter_level_over_short_reads(level_file):
+    level = read_tim_file(level_file)
+    events = list(iter_level(TrickleStream(level_file.read_bytes())))
+    assert events[0] == level.header
+    assert events[1:-1] == level.parts
+    assert events[-1] == level.solution
+    assert list(iter_parts(TrickleStream(level_file.read_bytes(), 1))) == level.parts
+
+
+def test_iter_level_over_socket(level_file):
+    data = level_file.read_bytes()
+    reader, writer = socket.socketpair()
+    sender = threading.Thread(target=lambda: (writer.sendall(data), writer.close()))
+    sender.start()
+    with reader, reader.makefile('rb') as stream:
+        events = list(iter_level(stream))
+    sender.join()
+    assert events[1:-1] == read_tim_file(level_file).parts
+
+
+@pytest.mark.skipif(main.np is None, reason="PartTable needs NumPy")
+def test_part_table_matches_parts(level_file):
+    data = level_file.read_bytes()
+    level = decode_level(data)
+    with LazyLevel(str(level_file)) as lazy:
+        table = lazy.part_table()
+        assert table.to_bytes() == data[lazy.parts_offset:lazy.parts_end]
+    assert table.nbytes == len(table.to_bytes())
+    assert [table.part(i) for i in range(len(table))] == level.parts
+    assert list(table['pos_x']) == [part.pos_x for part in level.parts]
+    assert PartTable.from_tim_file(str(level_file)).to_bytes() == table.to_bytes()
+
+
+def test_streaming_json_matches_level_json(level_file):
+    out = io.StringIO()
+    write_level_json(TimReader.open(level_file), out)
+    assert json.loads(out.getvalue()) == tim_to_json(str(level_file))
+
+
+def test_parse_report_goes_to_file(level_file, capsys):
+    out = io.StringIO()
+    parse_tim_file(str(level_file), out)
+    assert capsys.readouterr().out == ""
+    level = read_tim_file(level_file)
+    for part in level.parts:
+        assert part.part_type.name in out.getvalue()
+
+
+def test_profiling_reports_stages(level_file):
+    laps = []
+    with profiling(callback=lambda stage, seconds: laps.append(stage)) as profiler:
+        json_data = tim_to_json(str(level_file))
+        json_to_tim(json_data)
+    assert {'header', 'solution'} <= set(profiler.stage_seconds)
+    assert laps and set(laps) <= set(profiler.stage_seconds)
+    assert sum(count for (stage, _), count in profiler.part_counts.items()
+               if stage == 'parts.encode') == len(json_data["parts"])
+    assert 'header' in profiler.report()
+    assert main.current_profiler() is main.NULL_PROFILER
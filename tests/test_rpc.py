@@ -0,0 +1,75 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import main
+from main import RPC_INVALID_PARAMS, RPC_METHOD_NOT_FOUND, RPC_PARSE_ERROR, handle_rpc_request, make_buffer
+
+MAIN_PY = Path(main.__file__)
+
+
+@pytest.fixture
+def level_file(tmp_path):
+    path = tmp_path / "level.TIM"
+    path.write_bytes(make_buffer(color=3, music=1000, quiz_title=b"Test\0", goal_description=b"Test\0",
+                                 normal_parts=list(range(10)), belts=[], ropes=[], pulleys=[]))
+    return path
+
+
+def call(method, params, request_id=1):
+    return json.loads(handle_rpc_request(json.dumps({"jsonrpc": "2.0", "id": request_id,
+                                                     "method": method, "params": params})))
+
+
+def test_conversions_round_trip(level_file, tmp_path):
+    level = call("tim2json", {"input": str(level_file)})["result"]
+    assert level["title"] == "Test"
+    json_path = tmp_path / "level.json"
+    assert call("tim2json", {"input": str(level_file), "output": str(json_path)})["result"]["output"] == str(json_path)
+    tim_path = tmp_path / "copy.TIM"
+    response = call("json2tim", {"input": str(json_path), "output": str(tim_path)}, request_id="a")
+    assert response["id"] == "a"
+    assert tim_path.read_bytes() == level_file.read_bytes()
+
+
+def test_parse_and_validate(level_file):
+    assert "Quiz Title: 'Test'" in call("parse", {"path": str(level_file)})["result"]
+    assert call("validate", {"path": str(level_file)})["result"]["errors"] == 0
+
+
+def test_errors(level_file):
+    assert json.loads(handle_rpc_request("{not json"))["error"]["code"] == RPC_PARSE_ERROR
+    assert call("explode", {})["error"]["code"] == RPC_METHOD_NOT_FOUND
+    assert call("json2tim", {"input": "x.json"})["error"]["code"] == RPC_INVALID_PARAMS
+    assert "error" in call("tim2json", {"input": str(level_file.with_name("missing.TIM"))})
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'), reason="needs Unix domain sockets")
+@pytest.mark.parametrize("stop_signal", [signal.SIGINT, signal.SIGTERM])
+def test_socket_server_stops_cleanly(level_file, tmp_path, stop_signal):
+    sock_path = tmp_path / "server.sock"
+    # Its own process group, so the signal reaches the workers too, like Ctrl+C in a terminal
+    server = subprocess.Popen([sys.executable, str(MAIN_PY), '--serve', str(sock_path), '--jobs', '2'],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, start_new_session=True)
+    try:
+        server.stderr.readline()
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(str(sock_path))
+            stream = client.makefile('rwb')
+            stream.write(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "validate",
+                                     "params": {"path": str(level_file)}}).encode() + b'\n')
+            stream.flush()
+            assert json.loads(stream.readline())["result"]["errors"] == 0
+        os.killpg(server.pid, stop_signal)
+        _, stderr = server.communicate(timeout=30)
+    finally:
+        if server.poll() is None:
+            server.kill()
+    assert 'Traceback' not in stderr
+    assert not sock_path.exists()
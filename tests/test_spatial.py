@@ -0,0 +1,58 @@
+import random
+import time
+
+from main import PartType, SpatialIndex, make_part
+
+
+def random_parts(rng, count):
+    parts = []
+    for _ in range(count):
+        part = make_part(PartType.BOWLING_BALL, rng.randrange(-50, 600), rng.randrange(-50, 400))
+        part.width_1 = rng.choice((0, 1, 8, 32, 64, 200))
+        part.height_1 = rng.choice((0, 1, 8, 32, 64, 200))
+        parts.append(part)
+    return parts
+
+
+def brute_overlaps(index):
+    boxes = [index.box(i) for i in range(len(index))]
+    return [(a, b) for a in range(len(boxes)) for b in range(a + 1, len(boxes))
+            if max(boxes[a][0], boxes[b][0]) < min(boxes[a][2], boxes[b][2])
+            and max(boxes[a][1], boxes[b][1]) < min(boxes[a][3], boxes[b][3])]
+
+
+def brute_rect(index, x, y, width, height):
+    return [i for i in range(len(index))
+            if max(index.box(i)[0], x) < min(index.box(i)[2], x + width)
+            and max(index.box(i)[1], y) < min(index.box(i)[3], y + height)]
+
+
+def check_against_brute_force(parts, rng):
+    index = SpatialIndex(parts)
+    assert index.overlaps() == brute_overlaps(index)
+    for _ in range(50):
+        x, y = rng.randrange(-100, 700), rng.randrange(-100, 500)
+        width, height = rng.randrange(0, 300), rng.randrange(0, 300)
+        assert index.query_rect(x, y, width, height) == brute_rect(index, x, y, width, height)
+        assert index.hit_test(x, y) == brute_rect(index, x, y, 1, 1)
+    assert index.query_rect(-70000, -70000, 200000, 200000) == list(range(len(parts)))
+
+
+def test_matches_brute_force():
+    rng = random.Random(0)
+    check_against_brute_force(random_parts(rng, 300), rng)
+
+
+def test_oversize_parts():
+    rng = random.Random(1)
+    parts = random_parts(rng, 200)
+    for position in (0, 100, 150):
+        huge = make_part(PartType.RED_BRICK_WALL, rng.randrange(0, 500), rng.randrange(0, 300), moving=False)
+        huge.width_1 = huge.height_1 = 65535
+        parts.insert(position, huge)
+    start = time.perf_counter()
+    index = SpatialIndex(parts)
+    index.overlaps()
+    assert time.perf_counter() - start < 1
+    assert len(index.large) == 3
+    check_against_brute_force(parts, rng)
@@ -0,0 +1,62 @@
+import pytest
+
+import main
+from levels import build_level, linked_parts
+from main import PartType, SOLUTION_SIZE, json_to_tim, make_part, tim_data_to_json, validate_level, validation_report
+
+pytestmark = pytest.mark.skipif(main.np is None, reason="validation needs NumPy")
+
+
+@pytest.mark.parametrize("parts", [
+    (make_part(PartType.BOWLING_BALL, 10, 10), make_part(PartType.RED_BRICK_WALL, 50, 50, moving=False)),
+    (make_part(PartType.BOWLING_BALL, 10, 10), make_part(PartType.BELT, 50, 50, moving=False)),
+], ids=["normal", "belt"])
+def test_truncated_inside_last_record(parts):
+    data = build_level(parts)
+    assert not [issue for issue in validate_level(data) if issue.severity == 'error']
+    truncated = data[:len(data) - SOLUTION_SIZE - 10]
+    issues = validate_level(truncated)
+    assert [issue.check for issue in issues] == ['file_size']
+
+
+def test_report_survives_truncated_file(tmp_path):
+    data = build_level([make_part(PartType.BOWLING_BALL, 10, 10), make_part(PartType.BELT, 50, 50, moving=False)])
+    path = tmp_path / "cut.TIM"
+    path.write_bytes(data[:len(data) - SOLUTION_SIZE - 10])
+    report = validation_report(path)
+    assert report["errors"] == 1
+    assert report["issues"][0]["check"] == 'file_size'
+
+
+def errors(data: bytes) -> list[tuple[str, int | None]]:
+    return [(issue.check, issue.part) for issue in validate_level(data) if issue.severity == 'error']
+
+
+def test_linked_level_has_no_errors():
+    assert errors(build_level(linked_parts())) == []
+
+
+def test_bounds_and_links():
+    parts = linked_parts()
+    parts[0].pos_x = -5
+    parts[3].pos_y = 400
+    parts[3].connected_2 = len(parts)
+    parts[4].belt_connected_part_1 = -2
+    parts[6].rope_index = 99
+    # Belts and ropes are placed by their connections, their position is not checked
+    parts[5].pos_x = 1000
+    assert sorted(errors(build_level(parts))) == [('bounds', 0), ('bounds', 3), ('links', 3), ('links', 4),
+                                                   ('links', 6)]
+
+
+def test_header_and_moving_count():
+    data = bytearray(build_level(linked_parts(), music=1023))
+    assert errors(bytes(data)) == []
+    data[0] ^= 0xFF
+    assert errors(bytes(data)) == [('header', None)]
+
+    json_data = tim_data_to_json(build_level(linked_parts()))
+    json_data["global_settings"]["num_moving"] = 2
+    issues = validate_level(bytes(json_to_tim(json_data)))
+    assert [(issue.check, issue.severity, issue.part) for issue in issues if issue.check == 'moving_count'] == [
+        ('moving_count', 'warning', 2)]